@@ -0,0 +1,190 @@
+"""Creates highlight videos for many players and games at once.
+
+This module contains the class BatchJob, which describes one highlight video to make,
+and the class BatchHighlightsMaker, which groups jobs by game so every game's play-by-play
+is fetched once, and every distinct event's link is resolved and its clip downloaded once,
+even when the event shows up in the videos of several players (i.e an assisted basket).
+
+Typical usage example:
+    batch_maker = BatchHighlightsMaker(data_retriever, downloader, video_maker, data_dir)
+    output_paths = await batch_maker.make_highlights([
+        (201142, "0022401088", {'2pt', '3pt', 'assists'}),
+        (1626164, "0022401088", {'2pt', '3pt', 'assists'}),
+    ], update_progress_bar)
+"""
+import os
+import asyncio
+import pandas as pd
+from NBAHighlightsMaker.players.event_filter import EventSelection
+from NBAHighlightsMaker.common.job_settings import JobSettings
+
+# options used when a job only gives the action types
+ALL_ACTION_OPTIONS = {'Field Goals Made', 'Field Goals Missed', 'Fouls Committed', 'Fouls Drawn',
+                      'Free Throws Made', 'Free Throws Missed'}
+
+class BatchJob:
+    """One highlight video to make: the events of a player in a game.
+
+    Args:
+        player_id (int): NBA player ID.
+        game_id (str): NBA game ID.
+        wanted_actions (set): Set of event types that the user wants to see.
+        wanted_action_options (set, optional): Set of specific options for certain event types. Defaults to all options.
+        output_path (str, optional): Path of the final video. Defaults to "<player_id>_<game_id>.mp4" in the data directory.
+
+    Attributes:
+        player_id (int): NBA player ID.
+        game_id (str): NBA game ID.
+        wanted_actions (set): Set of event types that the user wants to see.
+        wanted_action_options (set): Set of specific options for certain event types.
+        output_path (str): Path of the final video, None to use the default.
+    """
+    def __init__(self, player_id, game_id, wanted_actions, wanted_action_options = None, output_path = None):
+        self.player_id = int(player_id)
+        self.game_id = str(game_id)
+        self.wanted_actions = set(wanted_actions)
+        self.wanted_action_options = set(ALL_ACTION_OPTIONS if wanted_action_options is None else wanted_action_options)
+        self.output_path = output_path
+
+    @classmethod
+    def from_value(cls, value):
+        """Makes a job from a BatchJob or a (player_id, game_id, actions[, action_options]) tuple.
+
+        Args:
+            value (BatchJob | tuple): The job description.
+
+        Returns:
+            BatchJob: The job.
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(*value)
+
+    def __repr__(self):
+        return f"BatchJob(player_id={self.player_id}, game_id={self.game_id!r})"
+
+class BatchHighlightsMaker:
+    """Makes highlight videos for a list of (player, game, actions) jobs, sharing work between jobs.
+
+    Jobs are grouped by game. For each game, the play-by-play is fetched once and every job's events
+    are filtered in a single pass. The events of all jobs are then merged by the event number used for
+    the video, so each distinct clip has its link resolved and is downloaded only once. Finally, each
+    job's video is made from its own clips.
+
+    Args:
+        data_retriever (DataRetriever): Object used to get play-by-play data and video links.
+        downloader (Downloader): Object used to download video clips.
+        video_maker (VideoMaker): Object used to concatenate the clips of each job.
+        data_dir (str): Directory path for storing data files.
+
+    Attributes:
+        data_retriever (DataRetriever): Object used to get play-by-play data and video links.
+        downloader (Downloader): Object used to download video clips.
+        video_maker (VideoMaker): Object used to concatenate the clips of each job.
+        data_dir (str): Directory where the videos are saved.
+    """
+    def __init__(self, data_retriever, downloader, video_maker, data_dir):
+        self.data_retriever = data_retriever
+        self.downloader = downloader
+        self.video_maker = video_maker
+        self.data_dir = os.path.join(data_dir, 'vids')
+
+    @staticmethod
+    def group_jobs_by_game(jobs):
+        """Groups jobs by game, keeping the order the games first appear in.
+
+        Args:
+            jobs (list): List of BatchJob objects.
+
+        Returns:
+            dict: Maps each game ID to the list of its jobs.
+        """
+        jobs_by_game = {}
+        for job in jobs:
+            jobs_by_game.setdefault(job.game_id, []).append(job)
+        return jobs_by_game
+
+    def merge_events(self, job_events):
+        """Merges the events of many jobs into one row per distinct clip.
+
+        Events are distinct by the event number used for the video, so an assisted basket
+        wanted by both the scorer and the passer, or a blocked shot and its block, become one clip.
+
+        Args:
+            job_events (list): One DataFrame of events per job.
+
+        Returns:
+            tuple: (DataFrame with one row per distinct clip, list with the event numbers of each job's events).
+        """
+        job_event_nums = []
+        for events in job_events:
+            job_event_nums.append([self.data_retriever.get_event_num(row) for row in events.itertuples(index=False)])
+        if not job_events:
+            return pd.DataFrame(), job_event_nums
+        all_events = pd.concat(job_events, ignore_index = True)
+        all_events['EVENT_NUM'] = [num for nums in job_event_nums for num in nums]
+        unique_events = all_events.drop_duplicates('EVENT_NUM').sort_values('actionNumber').reset_index(drop = True)
+        return unique_events, job_event_nums
+
+    async def fetch_game_clips(self, game_id, jobs, update_progress_bar, settings):
+        """Gets the clips needed by all jobs of a game.
+
+        Args:
+            game_id (str): NBA game ID.
+            jobs (list): List of BatchJob objects for this game.
+            update_progress_bar (Callable): Function to update the progress bar.
+            settings (JobSettings): Settings of the videos.
+
+        Returns:
+            list: For each job, the list of its clip paths in event order.
+        """
+        selections = [EventSelection(job.player_id, job.wanted_actions, job.wanted_action_options) for job in jobs]
+        # fetch the play-by-play once and filter it for all jobs
+        job_events = await asyncio.to_thread(self.data_retriever.get_events_for_selections, game_id, selections)
+        unique_events, job_event_nums = self.merge_events(job_events)
+        if unique_events.empty:
+            return [[] for _ in jobs]
+        print(f"Game {game_id}: {sum(len(events) for events in job_events)} events across {len(jobs)} jobs, "
+              f"{len(unique_events)} distinct clips.")
+
+        unique_events = await self.data_retriever.get_download_links_async(game_id, unique_events, update_progress_bar,
+                                                                         proxy = settings.proxy)
+        unique_events = await self.downloader.download_files(unique_events, update_progress_bar, game_id = game_id,
+                                                          proxy = settings.proxy)
+
+        file_paths = dict(zip(unique_events['EVENT_NUM'], unique_events['FILE_PATH']))
+        return [[file_paths[num] for num in nums] for nums in job_event_nums]
+
+    async def make_highlights(self, jobs, update_progress_bar, settings = None):
+        """Makes the highlight video of every job.
+
+        Args:
+            jobs (list): List of BatchJob objects or (player_id, game_id, actions[, action_options]) tuples.
+            update_progress_bar (Callable): Function to update the progress bar.
+            settings (JobSettings, optional): Settings of every video, they share their clips. Defaults to the default settings.
+
+        Returns:
+            dict: Maps each job to the path of its video, or to None if the job had no clips.
+        """
+        settings = settings or JobSettings()
+        jobs = [BatchJob.from_value(job) for job in jobs]
+        jobs_by_game = self.group_jobs_by_game(jobs)
+
+        job_clip_paths = {}
+        for i, (game_id, game_jobs) in enumerate(jobs_by_game.items()):
+            print(f"Getting clips for game {game_id} ({i + 1}/{len(jobs_by_game)})...")
+            clip_paths = await self.fetch_game_clips(game_id, game_jobs, update_progress_bar, settings)
+            job_clip_paths.update(zip(game_jobs, clip_paths))
+
+        output_paths = {}
+        for job in jobs:
+            clip_paths = job_clip_paths[job]
+            if not clip_paths:
+                print(f"No clips found for {job}, skipping.")
+                output_paths[job] = None
+                continue
+            output_path = job.output_path or os.path.join(self.data_dir, f"{job.player_id}_{job.game_id}.mp4")
+            update_progress_bar(0, f"Editing video for player {job.player_id}, game {job.game_id}...")
+            await self.video_maker.make_final_vid(clip_paths, output_path, settings)
+            output_paths[job] = output_path
+        return output_paths
@@ -0,0 +1,131 @@
+"""Collects the results and progress of the events of one job.
+
+This module contains the class EventRecords, which stores a value per event and column in
+plain lists indexed by the position of the event, and the class ProgressTracker, which counts
+the finished steps of one job and reports them to the progress bar.
+
+Both are only used from the event loop thread, and no await happens between reading and
+writing their values, so the tasks of a job can update them without a lock. Each job makes
+its own, so two jobs running at the same time don't share a counter.
+
+Typical usage example:
+    records = EventRecords(len(event_ids), ['VIDEO_LINK'])
+    progress = ProgressTracker(len(event_ids), update_progress_bar)
+    records.set(position, 'VIDEO_LINK', video_link)
+    progress.advance(f"Get link for: {row.description}")
+    event_ids = records.to_frame(event_ids)
+"""
+
+class EventRecords:
+    """Values of some columns for each event of a job, indexed by the position of the event.
+
+    Setting a value is a list assignment, instead of a DataFrame lookup of the event's row,
+    and the columns are written to the DataFrame once with to_frame().
+
+    Args:
+        num_events (int): Number of events.
+        columns (list): Names of the columns.
+        default (object, optional): Value of the events that weren't set. Defaults to "".
+
+    Attributes:
+        num_events (int): Number of events.
+        values (dict): Maps each column name to the list of its values.
+        default (object): Value of the events that weren't set.
+    """
+    __slots__ = ('num_events', 'values', 'default')
+
+    def __init__(self, num_events, columns, default = ''):
+        self.num_events = num_events
+        self.default = default
+        self.values = {column: [default] * num_events for column in columns}
+
+    def set(self, position, column, value):
+        """Sets the value of an event.
+
+        Args:
+            position (int): Position of the event in the DataFrame of the job.
+            column (str): Name of the column.
+            value (object): The value.
+        """
+        self.values[column][position] = value
+
+    def get(self, position, column):
+        """Gets the value of an event.
+
+        Args:
+            position (int): Position of the event in the DataFrame of the job.
+            column (str): Name of the column.
+
+        Returns:
+            object: The value, or the default if it wasn't set.
+        """
+        return self.values[column][position]
+
+    def count(self, column):
+        """Counts the events whose value was set.
+
+        Args:
+            column (str): Name of the column.
+
+        Returns:
+            int: Number of events with a value other than the default.
+        """
+        return sum(1 for value in self.values[column] if value != self.default)
+
+    def to_frame(self, event_ids):
+        """Writes every column to the DataFrame of the job.
+
+        Args:
+            event_ids (pandas.DataFrame): DataFrame of the job, with one row per event in the same order.
+
+        Returns:
+            pandas.DataFrame: event_ids with the columns added.
+        """
+        for column, values in self.values.items():
+            event_ids[column] = values
+        return event_ids
+
+class ProgressTracker:
+    """Counts the finished steps of a job and reports the progress.
+
+    Args:
+        total (int): Number of steps of the job.
+        update_progress_bar (Callable): Function to update the progress bar, called with a percentage and a description.
+
+    Attributes:
+        total (int): Number of steps of the job.
+        done (int): Number of finished steps.
+        update_progress_bar (Callable): Function to update the progress bar.
+    """
+    __slots__ = ('total', 'done', 'update_progress_bar')
+
+    def __init__(self, total, update_progress_bar):
+        self.total = total
+        self.done = 0
+        self.update_progress_bar = update_progress_bar
+
+    def percent(self):
+        """Gets the progress of the job.
+
+        Returns:
+            int: Percentage of the steps that are finished.
+        """
+        return int(self.done / self.total * 100) if self.total else 100
+
+    def advance(self, description = None):
+        """Counts one finished step, and reports the progress if there is a description.
+
+        Args:
+            description (str, optional): Text displayed above the progress bar. Defaults to not reporting.
+        """
+        self.done += 1
+        if description is not None:
+            self.report(description)
+
+    def report(self, description):
+        """Reports the progress to the progress bar.
+
+        Args:
+            description (str): Text displayed above the progress bar.
+        """
+        self.update_progress_bar(self.percent(), description)
@@ -0,0 +1,106 @@
+"""Application-wide HTTP client shared by everything that talks to the NBA website.
+
+This module contains the class HttpClient, which owns one long-lived aiohttp session
+with a tuned connection pool, and the per-host rate limiters used with it, so connections,
+DNS lookups and keep-alive state are reused between jobs and between the link and download phases.
+
+Typical usage example:
+    http_client = HttpClient()
+    session = http_client.get_session()
+    ...
+    await http_client.close()
+"""
+import asyncio
+import aiohttp
+from NBAHighlightsMaker.common.rate_limiter import RateLimiterRegistry
+from NBAHighlightsMaker.common.retry import RetryPolicy
+
+def get_accept_encoding():
+    """Gets the content encodings aiohttp can decode with the installed packages.
+
+    Returns:
+        str: Value for the Accept-Encoding header, i.e "gzip, deflate, br".
+    """
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+class HttpClient:
+    """Long-lived pooled HTTP client.
+
+    The aiohttp session is created on first use inside the running event loop and kept until
+    close() is called. Its connector caps connections overall and per host, caches DNS lookups
+    and keeps idle connections alive, so later requests to the same host skip the TCP and TLS handshakes.
+
+    Args:
+        rate_limiters (RateLimiterRegistry, optional): Per-host rate limiters used with this client. Defaults to a new registry.
+        retry_policy (RetryPolicy, optional): Retry policy and circuit breakers used with this client. Defaults to a new policy.
+        limit (int, optional): Maximum number of open connections. Defaults to 20.
+        limit_per_host (int, optional): Maximum number of open connections per host. Defaults to 8.
+        dns_cache_ttl (int, optional): Seconds DNS lookups are cached. Defaults to 10 minutes.
+        keepalive_timeout (float, optional): Seconds idle connections are kept open. Defaults to 60.
+
+    Attributes:
+        rate_limiters (RateLimiterRegistry): Per-host rate limiters used with this client.
+        retry_policy (RetryPolicy): Retry policy and circuit breakers used with this client.
+        limit (int): Maximum number of open connections.
+        limit_per_host (int): Maximum number of open connections per host.
+        dns_cache_ttl (int): Seconds DNS lookups are cached.
+        keepalive_timeout (float): Seconds idle connections are kept open.
+        accept_encoding (str): Content encodings the session can decode, for the Accept-Encoding header.
+        session (aiohttp.ClientSession): The shared session, None until first used.
+        loop (asyncio.AbstractEventLoop): Event loop the session was created in.
+    """
+    def __init__(self, rate_limiters = None, limit = 20, limit_per_host = 8,
+                 dns_cache_ttl = 10 * 60, keepalive_timeout = 60, retry_policy = None):
+        self.rate_limiters = rate_limiters or RateLimiterRegistry()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.accept_encoding = get_accept_encoding()
+        self.session = None
+        self.loop = None
+
+    def get_session(self):
+        """Gets the shared session, creating it if needed.
+
+        A new session is made if the previous one was closed or belongs to another event loop.
+
+        Returns:
+            aiohttp.ClientSession: The shared session.
+        """
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit = self.limit,
+                limit_per_host = self.limit_per_host,
+                use_dns_cache = True,
+                ttl_dns_cache = self.dns_cache_ttl,
+                keepalive_timeout = self.keepalive_timeout,
+            )
+            # responses are decompressed by aiohttp, so only ask for encodings it can decode
+            self.session = aiohttp.ClientSession(
+                connector = connector,
+                auto_decompress = True,
+                headers = {'Accept-Encoding': self.accept_encoding},
+            )
+            self.loop = loop
+        return self.session
+
+    async def close(self):
+        """Closes the session and its pooled connections.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.loop = None
@@ -0,0 +1,62 @@
+"""Settings picked for one highlight video.
+
+This module contains the class JobSettings, the rendition and render settings of one job. The
+settings are passed along with the job to the link, download and editing steps, instead of being
+written on the DataRetriever, Downloader and VideoMaker that every job shares, so a job started
+with other settings doesn't change the ones of a job that is still running.
+
+Typical usage example:
+    settings = JobSettings(proxy = True, render_mode = 'smart', encoder_profile = 'preview')
+    await pipeline.run(game_id, event_ids, update_progress_bar, settings = settings)
+"""
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE
+
+class JobSettings:
+    """Rendition and render settings of one highlight video.
+
+    Args:
+        proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
+        fades (bool, optional): Whether to fade each clip in and out. Defaults to True.
+        render_mode (str, optional): Key of RENDER_MODES, how the final video is encoded. Defaults to "moviepy".
+        encoder_profile (str, optional): Key of ENCODER_PROFILES, the encoder settings. Defaults to DEFAULT_PROFILE.
+        audio (bool, optional): Whether the final video has the audio of the clips. Defaults to True.
+
+    Attributes:
+        proxy (bool): Whether to download the smallest rendition, for previews.
+        fades (bool): Whether to fade each clip in and out. Without fades, matching clips are joined without encoding.
+        render_mode (str): Key of RENDER_MODES, how the final video is encoded.
+        encoder_profile (str): Key of ENCODER_PROFILES, the encoder settings of the encoded frames in every render mode.
+        audio (bool): Whether the final video has the audio of the clips. Without audio, it isn't read at all.
+    """
+    __slots__ = ('proxy', 'fades', 'render_mode', 'encoder_profile', 'audio')
+
+    def __init__(self, proxy = False, fades = True, render_mode = 'moviepy', encoder_profile = DEFAULT_PROFILE, audio = True):
+        self.proxy = proxy
+        self.fades = fades
+        self.render_mode = render_mode
+        self.encoder_profile = encoder_profile
+        self.audio = audio
+
+    def get_encoder_profile(self):
+        """Gets the encoder settings of the final video.
+
+        Returns:
+            EncoderProfile: The profile named by encoder_profile.
+        """
+        return ENCODER_PROFILES[self.encoder_profile]
+
+    def renders_files(self):
+        """Checks whether the final video is made from the clip files without MoviePy opening them.
+
+        The files are handed to ffmpeg in every render mode but "moviepy", and without fades
+        they may be joined without encoding. The clips only have to be prepared with
+        VideoMaker.prepare_clip() if VideoMaker.render_files() can't make the video.
+
+        Returns:
+            bool: True if the clip files should go to VideoMaker.make_final_vid() instead of being prepared.
+        """
+        return self.render_mode != 'moviepy' or not self.fades
+
+    def __repr__(self):
+        return (f"JobSettings(proxy={self.proxy}, fades={self.fades}, render_mode={self.render_mode!r}, "
+                f"encoder_profile={self.encoder_profile!r}, audio={self.audio})")
@@ -0,0 +1,292 @@
+"""Limits how fast and how many requests are sent to each host.
+
+This module contains the class AdaptiveRateLimiter, a token bucket combined with a limit
+on requests in flight, which speeds up while requests succeed and backs off when the host
+answers with 429 or times out, and the class RateLimiterRegistry, which keeps one limiter per host.
+
+Typical usage example:
+    limiter = rate_limiters.get(url)
+    async with limiter.slot():
+        async with session.get(url) as response:
+            ...
+    limiter.record_success()
+"""
+import time
+import asyncio
+import contextlib
+import collections
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+
+# starting settings for the hosts we talk to, other hosts use DEFAULT_SETTINGS
+HOST_SETTINGS = {
+    # stats api is strict, start slow
+    'stats.nba.com': {'rate': 2.0, 'max_rate': 8.0, 'concurrency': 3, 'max_concurrency': 6},
+    # video cdn
+    'videos.nba.com': {'rate': 4.0, 'max_rate': 20.0, 'concurrency': 2, 'max_concurrency': 6},
+}
+DEFAULT_SETTINGS = {'rate': 2.0, 'max_rate': 10.0, 'concurrency': 2, 'max_concurrency': 4}
+
+def parse_retry_after(value):
+    """Parses the value of a Retry-After header.
+
+    Args:
+        value (str): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_date.timestamp() - time.time())
+
+class AdaptiveRateLimiter:
+    """Adaptive rate and concurrency limit for one host.
+
+    Requests take a token from a bucket refilled at "rate" tokens per second and a slot
+    out of "concurrency" slots. The limits follow AIMD: every success raises the rate a little
+    and every "concurrency" successes add one slot, while a 429 or a timeout halves both and
+    pauses the host for a cooldown (or for as long as the Retry-After header says).
+
+    Args:
+        host (str): Host the limiter is for.
+        rate (float, optional): Starting requests per second. Defaults to 2.0.
+        min_rate (float, optional): Lowest requests per second. Defaults to 0.2.
+        max_rate (float, optional): Highest requests per second. Defaults to 10.0.
+        concurrency (int, optional): Starting number of requests in flight. Defaults to 2.
+        min_concurrency (int, optional): Lowest number of requests in flight. Defaults to 1.
+        max_concurrency (int, optional): Highest number of requests in flight. Defaults to 4.
+        rate_increase (float, optional): Requests per second added after each success. Defaults to 0.25.
+        backoff_factor (float, optional): Factor the rate and concurrency are multiplied by on a 429 or timeout. Defaults to 0.5.
+        cooldown (float, optional): Seconds the host is paused after a 429 without Retry-After. Defaults to 3.0.
+
+    Attributes:
+        host (str): Host the limiter is for.
+        rate (float): Current requests per second.
+        concurrency (int): Current number of requests allowed in flight.
+        in_flight (int): Number of requests in flight.
+        waiters (collections.deque): Futures of the requests waiting for a slot.
+        next_token (float): time.monotonic() value when the next token is available.
+        paused_until (float): time.monotonic() value until which no request is started.
+        successes (int): Number of successful requests.
+        throttles (int): Number of 429 responses.
+        timeouts (int): Number of timed out requests.
+        bytes_received (int): Number of bytes received, recorded with record_throughput().
+        transfer_time (float): Seconds spent receiving those bytes.
+    """
+    def __init__(self, host, rate = 2.0, min_rate = 0.2, max_rate = 10.0,
+                 concurrency = 2, min_concurrency = 1, max_concurrency = 4,
+                 rate_increase = 0.25, backoff_factor = 0.5, cooldown = 3.0):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate_increase = rate_increase
+        self.backoff_factor = backoff_factor
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.next_token = 0.0
+        self.paused_until = 0.0
+        self.successes_since_increase = 0
+
+        self.successes = 0
+        self.throttles = 0
+        self.timeouts = 0
+        self.bytes_received = 0
+        self.transfer_time = 0.0
+
+    def try_acquire_slot(self):
+        """Takes a slot if fewer than "concurrency" requests are in flight and nobody is waiting, without waiting.
+
+        Returns:
+            bool: True if a slot was taken, to be given back with release().
+        """
+        if self.in_flight < self.concurrency and not self.waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    async def acquire_slot(self):
+        """Waits until fewer than "concurrency" requests are in flight, then takes a slot.
+        """
+        if self.try_acquire_slot():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            # release() hands the slot over by counting it before waking us
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self.waiters.remove(waiter)
+            raise
+
+    async def wait_for_token(self):
+        """Waits for the next token of the bucket and for the host to not be paused.
+
+        Each caller reserves the next free start time right away, so waiting requests
+        start one after another at "rate" requests per second without needing a lock.
+        Up to one second's worth of unused tokens can be spent as a burst.
+        """
+        while True:
+            now = time.monotonic()
+            start = max(self.next_token, now - 1.0, self.paused_until)
+            self.next_token = start + 1.0 / self.rate
+            if start > now:
+                await asyncio.sleep(start - now)
+            # the host may have been paused while we were waiting
+            if time.monotonic() >= self.paused_until:
+                return
+
+    async def acquire(self):
+        """Waits for a free slot, for the host to not be paused and for a token, then takes them.
+        """
+        await self.acquire_slot()
+        try:
+            await self.wait_for_token()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        """Gives back a slot taken with acquire().
+        """
+        self.in_flight -= 1
+        self.wake_waiters()
+
+    def wake_waiters(self):
+        """Hands free slots to the requests waiting for one, in the order they started waiting.
+        """
+        while self.waiters and self.in_flight < self.concurrency:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Context manager holding a slot and a token for the duration of one request.
+        """
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def record_success(self):
+        """Raises the rate, and the concurrency after enough successes (additive increase).
+        """
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.rate_increase)
+        self.successes_since_increase += 1
+        if self.successes_since_increase >= self.concurrency and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self.successes_since_increase = 0
+            self.wake_waiters()
+
+    def back_off(self, pause):
+        """Cuts the rate and concurrency (multiplicative decrease) and pauses the host.
+
+        Args:
+            pause (float): Seconds no new request is started.
+        """
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+        self.concurrency = max(self.min_concurrency, int(self.concurrency * self.backoff_factor))
+        self.successes_since_increase = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self.next_token = max(self.next_token, self.paused_until)
+
+    def record_throttle(self, retry_after = None):
+        """Backs off after a 429 response.
+
+        Args:
+            retry_after (float, optional): Seconds from the Retry-After header. Defaults to the cooldown.
+        """
+        self.throttles += 1
+        self.back_off(self.cooldown if retry_after is None else retry_after)
+
+    def record_timeout(self):
+        """Backs off after a request timed out, pausing for half the cooldown.
+        """
+        self.timeouts += 1
+        self.back_off(self.cooldown / 2)
+
+    def record_throughput(self, num_bytes, seconds):
+        """Records bytes received by a request, used for the throughput metric.
+
+        Args:
+            num_bytes (int): Number of bytes received.
+            seconds (float): Seconds spent receiving them.
+        """
+        self.bytes_received += num_bytes
+        self.transfer_time += seconds
+
+    def metrics(self):
+        """Gets the current state of the limiter.
+
+        Returns:
+            dict: The host, rate, concurrency, in_flight, successes, throttles, timeouts and throughput (bytes per second).
+        """
+        return {
+            'host': self.host,
+            'rate': round(self.rate, 2),
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'successes': self.successes,
+            'throttles': self.throttles,
+            'timeouts': self.timeouts,
+            'throughput': self.bytes_received / self.transfer_time if self.transfer_time > 0 else 0.0,
+        }
+
+class RateLimiterRegistry:
+    """Keeps one AdaptiveRateLimiter per host, so every class talking to a host shares its limits.
+
+    Args:
+        host_settings (dict, optional): Maps hosts to AdaptiveRateLimiter keyword arguments. Defaults to HOST_SETTINGS.
+
+    Attributes:
+        host_settings (dict): Maps hosts to AdaptiveRateLimiter keyword arguments.
+        limiters (dict): Maps hosts to their limiter.
+    """
+    def __init__(self, host_settings = None):
+        self.host_settings = HOST_SETTINGS if host_settings is None else host_settings
+        self.limiters = {}
+
+    def get(self, url):
+        """Gets the limiter for the host of a URL, creating it if needed.
+
+        Args:
+            url (str): URL or host name.
+
+        Returns:
+            AdaptiveRateLimiter: The limiter for the host.
+        """
+        host = urlsplit(url).hostname if '://' in url else url
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(host, **self.host_settings.get(host, DEFAULT_SETTINGS))
+            self.limiters[host] = limiter
+        return limiter
+
+    def metrics(self):
+        """Gets the metrics of every limiter.
+
+        Returns:
+            list: One metrics dict per host.
+        """
+        return [limiter.metrics() for limiter in self.limiters.values()]
@@ -0,0 +1,98 @@
+"""Picks which size of a clip to download.
+
+The videoeventsasset endpoint gives each event's video in up to three renditions: "surl" (small),
+"murl" (medium) and "lurl" (large). This module contains the class RenditionSelector, which picks
+the smallest rendition that is still at least as tall as the final video, or the smallest one
+for quick previews, instead of always downloading the large one and scaling it down.
+
+Typical usage example:
+    renditions = RenditionSelector(target_height = 720)
+    rendition = renditions.select(links, proxy = settings.proxy)
+    video_link = links[rendition]
+"""
+import re
+
+# smallest to largest
+RENDITIONS = ('surl', 'murl', 'lurl')
+# rendition used when nothing else is known, the one the app always downloaded
+DEFAULT_RENDITION = 'lurl'
+# heights assumed when the link doesn't say, kept low so a rendition that might be too small isn't picked
+DEFAULT_HEIGHTS = {'surl': 270, 'murl': 540, 'lurl': 720}
+
+def get_links(video_urls):
+    """Gets the link of each rendition from an entry of the videoUrls of a videoeventsasset response.
+
+    Args:
+        video_urls (dict): Entry of videoUrls, with the keys surl, murl and lurl among others.
+
+    Returns:
+        dict: Maps each rendition that has a link to the link.
+    """
+    return {rendition: video_urls[rendition] for rendition in RENDITIONS if video_urls.get(rendition)}
+
+def get_height(rendition, video_link):
+    """Gets the height of a rendition, from the "_1280x720" part of the link if it has one.
+
+    Args:
+        rendition (str): "surl", "murl" or "lurl".
+        video_link (str): Link of the rendition.
+
+    Returns:
+        int: Height in pixels.
+    """
+    match = re.search(r'(\d{3,4})x(\d{3,4})', video_link or '')
+    if match:
+        return int(match.group(2))
+    return DEFAULT_HEIGHTS.get(rendition, 0)
+
+class RenditionSelector:
+    """Picks the rendition of each clip to download.
+
+    The rendition is carried with the link of each download, so the clip store can key the clip by it.
+    Whether a job wants previews is passed with each call, as the selector is shared by every job.
+
+    Args:
+        target_height (int, optional): Height of the final video in pixels. Defaults to 720.
+
+    Attributes:
+        target_height (int): Height of the final video in pixels.
+    """
+    def __init__(self, target_height = 720):
+        self.target_height = target_height
+
+    def select(self, links, proxy = False):
+        """Picks the rendition to download.
+
+        Args:
+            links (dict): Maps renditions to their link.
+            proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
+
+        Returns:
+            str: The smallest rendition if proxy is set, else the smallest one at least target_height tall,
+                else the tallest one.
+
+        Raises:
+            ValueError: If there is no link.
+        """
+        available = [rendition for rendition in RENDITIONS if rendition in links]
+        if not available:
+            raise ValueError("No video link in the response.")
+        if proxy:
+            return available[0]
+        tall_enough = [rendition for rendition in available
+                       if get_height(rendition, links[rendition]) >= self.target_height]
+        return tall_enough[0] if tall_enough else max(available, key = lambda rendition: get_height(rendition, links[rendition]))
+
+    def get_stored_renditions(self, proxy = False):
+        """Gets the renditions of a stored clip that can be used instead of downloading, best first.
+
+        Args:
+            proxy (bool, optional): Whether the job wants previews, for which any rendition will do. Defaults to False.
+
+        Returns:
+            list: Every rendition smallest first for previews, else the renditions assumed tall enough, smallest first.
+        """
+        if proxy:
+            return list(RENDITIONS)
+        tall_enough = [rendition for rendition in RENDITIONS if DEFAULT_HEIGHTS[rendition] >= self.target_height]
+        return tall_enough or [DEFAULT_RENDITION]
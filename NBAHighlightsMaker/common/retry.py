@@ -0,0 +1,355 @@
+"""Retries failed requests with backoff, and stops sending requests to hosts that are down.
+
+This module contains the class RetryPolicy, which runs one try of a request at a time inside
+a slot of the host's rate limiter and sleeps between tries with exponential backoff and jitter,
+or for as long as the Retry-After header says, after giving the slot back. Each host has a
+CircuitBreaker, which fails requests right away once the host keeps failing, and every try is
+recorded as an AttemptRecord, so callers and metrics get the timing and outcome of each one.
+
+Typical usage example:
+    async def attempt():
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise RetryableError(f"Response Status: {response.status}", response.status,
+                                     parse_retry_after(response.headers.get('Retry-After')))
+            return await response.json()
+    data = await retry_policy.run(attempt, limiter, f"getting link for event {event_num}")
+"""
+import time
+import random
+import asyncio
+import collections
+import aiohttp
+from NBAHighlightsMaker.common.rate_limiter import parse_retry_after
+
+class RetryableError(Exception):
+    """Raised by a try that got an answer it can't use, i.e an error status or an incomplete download.
+
+    Args:
+        reason (str): What went wrong, i.e "Response Status: 503".
+        status (int, optional): HTTP status of the response.
+        retry_after (float, optional): Seconds from the Retry-After header.
+
+    Attributes:
+        reason (str): What went wrong.
+        status (int): HTTP status of the response, or None.
+        retry_after (float): Seconds from the Retry-After header, or None.
+    """
+    def __init__(self, reason, status = None, retry_after = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+class RetryError(Exception):
+    """Raised when a request failed on every try, or wasn't sent because the host is down.
+
+    Args:
+        message (str): Error message, with one line per failed try.
+        attempts (list): AttemptRecord of each try.
+
+    Attributes:
+        attempts (list): AttemptRecord of each try.
+    """
+    def __init__(self, message, attempts):
+        super().__init__(message)
+        self.attempts = attempts
+
+class CircuitOpenError(RetryError):
+    """Raised without sending the request when the circuit breaker of the host is open.
+    """
+
+class AttemptRecord:
+    """Timing and outcome of one try of a request.
+
+    Attributes:
+        number (int): Number of the try, starting at 1.
+        host (str): Host the request was sent to.
+        outcome (str): "success", "throttled", "timeout", "server_error", "connection_error", "http_error", "error" or "circuit_open".
+        status (int): HTTP status of the response, or None.
+        error (str): Error message, or None for a success.
+        elapsed (float): Seconds the try took, not counting the wait for the rate limiter.
+        delay (float): Seconds slept before the next try, or None if there wasn't one.
+    """
+    __slots__ = ('number', 'host', 'outcome', 'status', 'error', 'elapsed', 'delay')
+
+    def __init__(self, number, host, outcome, status = None, error = None, elapsed = 0.0, delay = None):
+        self.number = number
+        self.host = host
+        self.outcome = outcome
+        self.status = status
+        self.error = error
+        self.elapsed = elapsed
+        self.delay = delay
+
+    def to_dict(self):
+        """Gets the record as a dict.
+
+        Returns:
+            dict: Every attribute of the record.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def describe(self):
+        """Describes the try for an error message.
+
+        Returns:
+            str: i.e "Try #2 failed: Response Status: 503 (server_error) after 0.41s."
+        """
+        if self.outcome == 'success':
+            return f"Try #{self.number} succeeded after {self.elapsed:.2f}s."
+        return f"Try #{self.number} failed: {self.error} ({self.outcome}) after {self.elapsed:.2f}s."
+
+class CircuitBreaker:
+    """Stops sending requests to a host after too many failures in a row.
+
+    The breaker is closed while the host works. After failure_threshold failures in a row it opens,
+    and requests fail right away for reset_timeout seconds. Then it is half open: one request is let
+    through, which closes the breaker if it succeeds and opens it again if it fails.
+    Only failures that say the host is down count, not throttling or missing files.
+
+    Args:
+        host (str): Host the breaker is for.
+        failure_threshold (int, optional): Failures in a row that open the breaker. Defaults to 5.
+        reset_timeout (float, optional): Seconds the breaker stays open. Defaults to 30.0.
+
+    Attributes:
+        host (str): Host the breaker is for.
+        failure_threshold (int): Failures in a row that open the breaker.
+        reset_timeout (float): Seconds the breaker stays open.
+        state (str): "closed", "open" or "half_open".
+        failures (int): Failures in a row.
+        opened_at (float): time.monotonic() value when the breaker last opened.
+        probing (bool): True while the one request of the half open state is in flight.
+    """
+    def __init__(self, host, failure_threshold = 5, reset_timeout = 30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self):
+        """Checks if a request can be sent to the host.
+
+        Returns:
+            bool: False while the breaker is open, or half open with its one request in flight.
+        """
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+            self.probing = False
+        if self.state == 'half_open':
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+        return self.state == 'closed'
+
+    def record_success(self):
+        """Closes the breaker after a request succeeded.
+        """
+        self.state = 'closed'
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        """Counts a failure, opening the breaker if there were too many in a row or the half open request failed.
+        """
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                print(f"{self.host} looks down, failing its requests for {self.reset_timeout:.0f}s.")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def release(self):
+        """Lets another request through if the half open request ended without a success or a failure.
+        """
+        self.probing = False
+
+class RetryPolicy:
+    """Retry loop shared by every request to the NBA website.
+
+    A try is run inside a slot of the host's rate limiter, and the slot is given back before sleeping,
+    so other requests to the host can go on during the backoff. The delay before try n+1 is drawn
+    between half and all of base_delay * 2 ** (n - 1), capped at max_delay, and is at least the
+    Retry-After of a 429 response. Statuses in non_retryable_statuses fail right away.
+
+    Args:
+        max_attempts (int, optional): Number of tries of a request. Defaults to 3.
+        base_delay (float, optional): Seconds of the first backoff. Defaults to 1.0.
+        max_delay (float, optional): Longest backoff in seconds. Defaults to 30.0.
+        failure_threshold (int, optional): Failures in a row that open the circuit breaker of a host. Defaults to 5.
+        reset_timeout (float, optional): Seconds the circuit breaker of a host stays open. Defaults to 30.0.
+        non_retryable_statuses (tuple, optional): HTTP statuses that aren't retried. Defaults to (404, 410).
+        history_size (int, optional): Number of recent tries kept for the metrics. Defaults to 1000.
+
+    Attributes:
+        max_attempts (int): Number of tries of a request.
+        base_delay (float): Seconds of the first backoff.
+        max_delay (float): Longest backoff in seconds.
+        failure_threshold (int): Failures in a row that open the circuit breaker of a host.
+        reset_timeout (float): Seconds the circuit breaker of a host stays open.
+        non_retryable_statuses (tuple): HTTP statuses that aren't retried.
+        breakers (dict): Maps hosts to their CircuitBreaker.
+        history (collections.deque): AttemptRecord of the most recent tries.
+    """
+    def __init__(self, max_attempts = 3, base_delay = 1.0, max_delay = 30.0, failure_threshold = 5,
+                 reset_timeout = 30.0, non_retryable_statuses = (404, 410), history_size = 1000):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.non_retryable_statuses = non_retryable_statuses
+        self.breakers = {}
+        self.history = collections.deque(maxlen = history_size)
+
+    def get_breaker(self, host):
+        """Gets the circuit breaker of a host, creating it if needed.
+
+        Args:
+            host (str): Host name.
+
+        Returns:
+            CircuitBreaker: The breaker of the host.
+        """
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+            self.breakers[host] = breaker
+        return breaker
+
+    def get_delay(self, number, retry_after = None):
+        """Gets how long to sleep after a failed try.
+
+        Args:
+            number (int): Number of the try that failed, starting at 1.
+            retry_after (float, optional): Seconds from the Retry-After header.
+
+        Returns:
+            float: Seconds to sleep.
+        """
+        backoff = min(self.max_delay, self.base_delay * 2 ** (number - 1))
+        delay = random.uniform(backoff / 2, backoff)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def classify(error):
+        """Sorts the error of a failed try into an outcome.
+
+        Args:
+            error (Exception): The error raised by the try.
+
+        Returns:
+            tuple: (outcome, HTTP status or None, Retry-After seconds or None, error message).
+        """
+        if isinstance(error, RetryableError):
+            status, retry_after, message = error.status, error.retry_after, error.reason
+        elif isinstance(error, aiohttp.ClientResponseError):
+            # i.e a segment of a download that got an error status
+            status = error.status
+            retry_after = parse_retry_after(error.headers.get('Retry-After')) if error.headers else None
+            message = f"Response Status: {error.status}"
+        elif isinstance(error, asyncio.TimeoutError):
+            return 'timeout', None, None, "Timeout error."
+        elif isinstance(error, aiohttp.ClientConnectionError):
+            return 'connection_error', None, None, f"Client Connection error: {error}"
+        elif isinstance(error, aiohttp.ClientError):
+            return 'connection_error', None, None, f"Client error: {error}"
+        else:
+            return 'error', None, None, f"Unexpected error: {error}"
+        if status == 429:
+            return 'throttled', status, retry_after, message
+        if status is not None and status >= 500:
+            return 'server_error', status, retry_after, message
+        if status is not None:
+            return 'http_error', status, retry_after, message
+        return 'error', status, retry_after, message
+
+    async def run(self, attempt, limiter, description):
+        """Runs a request until a try succeeds or every try failed.
+
+        Args:
+            attempt (Callable): Coroutine function making one try. It returns the result, or raises
+                RetryableError, an aiohttp error or asyncio.TimeoutError if the try failed.
+            limiter (AdaptiveRateLimiter): Rate limiter of the host, told about successes, throttling and timeouts.
+            description (str): What the request does, for the messages, i.e "getting link for event 8: 3PT Jump Shot".
+
+        Returns:
+            object: The result of the successful try.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker of the host is open.
+            RetryError: If every try failed, or one failed with a status that isn't retried.
+        """
+        breaker = self.get_breaker(limiter.host)
+        attempts = []
+        for number in range(1, self.max_attempts + 1):
+            if not breaker.allow():
+                record = AttemptRecord(number, limiter.host, 'circuit_open', error = f"{limiter.host} is down.")
+                attempts.append(record)
+                self.history.append(record)
+                raise CircuitOpenError(f"Stopped {description}: {limiter.host} is not responding.\n\n"
+                                       + "\n".join(record.describe() for record in attempts), attempts)
+            try:
+                async with limiter.slot():
+                    start_time = time.monotonic()
+                    try:
+                        result = await attempt()
+                    except Exception as e:
+                        outcome, status, retry_after, message = self.classify(e)
+                    else:
+                        record = AttemptRecord(number, limiter.host, 'success', elapsed = time.monotonic() - start_time)
+                        attempts.append(record)
+                        self.history.append(record)
+                        limiter.record_success()
+                        breaker.record_success()
+                        return result
+            except asyncio.CancelledError:
+                # a half open breaker must not wait forever for a request that was cancelled
+                breaker.release()
+                raise
+            record = AttemptRecord(number, limiter.host, outcome, status, message, time.monotonic() - start_time)
+            attempts.append(record)
+            self.history.append(record)
+            print(f"{description}: {record.describe()}")
+            if outcome == 'throttled':
+                # slow down and pause every request to the host
+                limiter.record_throttle(retry_after)
+                breaker.release()
+            elif outcome == 'timeout':
+                limiter.record_timeout()
+                breaker.record_failure()
+            elif outcome in ('server_error', 'connection_error'):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            if status in self.non_retryable_statuses or number == self.max_attempts:
+                break
+            # sleep without holding the slot, so healthy requests can use it
+            record.delay = self.get_delay(number, retry_after)
+            await asyncio.sleep(record.delay)
+        print(f"Max retries exceeded while {description}. Skipping.")
+        raise RetryError(f"Max retries exceeded while {description}.\n\n"
+                         + "\n".join(record.describe() for record in attempts), attempts)
+
+    def metrics(self):
+        """Gets the outcomes of the recent tries and the state of the circuit breakers.
+
+        Returns:
+            dict: 'outcomes' maps each host to a dict counting its tries by outcome, and 'breakers' maps each host to its state.
+        """
+        outcomes = {}
+        for record in self.history:
+            counts = outcomes.setdefault(record.host, {})
+            counts[record.outcome] = counts.get(record.outcome, 0) + 1
+        return {
+            'outcomes': outcomes,
+            'breakers': {host: breaker.state for host, breaker in self.breakers.items()},
+        }
@@ -0,0 +1,245 @@
+"""Keeps downloaded clips on disk between jobs.
+
+This module contains the class ClipStore, a content-addressed store of video clips. Each clip
+is saved once under the SHA-256 hash of its content and looked up by (game ID, event number,
+rendition), so a clip fetched for one video is reused by every later video that shows the same
+event. The store stays under a disk budget by evicting the least recently used clips.
+
+Typical usage example:
+    clip_store = ClipStore(os.path.join(data_dir, 'clips'))
+    file_path = clip_store.link(game_id, event_num, workspace_path)
+    if file_path is None:
+        ...download the clip to workspace_path...
+        file_path = clip_store.put(game_id, event_num, workspace_path)
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from NBAHighlightsMaker.common.renditions import DEFAULT_RENDITION
+
+class ClipStore:
+    """Persistent content-addressed store of clips with a disk budget.
+
+    Clips are saved as objects/<first 2 hex digits>/<sha256>.mp4 in store_dir, and the index
+    maps each "game_id:event_num:rendition" key to the hash, size and last access time of its clip.
+    Two keys with the same content share one object. Jobs get a clip with link(), which hard links
+    the object into the job's workspace, so clearing the workspace never touches the store.
+    If hard links aren't supported, the path of the object itself is used. Downloads are stored
+    with put() from worker threads, so the index is guarded by a lock.
+
+    Args:
+        store_dir (str): Directory of the store.
+        max_bytes (int, optional): Disk budget of the objects in bytes. Defaults to 2 GB.
+
+    Attributes:
+        store_dir (str): Directory of the store.
+        max_bytes (int): Disk budget of the objects in bytes.
+        index_path (str): Path of the JSON index.
+        index (dict): Maps each key to a dict with the keys sha256, size and last_access, None until loaded.
+        lock (threading.RLock): Lock guarding the index and the objects.
+    """
+    def __init__(self, store_dir, max_bytes = 2 * 1024 ** 3):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(store_dir, 'index.json')
+        self.index = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def make_key(game_id, event_num, rendition = DEFAULT_RENDITION):
+        """Makes the key of a clip.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used for the video.
+            rendition (str, optional): Rendition of the clip. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: Key of the form "0022401088:8:lurl".
+        """
+        return f"{game_id}:{int(event_num)}:{rendition}"
+
+    @staticmethod
+    def hash_file(file_path):
+        """Computes the SHA-256 hash of a file.
+
+        Args:
+            file_path (str): Path of the file.
+
+        Returns:
+            str: Hex digest of the content.
+        """
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def get_object_path(self, sha256):
+        """Gets the path of the object with the given hash.
+
+        Args:
+            sha256 (str): Hex digest of the content.
+
+        Returns:
+            str: Path of the object.
+        """
+        return os.path.join(self.store_dir, 'objects', sha256[:2], f"{sha256}.mp4")
+
+    def load(self):
+        """Loads the index, starting empty if the file is missing or corrupt.
+        """
+        self.index = {}
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding = 'utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read clip store index, starting with an empty store: {e}")
+
+    def save(self):
+        """Saves the index, i.e to keep the access times of the clips a job used.
+        """
+        with self.lock:
+            if self.index is not None:
+                self.write_index()
+
+    def write_index(self):
+        """Writes the index, to a temporary file first so a crash can't corrupt it. The lock must be held.
+        """
+        os.makedirs(self.store_dir, exist_ok = True)
+        with open(self.index_path + '.tmp', 'w', encoding = 'utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def get(self, game_id, event_num, rendition = DEFAULT_RENDITION):
+        """Gets the stored object of a clip and marks it as used.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used for the video.
+            rendition (str, optional): Rendition of the clip. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: Path of the object, or None if the clip isn't stored or its object is missing or truncated.
+        """
+        key = self.make_key(game_id, event_num, rendition)
+        with self.lock:
+            if self.index is None:
+                self.load()
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            object_path = self.get_object_path(entry['sha256'])
+            if not os.path.exists(object_path) or os.path.getsize(object_path) != entry['size']:
+                del self.index[key]
+                return None
+            entry['last_access'] = time.time()
+            return object_path
+
+    @staticmethod
+    def link_file(object_path, file_path):
+        """Makes file_path point to an object with a hard link.
+
+        Args:
+            object_path (str): Path of the object.
+            file_path (str): Path in the workspace of a job.
+
+        Returns:
+            str: file_path if it could be linked, else object_path, which is then used directly.
+        """
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        try:
+            os.link(object_path, file_path)
+            return file_path
+        except OSError:
+            return object_path
+
+    def link(self, game_id, event_num, file_path, rendition = DEFAULT_RENDITION):
+        """Puts a stored clip in the workspace of a job.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used for the video.
+            file_path (str): Path the job expects the clip at.
+            rendition (str, optional): Rendition of the clip. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: Path of the clip to use, or None if it isn't stored.
+        """
+        # hold the lock so the clip can't be evicted before it is linked
+        with self.lock:
+            object_path = self.get(game_id, event_num, rendition)
+            if object_path is None:
+                return None
+            return self.link_file(object_path, file_path)
+
+    def put(self, game_id, event_num, file_path, rendition = DEFAULT_RENDITION):
+        """Stores a downloaded clip and links it back into the workspace.
+
+        The file is moved into the store, or dropped if an object with the same content
+        already exists, then linked back to file_path. Least recently used clips are evicted
+        if the store goes over its budget.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used for the video.
+            file_path (str): Path of the downloaded clip in the workspace of a job.
+            rendition (str, optional): Rendition of the clip. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: Path of the clip to use.
+        """
+        sha256 = self.hash_file(file_path)
+        size = os.path.getsize(file_path)
+        object_path = self.get_object_path(sha256)
+        key = self.make_key(game_id, event_num, rendition)
+        with self.lock:
+            if self.index is None:
+                self.load()
+            if os.path.exists(object_path) and os.path.getsize(object_path) == size:
+                os.remove(file_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok = True)
+                os.replace(file_path, object_path)
+            self.index[key] = {'sha256': sha256, 'size': size, 'last_access': time.time()}
+            self.evict(keep = key)
+            self.write_index()
+            return self.link_file(object_path, file_path)
+
+    def get_total_size(self):
+        """Gets the size of all objects, counting objects shared by several keys once.
+
+        Returns:
+            int: Size in bytes.
+        """
+        sizes = {entry['sha256']: entry['size'] for entry in self.index.values()}
+        return sum(sizes.values())
+
+    def evict(self, keep = None):
+        """Removes the least recently used clips until the store is within its budget.
+
+        An object is deleted once no key uses it anymore. Jobs that linked it keep their own hard link.
+
+        Args:
+            keep (str, optional): Key that is never evicted, i.e the clip that was just stored.
+        """
+        total_size = self.get_total_size()
+        if total_size <= self.max_bytes:
+            return
+        for key in sorted(self.index, key = lambda key: self.index[key]['last_access']):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self.index.pop(key)
+            if any(other['sha256'] == entry['sha256'] for other in self.index.values()):
+                continue
+            total_size -= entry['size']
+            object_path = self.get_object_path(entry['sha256'])
+            if os.path.exists(object_path):
+                os.remove(object_path)
@@ -0,0 +1,158 @@
+"""Writes downloaded bytes to disk off the event loop, in large buffers.
+
+This module contains the class DownloadSink, which collects the chunks of a download in a
+buffer and hands each full buffer to a writer thread, which writes it with a positional write.
+One write is in flight while the next buffer fills up, so the download never waits for the disk
+unless the disk is slower than the network. When the length is known, the file is preallocated
+with posix_fallocate, so it isn't fragmented by many small appends.
+
+Typical usage example:
+    sink = DownloadSink(part_path, writer, offset = offset, length = length)
+    try:
+        async for chunk in response.content.iter_chunked(sink.chunk_size):
+            await sink.write(chunk)
+    finally:
+        await sink.close()
+"""
+import os
+import time
+import asyncio
+import threading
+
+# size of the chunks read from a response
+CHUNK_SIZE = 256 * 1024
+# bytes collected before a write, larger buffers mean fewer writes and less fragmentation
+BUFFER_SIZE = 1024 * 1024
+
+# os.pwrite doesn't exist on Windows, where a seek and a write are done under a lock instead
+seek_lock = threading.Lock()
+
+def write_at(fd, data, offset):
+    """Writes bytes at a position of a file, without moving a position shared with other writers.
+
+    Args:
+        fd (int): File descriptor opened for writing.
+        data (bytes): Bytes to write.
+        offset (int): Position in the file.
+    """
+    view = memoryview(data)
+    if hasattr(os, 'pwrite'):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        return
+    with seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while view:
+            view = view[os.write(fd, view):]
+
+class DownloadSink:
+    """Buffered writer of one download, or one segment of a download, into a file.
+
+    Args:
+        file_path (str): Path of the file, created if it doesn't exist.
+        writer (concurrent.futures.Executor): Executor whose thread writes the buffers.
+        offset (int, optional): Position of the first byte written. Defaults to 0.
+        length (int, optional): Length of the whole file, to preallocate it. Defaults to not preallocating.
+        truncate (bool, optional): Whether to empty the file first. Defaults to False.
+        chunk_size (int, optional): Size of the chunks to read from the response. Defaults to CHUNK_SIZE.
+        buffer_size (int, optional): Bytes collected before a write. Defaults to BUFFER_SIZE.
+
+    Attributes:
+        file_path (str): Path of the file.
+        writer (concurrent.futures.Executor): Executor whose thread writes the buffers.
+        chunk_size (int): Size of the chunks to read from the response.
+        buffer_size (int): Bytes collected before a write.
+        fd (int): File descriptor of the file, None once closed.
+        position (int): Position the buffer will be written at.
+        buffer (bytearray): Bytes not handed to the writer yet.
+        pending (asyncio.Future): The write in flight, or None.
+        preallocated (bool): Whether the file was preallocated to its whole length.
+        num_bytes (int): Number of bytes written through the sink.
+        start_time (float): time.monotonic() value when the sink was opened.
+    """
+    def __init__(self, file_path, writer, offset = 0, length = None, truncate = False,
+                 chunk_size = CHUNK_SIZE, buffer_size = BUFFER_SIZE):
+        self.file_path = file_path
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self.fd = os.open(file_path, flags)
+        self.position = offset
+        self.buffer = bytearray()
+        self.pending = None
+        self.preallocated = False
+        self.num_bytes = 0
+        self.start_time = time.monotonic()
+        if length is not None and length > offset and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self.fd, offset, length - offset)
+                self.preallocated = True
+            except OSError:
+                # i.e the file system doesn't support it
+                pass
+
+    async def write(self, data):
+        """Adds bytes to the buffer, handing it to the writer thread once it is full.
+
+        Args:
+            data (bytes): The next bytes of the download.
+        """
+        self.buffer += data
+        self.num_bytes += len(data)
+        if len(self.buffer) >= self.buffer_size:
+            await self.flush()
+
+    async def flush(self):
+        """Waits for the write in flight, then hands the buffer to the writer thread.
+        """
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            await pending
+        if not self.buffer:
+            return
+        data, self.buffer = bytes(self.buffer), bytearray()
+        position = self.position
+        self.position += len(data)
+        loop = asyncio.get_running_loop()
+        self.pending = loop.run_in_executor(self.writer, write_at, self.fd, data, position)
+
+    async def close(self):
+        """Writes what is left in the buffer and closes the file.
+
+        A preallocated file that didn't get all its bytes is cut back to the bytes written,
+        so its size still tells how much was downloaded. If the task is cancelled while the
+        last write is in flight, the file is closed once the writer thread is done with it.
+        """
+        try:
+            await self.flush()
+            if self.pending is not None:
+                await asyncio.shield(self.pending)
+        finally:
+            if self.pending is not None and not self.pending.done():
+                self.pending.add_done_callback(lambda future: self.close_fd())
+            else:
+                self.close_fd()
+
+    def close_fd(self):
+        """Cuts a preallocated file back to the bytes written and closes it.
+        """
+        if self.fd is None:
+            return
+        if self.preallocated and os.fstat(self.fd).st_size > self.position:
+            os.ftruncate(self.fd, self.position)
+        os.close(self.fd)
+        self.fd = None
+
+    def get_throughput(self):
+        """Gets the speed of the download so far.
+
+        Returns:
+            float: Bytes per second written through the sink since it was opened.
+        """
+        elapsed = time.monotonic() - self.start_time
+        return self.num_bytes / elapsed if elapsed > 0 else 0.0
@@ -6,128 +6,524 @@ and updating the dataframe with the file paths of the downloaded videos.
 """
 
 import os
+import time
 import asyncio
 import aiohttp
-import aiofiles
-import random
+from concurrent.futures import ThreadPoolExecutor
+from NBAHighlightsMaker.common.rate_limiter import parse_retry_after
+from NBAHighlightsMaker.common.http_client import HttpClient
+from NBAHighlightsMaker.common.retry import RetryableError
+from NBAHighlightsMaker.common.renditions import RenditionSelector, DEFAULT_RENDITION
+from NBAHighlightsMaker.downloader.partial_download import PartialDownload, ContentChangedError, parse_content_range
+from NBAHighlightsMaker.downloader.scheduler import DownloadScheduler
+from NBAHighlightsMaker.downloader.mp4_check import Mp4Validator, Mp4ValidationError, check_content_type, validate_file
+from NBAHighlightsMaker.downloader.segmented import SegmentTuner, MIN_SEGMENT_SIZE, plan_segments
+from NBAHighlightsMaker.downloader.download_sink import DownloadSink, CHUNK_SIZE, BUFFER_SIZE
+from NBAHighlightsMaker.downloader.clip_store import ClipStore
+from NBAHighlightsMaker.players.getplayers import DataRetriever
+from NBAHighlightsMaker.common.event_records import EventRecords, ProgressTracker
+
+def format_rate(num_bytes, elapsed):
+    """Formats the size and speed of a download for the logs.
+
+    Args:
+        num_bytes (int): Number of bytes downloaded.
+        elapsed (float): Seconds the download took.
+
+    Returns:
+        str: i.e "3.2 MB at 4.1 MB/s".
+    """
+    rate = num_bytes / elapsed if elapsed > 0 else 0.0
+    return f"{num_bytes / 1e6:.1f} MB at {rate / 1e6:.1f} MB/s"
+
+def get_rendition(row):
+    """Gets the rendition of the link of an event.
+
+    Args:
+        row (pandas.Series): Row of data for the event, with a RENDITION column if the rendition is known.
+
+    Returns:
+        str: The rendition, or DEFAULT_RENDITION if the row doesn't say.
+    """
+    rendition = getattr(row, 'RENDITION', None)
+    return rendition if isinstance(rendition, str) and rendition else DEFAULT_RENDITION
 
 class Downloader():
     """Handles the downloading of video clips from the NBA website.
 
-    This class downloads video clips asynchronously using aiohttp, with a 
-    limit of two concurrent downloads to avoid rate limiting. Once a video is downloaded,
+    This class downloads video clips asynchronously using aiohttp, paced by an adaptive
+    rate limiter for the video host to avoid rate limiting. Once a video is downloaded,
     the file path of the downloaded video is updated in the dataframe.
 
     Args:
         ua (UserAgent): UserAgent object from fake_useragent to generate random user agent strings.
         data_dir (str): Directory path for storing data files for future use.
-        
+        http_client (HttpClient, optional): Pooled HTTP client shared with the DataRetriever. Defaults to a new client.
+        renditions (RenditionSelector, optional): Rendition selector shared with the DataRetriever. Defaults to a new selector for 720p.
+        chunk_size (int, optional): Size of the chunks read from the responses. Defaults to CHUNK_SIZE.
+        buffer_size (int, optional): Bytes collected before each write to disk. Defaults to BUFFER_SIZE.
+
     Attributes:
         ua (UserAgent): UserAgent object from fake_useragent to generate random user agent strings.
         headers (dict): HTTP headers used for requests to download videos from the links.
-        counter (int): Counter for tracking downloaded files.
+        http_client (HttpClient): Pooled HTTP client used for the downloads.
+        clip_store (ClipStore): Persistent store of the clips downloaded by earlier jobs.
+        rate_limiters (RateLimiterRegistry): Per-host rate limiters of the HTTP client.
+        retry_policy (RetryPolicy): Retry policy of the HTTP client.
+        segment_tuner (SegmentTuner): Number of segments large clips are downloaded with, per host.
+        renditions (RenditionSelector): Rendition selector telling which rendition each link is.
+        chunk_size (int): Size of the chunks read from the responses.
+        buffer_size (int): Bytes collected before each write to disk.
+        writer (ThreadPoolExecutor): Thread writing the downloaded bytes of every clip to disk.
     """
-    def __init__(self, ua, data_dir):
+    def __init__(self, ua, data_dir, http_client = None, renditions = None,
+                 chunk_size = CHUNK_SIZE, buffer_size = BUFFER_SIZE):
         self.data_dir = os.path.join(data_dir, 'vids')
         # UserAgent object to generate random user agent
         self.ua = ua
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36',
+            # the clips are already compressed, and identity keeps Content-Length exact
+            'Accept-Encoding': 'identity',
         }
-        self.counter = 0
+        self.http_client = http_client or HttpClient()
+        self.rate_limiters = self.http_client.rate_limiters
+        self.retry_policy = self.http_client.retry_policy
+        self.clip_store = ClipStore(os.path.join(data_dir, 'clips'))
+        self.segment_tuner = SegmentTuner()
+        self.renditions = renditions or RenditionSelector()
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        # one thread is enough, the writes are large and the page cache absorbs them
+        self.writer = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'clip-writer')
     
-    async def download_file(self, session, event_ids, row,
-                            file_path, update_progress_bar,
-                            semaphore, lock):
-        """Asynchronously downloads the video download link.
+    def get_file_path(self, row, game_id = None):
+        """Gets the path a clip is downloaded to.
+
+        Args:
+            row (pandas.Series): Row of data for the event containing actionNumber.
+            game_id (str, optional): NBA game ID, added to the file name so clips from different games don't collide.
+
+        Returns:
+            str: Path of the clip in the data directory.
+        """
+        if game_id:
+            return os.path.join(self.data_dir, "{}_{}.mp4".format(game_id, row.actionNumber))
+        return os.path.join(self.data_dir, "{}.mp4".format(row.actionNumber))
+
+    def open_sink(self, file_path, offset = 0, length = None, truncate = False):
+        """Opens a buffered writer into a file, written by the writer thread.
+
+        Args:
+            file_path (str): Path of the file.
+            offset (int, optional): Position of the first byte written. Defaults to 0.
+            length (int, optional): Length of the whole file, to preallocate it. Defaults to not preallocating.
+            truncate (bool, optional): Whether to empty the file first. Defaults to False.
+
+        Returns:
+            DownloadSink: The writer.
+        """
+        return DownloadSink(file_path, self.writer, offset = offset, length = length, truncate = truncate,
+                            chunk_size = self.chunk_size, buffer_size = self.buffer_size)
+
+    def use_stored_clip(self, game_id, row, file_path, proxy = False):
+        """Puts the stored clip of an event in the workspace, if an earlier job downloaded it in a rendition that will do.
+
+        Args:
+            game_id (str): NBA game ID.
+            row (pandas.Series): Row of data for the event containing actionNumber, actionType and subType.
+            file_path (str): Path the job expects the clip at.
+            proxy (bool, optional): Whether the job wants previews, for which any rendition will do. Defaults to False.
+
+        Returns:
+            str: Path of the clip to use, or None if it isn't stored.
+        """
+        event_num = DataRetriever.get_event_num(row)
+        for rendition in self.renditions.get_stored_renditions(proxy):
+            stored_path = self.clip_store.link(game_id, event_num, file_path, rendition)
+            if stored_path:
+                return stored_path
+        return None
+
+    def store_clip(self, game_id, row, file_path, rendition = DEFAULT_RENDITION):
+        """Adds a downloaded clip to the clip store. This hashes the clip, so run it in a thread.
+
+        Args:
+            game_id (str): NBA game ID.
+            row (pandas.Series): Row of data for the event containing actionNumber, actionType and subType.
+            file_path (str): Path of the downloaded clip.
+            rendition (str, optional): Rendition the clip was downloaded in, the clip is stored under it. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: Path of the clip to use.
+        """
+        return self.clip_store.put(game_id, DataRetriever.get_event_num(row), file_path, rendition)
+
+    async def fetch_file(self, session, row, video_link, file_path):
+        """Asynchronously downloads the video of an event to a file.
 
-        Generates a random user agent, sleeps for a random duration to stagger requests, and limits
-        how many requests are happening at a time using a semaphore. Then downloads the video
-        and updates the progress bar. If the request fails, the error message is saved for that try
-        and this process is retried until max_retries is exceeded.
+        Generates a random user agent, and waits for the rate limiter of the video host, which paces
+        the requests and limits how many are happening at a time. Then downloads the video to a .part file,
+        which is renamed to file_path once complete. The chunks are collected into large buffers written by the writer
+        thread, into a file preallocated to the length of the clip when it is known. The MP4 boxes are checked as the chunks arrive, and a clip
+        that isn't a whole MP4 file is removed and downloaded again. Large clips are downloaded in segments at the same time
+        with fetch_segmented(), if the headers of the response say the host supports Range requests. Failed tries are retried by the retry policy
+        of the HTTP client, which backs off between tries without holding a slot. Bytes already in the .part file,
+        from a previous try or a previous job, are kept and only the rest is requested with a Range header.
 
         Args:
             session (aiohttp.ClientSession): A session object used for the HTTP requests.
-            event_ids (pandas.DataFrame): DataFrame to update with video links and the description.
             row (pandas.Series): Row of data for the event containing actionNumber, etc.
+            video_link (str): The download link of the video.
             file_path (str): Path to the file where the video will be saved.
-            update_progress_bar (Callable): Function to update the progress bar in the UI.
-            semaphore (asyncio.Semaphore): Semaphore to limit concurrent downloads.
-            lock (asyncio.Lock): Lock to update the counter and dataframe event_ids safely.
+
+        Returns:
+            str: The path of the downloaded file.
 
         Raises:
-            Exception: If maximum retries are exceeded for a request, raises an exception with details.
+            RetryError: If every try failed or the host is down, with the outcome of each try.
         """
-        retry_count = 0
-        error_msg_string = ''
-        while retry_count < 3:
-            async with semaphore:
-                self.headers['User-Agent'] = self.ua.random
-                time = random.uniform(0, 2.5)
-                print(f"Sleeping for {time:.2f} seconds before downloading {row.actionNumber}.mp4...") 
-                await asyncio.sleep(time)
+        partial = PartialDownload(file_path)
+        # every byte was downloaded before, but the file wasn't renamed
+        if (partial.get_segments(video_link) is not None or partial.get_offset(video_link) > 0) and partial.is_complete():
+            try:
+                validate_file(partial.part_path)
+                partial.finish()
+                return file_path
+            except Mp4ValidationError as e:
+                print(f"Downloading {video_link} again, the downloaded clip is invalid: {e}")
+                partial.discard()
+        limiter = self.rate_limiters.get(video_link)
+
+        async def download():
+            self.headers['User-Agent'] = self.ua.random
+            if partial.get_segments(video_link) is not None:
+                await self.fetch_segmented(session, video_link, partial, limiter)
+                # the segments arrived out of order, so the boxes are checked once they are all there
+                validate_file(partial.part_path)
+                partial.finish()
+                return file_path
+            # continue from the bytes a previous try or job already downloaded
+            offset = partial.get_offset(video_link)
+            range_headers = partial.get_range_headers(offset)
+            if not range_headers:
+                offset = 0
+            print(f"Downloading {row.actionNumber}.mp4 from byte {offset}...")
+            async with session.get(video_link, headers={**self.headers, **range_headers}, timeout=30) as response:
+                if response.status == 416:
+                    # the range starts past the end of the file
+                    if partial.is_complete():
+                        validate_file(partial.part_path)
+                        partial.finish()
+                        return file_path
+                    partial.discard()
+                    raise RetryableError(f"Response Status: {response.status}", response.status)
+                if response.status not in (200, 206):
+                    raise RetryableError(f"Response Status: {response.status}", response.status,
+                                         parse_retry_after(response.headers.get('Retry-After')))
+                if response.status == 200:
+                    # the server sent the whole file, i.e because it changed since the last try
+                    offset = 0
+                else:
+                    content_range = parse_content_range(response.headers.get('Content-Range'))
+                    if content_range is None or content_range[0] != offset:
+                        partial.discard()
+                        raise RetryableError("Unexpected Content-Range.")
+                check_content_type(response.headers.get('Content-Type'))
+                # a clip is only split if nothing was downloaded yet, this response brings the first segment
+                num_segments = self.segment_tuner.get(limiter.host)
+                split_length = self.get_split_length(limiter.host, response.headers) if not offset and num_segments > 1 else None
+                if split_length is not None:
+                    partial.start_segmented(video_link, response.headers, split_length, plan_segments(split_length, num_segments))
+                    await self.fetch_segmented(session, video_link, partial, limiter, response)
+                    validate_file(partial.part_path)
+                    partial.finish()
+                    return file_path
+                validator = Mp4Validator()
+                if offset:
+                    validator.feed_file(partial.part_path)
+                length = partial.start(video_link, response.headers, offset)
+                start_time = time.monotonic()
+                sink = self.open_sink(partial.part_path, offset, length, truncate = not offset)
+                if sink.preallocated:
+                    partial.set_preallocated(True)
                 try:
-                    async with session.get(row.VIDEO_LINK, headers=self.headers, timeout=30) as response:
-                        if response.status == 200:
-                            async with aiofiles.open(file_path, 'wb') as f:
-                                async for chunk in response.content.iter_chunked(256000):
-                                    await f.write(chunk)
-                            print(f"Downloaded {row.VIDEO_LINK}")
-                            async with lock:
-                                # update dataframe with file path
-                                event_ids.loc[row.Index, 'FILE_PATH'] = file_path
-                                # update progress bar
-                                self.counter += 1
-                                value = int((self.counter) / len(event_ids) * 100)
-                                update_progress_bar(value, f"Downloaded: {row.description}")
-                            return
-                        elif response.status == 429:
-                            print(f"Rate limit exceeded for {row.VIDEO_LINK}. Retrying after a delay...")
-                            error_msg_string += f"Retry {retry_count + 1} failed: Rate limit exceeded, Response Status: {response.status}\n"
-                            await asyncio.sleep(random.uniform(3, 7))
-                            # Retry the download after waiting
-                            retry_count += 1
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        # stops at the first chunk of an error page instead of saving it
+                        validator.feed(chunk)
+                        await sink.write(chunk)
+                finally:
+                    try:
+                        # cuts the preallocated file back to the bytes downloaded, so they can be resumed
+                        await sink.close()
+                    finally:
+                        if sink.preallocated:
+                            partial.set_preallocated(False)
+                num_bytes = sink.num_bytes
+                elapsed = time.monotonic() - start_time
+                limiter.record_throughput(num_bytes, elapsed)
+                if not offset and elapsed > 0:
+                    self.segment_tuner.record(limiter.host, 1, num_bytes / elapsed)
+                if length is not None and offset + num_bytes != length:
+                    raise RetryableError(f"Incomplete download, stopped at byte {offset + num_bytes} of {length}.")
+                validator.finish(length)
+                partial.finish()
+                print(f"Downloaded {video_link} ({format_rate(num_bytes, elapsed)})")
+                return file_path
+
+        async def attempt():
+            try:
+                return await download()
+            except Mp4ValidationError as e:
+                # the bytes can't be trusted, download the clip again from the start
+                partial.discard()
+                raise RetryableError(f"Invalid clip: {e}")
+
+        return await self.retry_policy.run(attempt, limiter, f"downloading event {row.actionNumber}: {row.description}")
+
+    def get_split_length(self, host, response_headers):
+        """Gets the length of a clip from the headers of its response, if the clip is worth downloading in segments.
+
+        A host whose responses don't have "Accept-Ranges: bytes" is downloaded with a single stream from then on.
+
+        Args:
+            host (str): Host of the clip.
+            response_headers (Mapping): Headers of the 200 response for the whole clip.
+
+        Returns:
+            int: Length of the clip in bytes, or None if it should be downloaded with a single stream.
+        """
+        if response_headers.get('Accept-Ranges', '').lower() != 'bytes':
+            print(f"{host} doesn't support Range requests, downloading with a single stream.")
+            self.segment_tuner.disable(host)
+            return None
+        length = response_headers.get('Content-Length')
+        # without a validator the segments could come from different versions of the clip
+        if length is None or not (response_headers.get('ETag') or response_headers.get('Last-Modified')):
+            return None
+        length = int(length)
+        return length if length >= 2 * MIN_SEGMENT_SIZE else None
+
+    async def fetch_segmented(self, session, video_link, partial, limiter, response = None):
+        """Asynchronously downloads the missing segments of a clip at the same time.
+
+        The .part file is preallocated and split into ranges by PartialDownload.start_segmented(), and
+        each range is written at its own position by its own DownloadSink. A new download passes the
+        response of its first request, which brings the first segment, so no request is spent learning
+        the length of the clip. The try already holds a slot of the rate limiter, and one more slot is
+        taken for each other segment fetched at the same time, as long as the host has one free, so the
+        segments count against the concurrency of the host and the rest wait for a segment to finish.
+        How much of each range was downloaded is kept in the sidecar, so a later try only asks for what is missing.
+
+        Args:
+            session (aiohttp.ClientSession): A session object used for the HTTP requests.
+            video_link (str): The download link of the video.
+            partial (PartialDownload): The .part file and sidecar of the clip, with its segments recorded.
+            limiter (AdaptiveRateLimiter): Rate limiter of the video host.
+            response (aiohttp.ClientResponse, optional): Response for the whole clip, read until the end of the first segment.
+                Defaults to None.
+
+        Raises:
+            aiohttp.ClientError: If a request fails, with the status of the response for HTTP errors.
+            ContentChangedError: If the clip changed since the segments were planned, the .part file is removed.
+        """
+        segments = partial.get_segments(video_link)
+        validator = partial.get_validator()
+        print(f"Downloading {video_link} in {len(segments)} segments...")
+        downloaded_before = sum(segment[2] for segment in segments)
+        start_time = time.monotonic()
+        missing = [segment for segment in segments if segment[0] + segment[2] <= segment[1]]
+        # shared by the workers, each takes the next segment when it is free
+        pending = iter(missing)
+        errors = []
+
+        async def worker(own_slot, response = None):
+            try:
+                for segment in pending:
+                    try:
+                        if response is not None:
+                            await self.write_segment(response, video_link, partial.part_path, segment)
+                            response = None
                         else:
-                            print(f"Failed to download {row.VIDEO_LINK}: {response.status}")
-                            error_msg_string += f"Retry {retry_count + 1} failed: Response Status: {response.status}\n"
-                            retry_count += 1
-                except aiohttp.ClientConnectionError as e:
-                    print(f"Client Connection error: {e}")
-                    error_msg_string += f"Retry {retry_count + 1} failed: Client Connection error.\n"
-                    retry_count += 1
-                except aiohttp.ClientResponseError as e:
-                    print(f"Response error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Client Response error.\n"
-                    retry_count += 1
-                except aiohttp.ClientError as e:
-                    print(f"Client error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Client error.\n"
-                    retry_count += 1
-                except asyncio.TimeoutError as e:
-                    print(f"Timeout error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Timeout error.\n"
-                    retry_count += 1
-                except Exception as e:
-                    print(f"Unexpected error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Unexpected error.\n"
-                    retry_count += 1
-        print(f"Failed to download {row.VIDEO_LINK}. Skipping.")
-        raise Exception(f"Max retries exceeded while getting link for event {row.actionNumber}: {row.description}.\n\n{error_msg_string}")
-        
-    async def download_files(self, event_ids, update_progress_bar):
-        """Create a task for each event to fetch video download links and execute the tasks.
-
-        Creates a ClientSession, and using that, creates a task for each event to download the video from the respective link.
-        The tasks are then run concurrently, but limited by a semaphore so only two downloads happen at a time,
-        and the event_ids DataFrame is updated with the file path of each downloaded video.
+                            await limiter.wait_for_token()
+                            await self.fetch_segment(session, video_link, validator, partial.part_path, segment)
+                    except Exception as e:
+                        # a failed segment doesn't stop the others, so the retry only asks for what is missing
+                        errors.append(e)
+            finally:
+                if own_slot:
+                    limiter.release()
+
+        # the slot of the try, plus one for each other segment the host has room for
+        num_slots = 0
+        while num_slots < len(missing) - 1 and limiter.try_acquire_slot():
+            num_slots += 1
+        tasks = [asyncio.ensure_future(worker(False, response))]
+        tasks += [asyncio.ensure_future(worker(True)) for _ in range(num_slots)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions = True)
+            partial.save_segments(segments)
+            raise
+        if any(isinstance(error, ContentChangedError) for error in errors):
+            partial.discard()
+            raise next(error for error in errors if isinstance(error, ContentChangedError))
+        partial.save_segments(segments)
+        if errors:
+            if any(isinstance(error, asyncio.TimeoutError) or getattr(error, 'status', None) == 429 for error in errors):
+                self.segment_tuner.record_failure(limiter.host)
+            raise errors[0]
+        elapsed = time.monotonic() - start_time
+        num_bytes = sum(segment[2] for segment in segments) - downloaded_before
+        limiter.record_throughput(num_bytes, elapsed)
+        if not downloaded_before and elapsed > 0:
+            self.segment_tuner.record(limiter.host, len(segments), num_bytes / elapsed)
+        print(f"Downloaded {video_link} in {len(segments)} segments ({format_rate(num_bytes, elapsed)})")
+
+    async def fetch_segment(self, session, video_link, validator, part_path, segment):
+        """Asynchronously requests the missing bytes of one segment and writes them into the .part file.
+
+        Args:
+            session (aiohttp.ClientSession): A session object used for the HTTP requests.
+            video_link (str): The download link of the video.
+            validator (str): ETag or Last-Modified date of the clip, sent as If-Range.
+            part_path (str): Path of the preallocated .part file.
+            segment (list): [first byte, last byte, bytes downloaded] of the segment, updated as bytes are written.
+
+        Raises:
+            aiohttp.ClientError: If the request fails or the segment ends early.
+            ContentChangedError: If the server sends the whole clip or another range.
+        """
+        start, end, done = segment
+        headers = {**self.headers, 'Range': f'bytes={start + done}-{end}', 'If-Range': validator}
+        async with session.get(video_link, headers=headers, timeout=30) as response:
+            if response.status == 200:
+                raise ContentChangedError(f"{video_link} changed during the download.")
+            response.raise_for_status()
+            content_range = parse_content_range(response.headers.get('Content-Range'))
+            if response.status != 206 or content_range is None or content_range[0] != start + done:
+                raise ContentChangedError(f"Unexpected Content-Range for {video_link}.")
+            await self.write_segment(response, video_link, part_path, segment)
+
+    async def write_segment(self, response, video_link, part_path, segment):
+        """Asynchronously writes the body of a response into a segment, up to the end of the segment.
+
+        Args:
+            response (aiohttp.ClientResponse): Response whose body starts at the first missing byte of the segment.
+            video_link (str): The download link of the video.
+            part_path (str): Path of the preallocated .part file.
+            segment (list): [first byte, last byte, bytes downloaded] of the segment, updated as bytes are written.
+
+        Raises:
+            aiohttp.ClientError: If the body ends before the end of the segment.
+        """
+        start, end, done = segment
+        sink = self.open_sink(part_path, start + done)
+        try:
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                chunk = chunk[:end + 1 - start - segment[2]]
+                await sink.write(chunk)
+                segment[2] += len(chunk)
+                if start + segment[2] > end:
+                    # the rest of a response for the whole clip belongs to the other segments
+                    break
+        finally:
+            # the bytes counted in the segment are on disk once the sink is closed
+            await sink.close()
+        if start + segment[2] != end + 1:
+            raise aiohttp.ClientPayloadError(f"Segment {start}-{end} of {video_link} stopped at byte {start + segment[2]}.")
+
+    async def download_file(self, session, position, row, file_path, records, progress, game_id = None):
+        """Asynchronously downloads the video of an event and records its file path.
+
+        Downloads the video with fetch_file(), adds it to the clip store if the game is known,
+        then stores the file path at the position of the event in records and updates the progress.
+
+        Args:
+            session (aiohttp.ClientSession): A session object used for the HTTP requests.
+            position (int): Position of the event in the DataFrame of events.
+            row (pandas.Series): Row of data for the event containing actionNumber, VIDEO_LINK, RENDITION, etc.
+            file_path (str): Path to the file where the video will be saved.
+            records (EventRecords): Per-event results of the job, with a FILE_PATH column.
+            progress (ProgressTracker): Progress of the job.
+            game_id (str, optional): NBA game ID, needed to add the clip to the clip store.
+
+        Raises:
+            Exception: If maximum retries are exceeded for a request, raises an exception with details.
+        """
+        await self.fetch_file(session, row, row.VIDEO_LINK, file_path)
+        if game_id:
+            file_path = await asyncio.to_thread(self.store_clip, game_id, row, file_path, get_rendition(row))
+        records.set(position, 'FILE_PATH', file_path)
+        progress.advance(f"Downloaded: {row.description}")
+
+    async def iter_downloads(self, event_ids, update_progress_bar, game_id = None, proxy = False):
+        """Downloads the clips of the events, yielding them in game timeline order as soon as they are ready.
+
+        The downloads are run by a DownloadScheduler, which starts with the earliest clips of the game.
+        A clip is yielded once it and every clip before it on the timeline are downloaded, so the
+        caller can start using the first clips while later ones are still downloading.
+        If game_id is given, clips already in the clip store are linked instead of downloaded.
+
+        Args:
+            event_ids (pandas.DataFrame): DataFrame of event IDs with VIDEO_LINK and RENDITION columns, indexed from 0.
+            update_progress_bar (Callable): Function to update the progress bar.
+            game_id (str, optional): NBA game ID, added to the file names so clips from different games don't collide.
+            proxy (bool, optional): Whether the job wants previews, for which any stored rendition will do. Defaults to False.
+
+        Yields:
+            tuple: (position, row, file path) of the next clip in timeline order.
+
+        Raises:
+            Exception: If maximum retries are exceeded for a download, after stopping the other downloads.
+        """
+        progress = ProgressTracker(len(event_ids), update_progress_bar)
+        scheduler = DownloadScheduler(self, self.http_client.get_session(), game_id,
+                                      on_done = lambda position, row, file_path: progress.advance(f"Downloaded: {row.description}"))
+        for position, row in enumerate(event_ids.itertuples(index=True)):
+            # clips downloaded by an earlier job are linked from the clip store
+            stored_path = self.use_stored_clip(game_id, row, self.get_file_path(row, game_id), proxy) if game_id else None
+            if stored_path:
+                scheduler.add_result(position, row, stored_path)
+                progress.advance(f"Found stored clip: {row.description}")
+            else:
+                scheduler.add(position, row, row.VIDEO_LINK, get_rendition(row))
+        scheduler.close()
+        run_task = asyncio.ensure_future(scheduler.run())
+        try:
+            async for clip in scheduler.iter_in_order():
+                yield clip
+            await run_task
+        finally:
+            if not run_task.done():
+                # the caller stopped early or a download failed
+                run_task.cancel()
+                await asyncio.gather(run_task, return_exceptions = True)
+            # keep the access times of the stored clips that were used
+            self.clip_store.save()
+
+    async def download_files(self, event_ids, update_progress_bar, game_id = None, proxy = False):
+        """Downloads the video of each event and adds the file paths to the DataFrame.
+
+        Uses iter_downloads() to download the clips with the shared session of the HTTP client, earliest clips first,
+        paced by the adaptive rate limiter of the video host. If game_id is given, clips already in the clip store
+        are linked instead of downloaded, and downloaded clips are added to it. Each file path is stored by the
+        position of its event, and the FILE_PATH column is added to the event_ids DataFrame once every clip is done.
 
         Args:
             event_ids (pandas.DataFrame): DataFrame of event IDs.
             update_progress_bar (Callable): Function to update the progress bar.
+            game_id (str, optional): NBA game ID, added to the file names so clips from different games don't collide.
+            proxy (bool, optional): Whether the job wants previews, for which any stored rendition will do. Defaults to False.
 
         Returns:
             pandas.DataFrame: DataFrame with the following columns:
                 - actionNumber (int): Unique event number within the game.
+                - period (int): Period of the game the event happened in.
+                - clock (str): Time left in the period, i.e PT08M15.50S.
                 - actionType (int): Type of event (i.e field goal, rebound).
                 - subType (str): More specific information about the event.
                 - personId (int): ID of the main player involved in the event.
@@ -137,24 +533,12 @@ class Downloader():
                 - foulDrawnPersonId (int): ID of the person who drew the foul.
                 - blockPersonId (int): ID of the person who blocked the shot.
                 - VIDEO_LINK (str): The download link for the event.
+                - RENDITION (str): The rendition of the link, i.e "lurl".
                 - FILE_PATH (str): The file path where the video is saved.
         """
-        event_ids['FILE_PATH'] = ''
         event_ids = event_ids.reset_index(drop=True)
-        semaphore = asyncio.Semaphore(2)
-        async with aiohttp.ClientSession(
-            headers = self.headers
-        ) as session:
-            tasks = []
-            lock = asyncio.Lock()
-            for row in event_ids.itertuples(index=True):
-                file_path = os.path.join(self.data_dir, "{}.mp4".format(row.actionNumber))
-                # Create download tasks
-                tasks.append(self.download_file(session, event_ids, row, file_path, update_progress_bar,
-                                                semaphore, lock))
-            await asyncio.gather(*tasks)
-        print("Finished Download")
-        # reset counter
-        self.counter = 0
-        return event_ids
-    
+        records = EventRecords(len(event_ids), ['FILE_PATH'])
+        async for position, row, file_path in self.iter_downloads(event_ids, update_progress_bar, game_id, proxy):
+            records.set(position, 'FILE_PATH', file_path)
+        print("Finished Download", self.segment_tuner.metrics())
+        return records.to_frame(event_ids)
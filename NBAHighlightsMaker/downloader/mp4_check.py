@@ -0,0 +1,169 @@
+"""Checks that a downloaded clip is a whole MP4 file while it is being downloaded.
+
+This module contains the class Mp4Validator, which reads the top-level boxes of an MP4 file
+from the chunks of a download as they arrive. Each box starts with its size and a four letter
+type, so only the box headers are parsed and the contents are skipped. A clip that isn't an MP4
+file, i.e an HTML error page, fails on its first chunk, and a truncated one fails when the
+download ends, instead of failing later when moviepy opens it.
+
+Typical usage example:
+    check_content_type(response.headers.get('Content-Type'))
+    validator = Mp4Validator()
+    async for chunk in response.content.iter_chunked(256000):
+        validator.feed(chunk)
+    validator.finish(length)
+"""
+import os
+import struct
+
+# box types that may come first in an MP4 file
+FIRST_BOX_TYPES = (b'ftyp', b'styp')
+# box types a clip can't be played without
+REQUIRED_BOX_TYPES = (b'moov', b'mdat')
+
+class Mp4ValidationError(Exception):
+    """Raised when a downloaded clip isn't a whole MP4 file.
+    """
+
+def check_content_type(content_type):
+    """Checks the Content-Type of a response before its body is saved as a clip.
+
+    Servers send video/mp4 or a generic binary type for clips, so only types that are clearly
+    not a video, like the text/html of an error page, are refused.
+
+    Args:
+        content_type (str): Value of the Content-Type header, or None if it is missing.
+
+    Raises:
+        Mp4ValidationError: If the response is text, HTML, JSON or XML.
+    """
+    if not content_type:
+        return
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type.startswith('text/') or media_type.endswith(('json', 'xml', 'html')):
+        raise Mp4ValidationError(f"Expected a video but got {media_type}.")
+
+class Mp4Validator:
+    """Streaming check of the top-level boxes of an MP4 file.
+
+    The validator keeps the position in the file and the position where the next box starts.
+    Bytes inside a box are skipped, and bytes of a box header are kept until the whole header
+    (8 bytes, or 16 for a 64-bit size) has arrived.
+
+    Attributes:
+        position (int): Number of bytes read so far.
+        next_box (int): Position of the next box header.
+        header (bytes): Bytes of the box header read so far.
+        box_types (list): Types of the boxes found so far.
+        open_ended (bool): True once a box with size 0, which lasts until the end of the file, was found.
+    """
+    def __init__(self):
+        self.position = 0
+        self.next_box = 0
+        self.header = b''
+        self.box_types = []
+        self.open_ended = False
+
+    def feed(self, data):
+        """Reads the next bytes of the file.
+
+        Args:
+            data (bytes): The bytes following the ones already read.
+
+        Raises:
+            Mp4ValidationError: If a box header is invalid.
+        """
+        view = memoryview(data)
+        while view:
+            if self.open_ended or self.position < self.next_box:
+                skip = len(view) if self.open_ended else min(len(view), self.next_box - self.position)
+                self.position += skip
+                view = view[skip:]
+                continue
+            needed = 8 if len(self.header) < 8 or struct.unpack('>I', self.header[:4])[0] != 1 else 16
+            take = min(len(view), needed - len(self.header))
+            self.header += bytes(view[:take])
+            self.position += take
+            view = view[take:]
+            if len(self.header) == 8 and struct.unpack('>I', self.header[:4])[0] == 1:
+                # 64-bit size follows the type
+                continue
+            if len(self.header) == needed:
+                self.read_header()
+
+    def read_header(self):
+        """Checks a complete box header and moves to the start of the next box.
+
+        Raises:
+            Mp4ValidationError: If the box type isn't four printable characters, the first box isn't ftyp,
+                or the size is smaller than the header.
+        """
+        size, box_type = struct.unpack('>I4s', self.header[:8])
+        header_size = len(self.header)
+        box_start = self.position - header_size
+        if header_size == 16:
+            size = struct.unpack('>Q', self.header[8:16])[0]
+        self.header = b''
+        if not all(32 <= byte < 127 for byte in box_type):
+            raise Mp4ValidationError(f"Invalid box type {box_type!r} at byte {box_start}.")
+        if not self.box_types and box_type not in FIRST_BOX_TYPES:
+            raise Mp4ValidationError(f"File starts with {box_type.decode('ascii')} instead of ftyp.")
+        self.box_types.append(box_type)
+        if size == 0:
+            self.open_ended = True
+            return
+        if size < header_size:
+            raise Mp4ValidationError(f"Box {box_type.decode('ascii')} at byte {box_start} has an invalid size of {size}.")
+        self.next_box = box_start + size
+
+    def feed_file(self, file_path):
+        """Reads the box headers of a file already on disk, i.e the start of a download being resumed.
+
+        Only the headers are read from the file, the contents of the boxes are skipped with seeks.
+
+        Args:
+            file_path (str): Path of the file.
+
+        Raises:
+            Mp4ValidationError: If a box header is invalid.
+        """
+        size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            while self.position < size:
+                if self.open_ended:
+                    self.position = size
+                elif self.position < self.next_box:
+                    self.position = min(self.next_box, size)
+                else:
+                    f.seek(self.position)
+                    self.feed(f.read(min(16 - len(self.header), size - self.position)))
+
+    def finish(self, length = None):
+        """Checks that the file ended at the end of a box and has the boxes a clip needs.
+
+        Args:
+            length (int, optional): Expected length of the file, from the response headers.
+
+        Raises:
+            Mp4ValidationError: If the file is truncated, longer than expected or has no moov or mdat box.
+        """
+        if length is not None and self.position != length:
+            raise Mp4ValidationError(f"Got {self.position} bytes instead of {length}.")
+        if self.header or (not self.open_ended and self.position != self.next_box):
+            raise Mp4ValidationError(f"File is truncated at byte {self.position}, inside a box.")
+        missing = [box_type.decode('ascii') for box_type in REQUIRED_BOX_TYPES if box_type not in self.box_types]
+        if missing:
+            raise Mp4ValidationError(f"File has no {' or '.join(missing)} box.")
+
+def validate_file(file_path):
+    """Checks the box structure of a whole file on disk.
+
+    Args:
+        file_path (str): Path of the file.
+
+    Raises:
+        Mp4ValidationError: If the file isn't a whole MP4 file.
+    """
+    validator = Mp4Validator()
+    validator.feed_file(file_path)
+    validator.finish(os.path.getsize(file_path))
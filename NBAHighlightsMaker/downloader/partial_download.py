@@ -0,0 +1,254 @@
+"""Keeps track of partly downloaded files so downloads can be resumed.
+
+This module contains the class PartialDownload. A file is downloaded to "<file_path>.part",
+next to a "<file_path>.part.json" sidecar recording the URL, the expected length and the
+validators (ETag, Last-Modified) of the response. If the download stops halfway, the next try,
+or a later job downloading the same file, asks only for the missing bytes with a Range request.
+The If-Range header makes the server send the whole file again if it changed in the meantime.
+Once every byte is there, the .part file is renamed to the final path. Clips downloaded in
+segments are preallocated instead, and the sidecar records how much of each range arrived.
+
+Typical usage example:
+    partial = PartialDownload(file_path)
+    offset = partial.get_offset(url)
+    headers.update(partial.get_range_headers(offset))
+"""
+import os
+import re
+import json
+
+PART_SUFFIX = '.part'
+META_SUFFIX = '.part.json'
+
+def parse_content_range(value):
+    """Parses the value of a Content-Range header.
+
+    Args:
+        value (str): Header value, i.e "bytes 100-999/1000".
+
+    Returns:
+        tuple: (first byte, last byte, total length or None if unknown), or None if the header is missing or can't be parsed.
+    """
+    match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', value or '')
+    if not match:
+        return None
+    total = None if match.group(3) == '*' else int(match.group(3))
+    return int(match.group(1)), int(match.group(2)), total
+
+class ContentChangedError(Exception):
+    """Raised when the server sends the whole file instead of a range, because the file changed.
+    """
+
+def is_partial_file(file_name):
+    """Checks if a file is a partly downloaded file or its sidecar.
+
+    Args:
+        file_name (str): Name or path of the file.
+
+    Returns:
+        bool: True for .part and .part.json files.
+    """
+    return file_name.endswith(PART_SUFFIX) or file_name.endswith(META_SUFFIX)
+
+class PartialDownload:
+    """Partly downloaded file and its sidecar.
+
+    Args:
+        file_path (str): Final path of the downloaded file.
+
+    Attributes:
+        file_path (str): Final path of the downloaded file.
+        part_path (str): Path the file is downloaded to.
+        meta_path (str): Path of the sidecar with the URL, length and validators of the download.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.part_path = file_path + PART_SUFFIX
+        self.meta_path = file_path + META_SUFFIX
+
+    def load_meta(self):
+        """Loads the sidecar.
+
+        Returns:
+            dict: The sidecar with the keys url, length, etag and last_modified, or None if it is missing or corrupt.
+        """
+        try:
+            with open(self.meta_path, 'r', encoding = 'utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_offset(self, url):
+        """Gets how many bytes of a URL were already downloaded.
+
+        A .part file without a sidecar, or left over from another URL, can't be trusted, so it is removed.
+
+        Args:
+            url (str): URL of the file.
+
+        Returns:
+            int: Number of bytes in the .part file that can be kept.
+        """
+        meta = self.load_meta()
+        # a segmented download is preallocated, so its size doesn't say how much was downloaded,
+        # and neither does a single stream file that wasn't cut back after its preallocation, i.e after a crash
+        if (meta is None or meta.get('url') != url or meta.get('segments') is not None
+                or meta.get('preallocated') or not os.path.exists(self.part_path)):
+            self.discard()
+            return 0
+        offset = os.path.getsize(self.part_path)
+        if meta.get('length') is not None and offset > meta['length']:
+            self.discard()
+            return 0
+        return offset
+
+    def get_validator(self):
+        """Gets the value for the If-Range header, so a range is only sent if the file didn't change.
+
+        Returns:
+            str: The ETag, else the Last-Modified date, or None if the sidecar has neither.
+        """
+        meta = self.load_meta() or {}
+        return meta.get('etag') or meta.get('last_modified')
+
+    def get_range_headers(self, offset):
+        """Gets the headers asking for the bytes from offset on.
+
+        Args:
+            offset (int): Number of bytes already downloaded.
+
+        Returns:
+            dict: Range and If-Range headers, empty if nothing was downloaded or there is no validator.
+        """
+        if offset <= 0:
+            return {}
+        validator = self.get_validator()
+        if not validator:
+            # without a validator we can't tell if the file changed, so download it again
+            self.discard()
+            return {}
+        return {'Range': f'bytes={offset}-', 'If-Range': validator}
+
+    def start(self, url, response_headers, offset):
+        """Records the response a download continues or restarts with.
+
+        Args:
+            url (str): URL of the file.
+            response_headers (Mapping): Headers of the 200 or 206 response.
+            offset (int): Byte the response body starts at, 0 for a 200 response.
+
+        Returns:
+            int: Expected length of the whole file, or None if unknown.
+        """
+        content_range = parse_content_range(response_headers.get('Content-Range'))
+        if content_range is not None:
+            length = content_range[2]
+        elif response_headers.get('Content-Length') is not None:
+            length = offset + int(response_headers['Content-Length'])
+        else:
+            length = None
+        meta = {
+            'url': url,
+            'length': length,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+        }
+        self.write_meta(meta)
+        return length
+
+    def write_meta(self, meta):
+        """Writes the sidecar, to a temporary file first so a crash can't corrupt it.
+
+        Args:
+            meta (dict): The sidecar.
+        """
+        with open(self.meta_path + '.tmp', 'w', encoding = 'utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+
+    def set_preallocated(self, preallocated):
+        """Records whether the .part file of a single stream download is preallocated past the bytes downloaded.
+
+        Args:
+            preallocated (bool): True while the download writes into a preallocated file,
+                False once the file was cut back to the bytes downloaded.
+        """
+        meta = self.load_meta()
+        if meta is not None:
+            meta['preallocated'] = preallocated
+            self.write_meta(meta)
+
+    def start_segmented(self, url, response_headers, length, segments):
+        """Records a segmented download and preallocates the .part file.
+
+        Args:
+            url (str): URL of the file.
+            response_headers (Mapping): Headers of the 206 response that gave the length.
+            length (int): Length of the whole file.
+            segments (list): List of [first byte, last byte, bytes downloaded] entries.
+        """
+        self.write_meta({
+            'url': url,
+            'length': length,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'segments': segments,
+        })
+        with open(self.part_path, 'wb') as f:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(f.fileno(), 0, length)
+            else:
+                f.truncate(length)
+
+    def get_segments(self, url):
+        """Gets the segments of a segmented download of a URL that can be continued.
+
+        Args:
+            url (str): URL of the file.
+
+        Returns:
+            list: List of [first byte, last byte, bytes downloaded] entries, or None if there is no segmented download of this URL.
+        """
+        meta = self.load_meta()
+        if (meta is None or meta.get('url') != url or meta.get('segments') is None
+                or not os.path.exists(self.part_path) or os.path.getsize(self.part_path) != meta['length']):
+            return None
+        return meta['segments']
+
+    def save_segments(self, segments):
+        """Records how much of each segment was downloaded.
+
+        Args:
+            segments (list): List of [first byte, last byte, bytes downloaded] entries.
+        """
+        meta = self.load_meta()
+        if meta is not None:
+            meta['segments'] = segments
+            self.write_meta(meta)
+
+    def is_complete(self):
+        """Checks if the .part file has the expected length.
+
+        Returns:
+            bool: True if the length is known and every byte was downloaded.
+        """
+        meta = self.load_meta()
+        if meta is None or meta.get('length') is None or not os.path.exists(self.part_path):
+            return False
+        if meta.get('segments') is not None and any(start + done != end + 1 for start, end, done in meta['segments']):
+            return False
+        return os.path.getsize(self.part_path) == meta['length']
+
+    def finish(self):
+        """Renames the .part file to the final path and removes the sidecar.
+        """
+        os.replace(self.part_path, self.file_path)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+
+    def discard(self):
+        """Removes the .part file and the sidecar.
+        """
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,250 @@
+"""Downloads clips in the order they happen in the game.
+
+This module contains the class DownloadScheduler, a priority queue of downloads ordered by the
+game timeline (period, game clock, then action number). Workers always take the earliest clip
+whose host isn't at its cap, a failed download is put back in the queue for any free worker to
+take, and iter_in_order() yields the clips in timeline order as soon as every earlier clip is
+done, so the clips at the start of the video can be used while later ones are still downloading.
+
+Typical usage example:
+    scheduler = DownloadScheduler(downloader, session, game_id)
+    for position, row in enumerate(event_ids.itertuples()):
+        scheduler.add(position, row, row.VIDEO_LINK, row.RENDITION)
+    scheduler.close()
+    run_task = asyncio.ensure_future(scheduler.run())
+    async for position, row, file_path in scheduler.iter_in_order():
+        ...
+    await run_task
+"""
+import re
+import bisect
+import heapq
+import asyncio
+from urllib.parse import urlsplit
+from NBAHighlightsMaker.common.renditions import DEFAULT_RENDITION
+
+def parse_clock(clock):
+    """Parses the game clock of a play-by-play action.
+
+    Args:
+        clock (str): Time left in the period, i.e "PT11M32.00S".
+
+    Returns:
+        float: Seconds left in the period, or None if the clock is missing or can't be parsed.
+    """
+    match = re.match(r'PT(\d+)M(\d+(?:\.\d+)?)S', clock) if isinstance(clock, str) else None
+    if not match:
+        return None
+    return int(match.group(1)) * 60 + float(match.group(2))
+
+def get_timeline_key(row):
+    """Gets the sort key of an event on the game timeline.
+
+    The clock counts down, so more seconds left means earlier in the period. Events without
+    a period or clock are sorted by action number, which also increases during the game.
+
+    Args:
+        row (pandas.Series): Row of data for the event containing actionNumber, and optionally period and clock.
+
+    Returns:
+        tuple: (period, minus the seconds left, actionNumber).
+    """
+    period = getattr(row, 'period', None)
+    seconds = parse_clock(getattr(row, 'clock', None))
+    if period is None or period != period or seconds is None:
+        return (0, 0.0, int(row.actionNumber))
+    return (int(period), -seconds, int(row.actionNumber))
+
+class DownloadScheduler:
+    """Priority queue of clip downloads, shared by a pool of workers.
+
+    Jobs are kept in a heap ordered by timeline key, then by position. A worker takes the first job
+    whose host has fewer than host_limit downloads running, on top of the limits of the rate limiter.
+    If a download fails, the job goes back in the heap with its priority, so the next free worker
+    steals it instead of the failed worker retrying it right away, up to max_requeues times.
+
+    Args:
+        downloader (Downloader): Object used to download the clips.
+        session (aiohttp.ClientSession): A session object used for the HTTP requests.
+        game_id (str, optional): NBA game ID, needed to add the clips to the clip store.
+        workers (int, optional): Number of clips downloaded at the same time. Defaults to 6.
+        host_limit (int, optional): Number of clips downloaded at the same time from one host. Defaults to 4.
+        max_requeues (int, optional): Number of times a failed download is put back in the queue. Defaults to 1.
+        on_done (Callable, optional): Called with the position, row and file path of each finished clip.
+
+    Attributes:
+        downloader (Downloader): Object used to download the clips.
+        session (aiohttp.ClientSession): A session object used for the HTTP requests.
+        game_id (str): NBA game ID.
+        workers (int): Number of clips downloaded at the same time.
+        host_limit (int): Number of clips downloaded at the same time from one host.
+        max_requeues (int): Number of times a failed download is put back in the queue.
+        on_done (Callable): Called with the position, row and file path of each finished clip.
+        heap (list): Jobs waiting, as (timeline key, position, requeues, row, video link, rendition) tuples.
+        order (list): (timeline key, position) of every job, sorted.
+        rows (dict): Maps positions to their row.
+        results (dict): Maps positions to the file path of their finished clip.
+        active (dict): Maps hosts to their number of downloads running.
+        closed (bool): True once no more jobs will be added.
+        error (Exception): Error of the download that failed for good, if any.
+        changed (asyncio.Event): Set when a job is added or finished, to wake the workers and iterators.
+    """
+    def __init__(self, downloader, session, game_id = None, workers = 6, host_limit = 4,
+                 max_requeues = 1, on_done = None):
+        self.downloader = downloader
+        self.session = session
+        self.game_id = game_id
+        self.workers = workers
+        self.host_limit = host_limit
+        self.max_requeues = max_requeues
+        self.on_done = on_done
+        self.heap = []
+        self.order = []
+        self.rows = {}
+        self.results = {}
+        self.active = {}
+        self.closed = False
+        self.error = None
+        self.changed = asyncio.Event()
+
+    def add(self, position, row, video_link, rendition = DEFAULT_RENDITION):
+        """Adds the download of a clip.
+
+        Args:
+            position (int): Position of the event in the DataFrame of events.
+            row (pandas.Series): Row of data for the event containing actionNumber, description, etc.
+            video_link (str): The download link of the video.
+            rendition (str, optional): Rendition of the link, the clip is stored under it. Defaults to DEFAULT_RENDITION.
+        """
+        key = get_timeline_key(row)
+        heapq.heappush(self.heap, (key, position, 0, row, video_link, rendition))
+        bisect.insort(self.order, (key, position))
+        self.rows[position] = row
+        self.notify()
+
+    def add_result(self, position, row, file_path):
+        """Adds a clip that doesn't need a download, i.e one from the clip store.
+
+        Args:
+            position (int): Position of the event in the DataFrame of events.
+            row (pandas.Series): Row of data for the event.
+            file_path (str): Path of the clip.
+        """
+        bisect.insort(self.order, (get_timeline_key(row), position))
+        self.rows[position] = row
+        self.results[position] = file_path
+        self.notify()
+
+    def close(self):
+        """Marks that every job was added, so the workers stop once the queue is empty.
+        """
+        self.closed = True
+        self.notify()
+
+    def notify(self):
+        """Wakes the workers and iterators waiting for a change.
+        """
+        self.changed.set()
+
+    async def wait_for_change(self):
+        """Waits until a job is added or finished. Everything runs on the event loop thread,
+        so nothing can change between checking the state and clearing the event.
+        """
+        self.changed.clear()
+        await self.changed.wait()
+
+    def take_job(self):
+        """Takes the earliest job whose host is under its cap.
+
+        Returns:
+            tuple: (timeline key, position, requeues, row, video link, rendition), or None if every waiting job's host is busy.
+        """
+        skipped = []
+        job = None
+        while self.heap:
+            candidate = heapq.heappop(self.heap)
+            host = urlsplit(candidate[4]).hostname
+            if self.active.get(host, 0) < self.host_limit:
+                job = candidate
+                self.active[host] = self.active.get(host, 0) + 1
+                break
+            skipped.append(candidate)
+        for candidate in skipped:
+            heapq.heappush(self.heap, candidate)
+        return job
+
+    async def worker(self):
+        """Downloads jobs until the queue is closed and empty.
+
+        Raises:
+            Exception: If a download failed more than max_requeues times.
+        """
+        while True:
+            while (job := self.take_job()) is None:
+                if self.closed and not self.heap:
+                    return
+                await self.wait_for_change()
+            key, position, requeues, row, video_link, rendition = job
+            host = urlsplit(video_link).hostname
+            try:
+                file_path = self.downloader.get_file_path(row, self.game_id)
+                await self.downloader.fetch_file(self.session, row, video_link, file_path)
+                if self.game_id:
+                    file_path = await asyncio.to_thread(self.downloader.store_clip, self.game_id, row, file_path, rendition)
+            except Exception as e:
+                if requeues >= self.max_requeues:
+                    self.error = e
+                    raise
+                print(f"Putting {row.actionNumber}.mp4 back in the queue after: {e}")
+                heapq.heappush(self.heap, (key, position, requeues + 1, row, video_link, rendition))
+                continue
+            finally:
+                self.active[host] -= 1
+                self.notify()
+            self.results[position] = file_path
+            if self.on_done is not None:
+                self.on_done(position, row, file_path)
+
+    async def run(self):
+        """Runs the workers until every clip is downloaded.
+
+        Raises:
+            Exception: If a download failed for good, after cancelling the other workers.
+        """
+        # more jobs can be added while a scheduler that isn't closed runs
+        num_workers = max(1, min(self.workers, len(self.heap))) if self.closed else self.workers
+        tasks = [asyncio.ensure_future(self.worker()) for _ in range(num_workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions = True)
+            if self.error is None:
+                self.error = e
+            self.notify()
+            raise
+
+    async def iter_in_order(self):
+        """Yields the clips in timeline order, each as soon as it and every earlier clip are done.
+
+        Yields:
+            tuple: (position, row, file path) of the next clip.
+
+        Raises:
+            Exception: The error of the download that failed for good.
+        """
+        yielded = set()
+        while True:
+            while True:
+                if self.error is not None:
+                    raise self.error
+                # a job added late can sort before clips already yielded, so look for the first one not yielded
+                position = next((position for _, position in self.order if position not in yielded), None)
+                if position is None and self.closed:
+                    return
+                if position is not None and position in self.results:
+                    break
+                await self.wait_for_change()
+            yielded.add(position)
+            yield position, self.rows[position], self.results[position]
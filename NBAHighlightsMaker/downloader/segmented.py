@@ -0,0 +1,124 @@
+"""Splits large clips into byte ranges that are downloaded at the same time.
+
+This module contains the class SegmentTuner, which picks how many ranges to download a clip
+with for each host, and the helper to plan the ranges of a preallocated file.
+A single connection to the video CDN is often slower than the link allows, so fetching a large
+clip over a few connections at once shortens the download, as long as the host doesn't throttle.
+
+Typical usage example:
+    num_segments = segment_tuner.get(host)
+    segments = plan_segments(length, num_segments)
+    ...download each segment into its range with a DownloadSink...
+    segment_tuner.record(host, len(segments), length / seconds)
+"""
+# a range smaller than this isn't worth its own request
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+def plan_segments(length, num_segments, min_segment_size = MIN_SEGMENT_SIZE):
+    """Splits a file into byte ranges of about the same size.
+
+    Args:
+        length (int): Length of the file in bytes.
+        num_segments (int): Number of ranges wanted.
+        min_segment_size (int, optional): Smallest range in bytes. Defaults to MIN_SEGMENT_SIZE.
+
+    Returns:
+        list: List of [first byte, last byte, bytes downloaded] entries, with nothing downloaded yet.
+    """
+    num_segments = max(1, min(num_segments, length // min_segment_size))
+    segment_size = -(-length // num_segments)
+    return [[start, min(start + segment_size, length) - 1, 0] for start in range(0, length, segment_size)]
+
+class SegmentTuner:
+    """Picks the number of segments per host by hill climbing on the measured throughput.
+
+    Each host starts at start_segments. After every download with the current number of
+    segments, the throughput (averaged over recent downloads) is compared to the neighbouring
+    counts: one segment is added while nothing says more segments are slower, and one is removed
+    when fewer segments were faster. A 429 or timeout during a segmented download halves the count,
+    and hosts that don't advertise Range requests are downloaded with a single stream from then on.
+
+    Args:
+        start_segments (int, optional): Number of segments a host starts with. Defaults to 2.
+        max_segments (int, optional): Highest number of segments. Defaults to 4.
+        smoothing (float, optional): Weight of the newest download in the average throughput. Defaults to 0.3.
+
+    Attributes:
+        start_segments (int): Number of segments a host starts with.
+        max_segments (int): Highest number of segments.
+        smoothing (float): Weight of the newest download in the average throughput.
+        counts (dict): Maps hosts to their current number of segments.
+        throughputs (dict): Maps hosts to a dict of average bytes per second by number of segments.
+        no_ranges (set): Hosts that don't support Range requests.
+    """
+    def __init__(self, start_segments = 2, max_segments = 4, smoothing = 0.3):
+        self.start_segments = start_segments
+        self.max_segments = max_segments
+        self.smoothing = smoothing
+        self.counts = {}
+        self.throughputs = {}
+        self.no_ranges = set()
+
+    def get(self, host):
+        """Gets the number of segments to download a clip from a host with.
+
+        Args:
+            host (str): Host of the clip.
+
+        Returns:
+            int: Number of segments, 1 for a single stream.
+        """
+        if host in self.no_ranges:
+            return 1
+        return self.counts.get(host, self.start_segments)
+
+    def record(self, host, num_segments, throughput):
+        """Records the throughput of a finished download and adjusts the number of segments.
+
+        Args:
+            host (str): Host of the clip.
+            num_segments (int): Number of segments the clip was downloaded with, 1 for a single stream.
+            throughput (float): Bytes per second of the whole download.
+        """
+        stats = self.throughputs.setdefault(host, {})
+        previous = stats.get(num_segments)
+        stats[num_segments] = throughput if previous is None else previous + self.smoothing * (throughput - previous)
+        current = self.get(host)
+        if num_segments != current or host in self.no_ranges:
+            return
+        fewer = stats.get(current - 1)
+        more = stats.get(current + 1)
+        if fewer is not None and stats[current] < fewer:
+            self.counts[host] = current - 1
+        elif current < self.max_segments and (more is None or more > stats[current]):
+            self.counts[host] = current + 1
+
+    def record_failure(self, host):
+        """Halves the number of segments after a 429 or timeout during a segmented download.
+
+        Args:
+            host (str): Host of the clip.
+        """
+        self.counts[host] = max(1, self.get(host) // 2)
+
+    def disable(self, host):
+        """Downloads every later clip from a host with a single stream.
+
+        Args:
+            host (str): Host whose responses don't have "Accept-Ranges: bytes".
+        """
+        self.no_ranges.add(host)
+
+    def metrics(self):
+        """Gets the number of segments and the throughputs of every host.
+
+        Returns:
+            list: One dict per host with the host, segments, ranges (False if unsupported) and the throughput by number of segments.
+        """
+        hosts = set(self.counts) | set(self.throughputs) | self.no_ranges
+        return [{
+            'host': host,
+            'segments': self.get(host),
+            'ranges': host not in self.no_ranges,
+            'throughput': {num_segments: round(value) for num_segments, value in sorted(self.throughputs.get(host, {}).items())},
+        } for host in hosts]
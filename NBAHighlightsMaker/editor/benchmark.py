@@ -0,0 +1,83 @@
+"""Measures how fast each encoder profile makes a video from the same clips, and how big the video is.
+
+This module contains benchmark_profiles(), which makes the same video once per encoder profile
+and reports the frames encoded per second and the size of each video. The videos are made in
+one ffmpeg process by FilterGraphRenderer, so the numbers are those of the encoder and not of
+MoviePy moving frames through Python. Passing a frame rate, i.e 60, shows what matching the
+frame rate of the clips saves.
+
+Typical usage example:
+    python -m NBAHighlightsMaker.editor.benchmark clip1.mp4 clip2.mp4 --fps 60
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from NBAHighlightsMaker.editor.ffmpeg_tools import probe_clip
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES
+from NBAHighlightsMaker.editor.filtergraph_render import FilterGraphRenderer
+
+async def benchmark_profiles(clip_paths, output_dir, profiles = None, target_resolution = (720, 1280), fps = None):
+    """Asynchronously makes the video with each profile, one after the other.
+
+    Args:
+        clip_paths (list): Paths of the clips, in the order they are shown.
+        output_dir (str): Directory of the videos, one per profile.
+        profiles (dict, optional): Maps names to EncoderProfile. Defaults to ENCODER_PROFILES.
+        target_resolution (tuple, optional): (height, width) of the videos. Defaults to (720, 1280).
+        fps (float, optional): Frame rate of the videos, None to match the clips. Defaults to None.
+
+    Returns:
+        list: A dict per profile with the keys "profile", "seconds", "frames", "encode_fps" and "size" in bytes.
+    """
+    results = []
+    for name, profile in (profiles or ENCODER_PROFILES).items():
+        output_path = os.path.join(output_dir, f"{name}.mp4")
+        renderer = FilterGraphRenderer(target_resolution = target_resolution, fps = fps)
+        start = time.perf_counter()
+        await renderer.render(clip_paths, output_path, 'fade', lambda seconds, total: None, profile = profile)
+        seconds = time.perf_counter() - start
+        info = await asyncio.to_thread(probe_clip, output_path)
+        frames = round(info.duration * info.fps)
+        results.append({'profile': name, 'seconds': seconds, 'frames': frames,
+                        'encode_fps': frames / seconds, 'size': os.path.getsize(output_path)})
+    return results
+
+def format_results(results):
+    """Formats the results of benchmark_profiles() as a table.
+
+    Args:
+        results (list): Results of benchmark_profiles().
+
+    Returns:
+        str: One line per profile.
+    """
+    lines = [f"{'profile':<12}{'time':>10}{'frames':>10}{'encode fps':>12}{'size':>12}"]
+    for result in results:
+        lines.append(f"{result['profile']:<12}{result['seconds']:>9.1f}s{result['frames']:>10}"
+                     f"{result['encode_fps']:>12.1f}{result['size'] / 1_000_000:>10.1f}MB")
+    return '\n'.join(lines)
+
+def main(argv = None):
+    """Runs the benchmark from the command line and prints the table.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description = "Compare the encoder profiles on the same clips.")
+    parser.add_argument('clips', nargs = '+', help = "Paths of the clips.")
+    parser.add_argument('--profiles', nargs = '+', choices = list(ENCODER_PROFILES), help = "Profiles to compare, all by default.")
+    parser.add_argument('--fps', type = float, help = "Frame rate of the videos, the one of the clips by default.")
+    parser.add_argument('--output-dir', help = "Keep the videos in this directory instead of removing them.")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    profiles = {name: ENCODER_PROFILES[name] for name in args.profiles or ENCODER_PROFILES}
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok = True)
+    with tempfile.TemporaryDirectory(prefix = 'nba-benchmark-') as tmp_dir:
+        results = asyncio.run(benchmark_profiles(args.clips, args.output_dir or tmp_dir, profiles, fps = args.fps))
+    print(format_results(results))
+
+if __name__ == '__main__':
+    main()
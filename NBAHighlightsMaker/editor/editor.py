@@ -2,12 +2,37 @@
 
 This module defines the MyProgressBarLogger class for logging the progress of the video editing
 on the UI, and the VideoMaker class for combining video clips into a final video.
+Without fades, clips that already match the final video are joined by ffmpeg without
+encoding. The clips can also be encoded in parallel processes and then joined, or only the
+frames around their fades can be encoded, or one ffmpeg filter graph can scale, fade and join
+them, instead of being encoded in one process by MoviePy. The video is encoded with the
+settings of an encoder profile, at the frame rate of the clips. MoviePy opens the files of
+the clips only while their frames are read, a few at a time. The audio is encoded to AAC in a
+directory of its own for each job, or left out when audio is off. The fades, render mode, encoder
+profile and audio are the JobSettings of each video, so jobs with other settings can share a VideoMaker.
 """
 
 import os
 import asyncio
+import tempfile
+import threading
 from proglog import ProgressBarLogger
 from PySide6.QtCore import Signal, QObject
+from NBAHighlightsMaker.editor.ffmpeg_tools import FfmpegError, probe_clip, can_concat_copy, concat_copy
+from NBAHighlightsMaker.editor.parallel_render import ParallelRenderer
+from NBAHighlightsMaker.editor.smart_render import SmartRenderer
+from NBAHighlightsMaker.editor.filtergraph_render import FilterGraphRenderer
+from NBAHighlightsMaker.editor.encoder_profiles import match_source_fps
+from NBAHighlightsMaker.common.job_settings import JobSettings
+
+# ways the final video can be encoded, with their name in the UI
+RENDER_MODES = {
+    'moviepy': "Standard",
+    'parallel': "Parallel (all cores)",
+    'smart': "Smart (encode fades only)",
+    'filtergraph': "Single ffmpeg pass",
+    'crossfade': "Single ffmpeg pass, crossfades",
+}
 
 class MyProgressBarLogger(QObject, ProgressBarLogger):
     """Custom progress bar logger for MoviePy updating progress in the UI and handling potential cancel from user.
@@ -17,11 +42,13 @@ class MyProgressBarLogger(QObject, ProgressBarLogger):
     Attributes:
         progress_bar_values (Signal): Signal emitting progress percentage and description.
         min_time_interval (float): Minimum time interval between progress updates.
+        fps (float): Frame rate of the video being written, to show the progress in seconds.
     """
     progress_bar_values = Signal(int, str)
     def __init__(self):
         super().__init__()
         self.min_time_interval = 1.0
+        self.fps = 60
 
     def bars_callback(self, bar, attr, value, old_value=None):
         """Callback to update progress bars in the UI.
@@ -40,7 +67,17 @@ class MyProgressBarLogger(QObject, ProgressBarLogger):
             total = self.bars[bar]['total']
             percent = int((value / total) * 100)
             # value and total are in frames, so convert to seconds
-            self.progress_bar_values.emit(percent, f"Editing - {percent}% : {(value / 60):.1f}s / {(total / 60):.1f}s")
+            self.progress_bar_values.emit(percent, f"Editing - {percent}% : {(value / self.fps):.1f}s / {(total / self.fps):.1f}s")
+
+    def time_callback(self, seconds, total):
+        """Callback to update the progress bar in the UI from the progress reported by ffmpeg.
+
+        Args:
+            seconds (float): Seconds of the video written.
+            total (float): Duration of the video in seconds.
+        """
+        percent = min(100, int((seconds / total) * 100)) if total else 0
+        self.progress_bar_values.emit(percent, f"Editing - {percent}% : {seconds:.1f}s / {total:.1f}s")
         
 #organize files in video created date
 class VideoMaker():
@@ -50,60 +87,208 @@ class VideoMaker():
     Args:
         update_progress_bar (Callable): Function to update the progress bar in the UI.
         data_dir (str): Directory where video clips are stored.
+        max_open_readers (int, optional): Maximum number of clip readers MoviePy has open at the same time. Defaults to 2.
 
     Attributes:
         data_dir (str): Directory where video clips are stored.
         logger (MyProgressBarLogger): Custom logger to update the progress bar UI and allow for cancelling the video editing.
+        target_resolution (tuple): (height, width) of the final video.
+        max_open_readers (int): Maximum number of clip readers MoviePy has open at the same time.
+        reader_pool (ReaderPool): Opens the readers of the clips from prepare_clip(), None until a clip is prepared.
+        reader_pool_lock (threading.Lock): Makes the threads preparing clips create a single reader_pool.
+        parallel_renderer (ParallelRenderer): Encodes the clips in parallel processes in the "parallel" render mode.
+        smart_renderer (SmartRenderer): Encodes only the frames around the fades in the "smart" render mode.
+        filtergraph_renderer (FilterGraphRenderer): Makes the video in one ffmpeg process in the "filtergraph" and
+            "crossfade" render modes.
     """
-    def __init__(self, update_progress_bar, data_dir):
+    def __init__(self, update_progress_bar, data_dir, max_open_readers = 2):
         self.data_dir = os.path.join(data_dir, 'vids')
         self.logger = MyProgressBarLogger()
         self.logger.progress_bar_values.connect(update_progress_bar)
+        self.target_resolution = (720, 1280)
+        self.max_open_readers = max_open_readers
+        self.reader_pool = None
+        self.reader_pool_lock = threading.Lock()
+        self.parallel_renderer = ParallelRenderer(target_resolution = self.target_resolution)
+        self.smart_renderer = SmartRenderer(target_resolution = self.target_resolution)
+        self.filtergraph_renderer = FilterGraphRenderer(target_resolution = self.target_resolution)
     
-    async def create_video_clips(self, clip_paths):
-        """Creates VideoFileClip objects from file paths with fade-in and fade-out effects.
+    def prepare_clip(self, clip_path, settings = None):
+        """Makes a video clip, resized and with fade-in and fade-out effects if fades are on.
+
+        Only the streams of the file are read here, the file is opened by reader_pool once the
+        frames of the clip are needed. This is blocking, so callers on the event loop should run it in a thread.
+
+        Args:
+            clip_path (str): Path of the video clip.
+            settings (JobSettings, optional): Settings of the video the clip is in. Defaults to the default settings.
+
+        Returns:
+            LazyVideoFileClip: The clip with its effects.
+        """
+        settings = settings or JobSettings()
+        # lazy loading
+        from moviepy.video.fx.all import fadein, fadeout
+        from NBAHighlightsMaker.editor.lazy_clips import ReaderPool, LazyVideoFileClip
+        with self.reader_pool_lock:
+            if self.reader_pool is None:
+                self.reader_pool = ReaderPool(self.max_open_readers)
+        clip = LazyVideoFileClip(clip_path, self.reader_pool, target_resolution = self.target_resolution, audio = settings.audio)
+        if settings.fades:
+            clip = fadein(clip, duration=1)
+            clip = fadeout(clip, duration=1)
+        return clip
+
+    async def try_concat_copy(self, clip_paths, output_path, settings):
+        """Asynchronously joins the clips without encoding, if fades are off and the clips match the final video.
+
+        Every clip is probed, and the clips are only joined if they have the same codecs, pixel format,
+        frame rate and audio, and are already the size of the final video. The audio is copied too
+        unless audio is off.
+
+        Args:
+            clip_paths (list): List of video clip file paths, in the order they are shown.
+            output_path (str): Path of the final video.
+            settings (JobSettings): Settings of the video.
+
+        Returns:
+            bool: True if the video was written, False if it has to be made with MoviePy.
+        """
+        if settings.fades or not clip_paths:
+            return False
+        try:
+            infos = await asyncio.to_thread(lambda: [probe_clip(clip_path) for clip_path in clip_paths])
+        except (FfmpegError, OSError) as e:
+            print(f"Could not probe the clips, encoding the video instead: {e}")
+            return False
+        height, width = self.target_resolution
+        if not can_concat_copy(infos, width, height, settings.audio):
+            print("The clips don't share their codecs and size, encoding the video instead.")
+            return False
+        self.logger.progress_bar_values.emit(0, "Joining clips...")
+        try:
+            await concat_copy(clip_paths, output_path, settings.audio)
+        except FfmpegError as e:
+            print(f"Could not join the clips, encoding the video instead: {e}")
+            return False
+        self.logger.progress_bar_values.emit(100, "Joined clips")
+        return True
+
+    async def render_files(self, clip_paths, output_path, settings = None):
+        """Asynchronously makes the final video from the clip files, without MoviePy encoding it in this process.
+
+        Clips that match the final video are joined without encoding if fades are off. Otherwise
+        the "parallel" render mode encodes the clips in a pool of processes, and the "smart" render
+        mode encodes only the frames around the fades of clips that match the final video. The
+        "filtergraph" and "crossfade" render modes make the video in one ffmpeg process, fading the
+        clips through black or into each other.
+
+        Args:
+            clip_paths (list): List of video clip file paths, in the order they are shown.
+            output_path (str): Path of the final video.
+            settings (JobSettings, optional): Settings of the video. Defaults to the default settings.
+
+        Returns:
+            bool: True if the video was written, False if it has to be made with MoviePy.
+
+        Raises:
+            Exception: If the parallel or ffmpeg render fails.
+        """
+        settings = settings or JobSettings()
+        if await self.try_concat_copy(clip_paths, output_path, settings):
+            return True
+        profile = settings.get_encoder_profile()
+        if settings.render_mode == 'smart' and clip_paths:
+            try:
+                if await self.smart_renderer.render(clip_paths, output_path, self.logger.progress_bar_values.emit,
+                                                    settings.audio, profile):
+                    return True
+                print("The clips don't share their codecs and size, encoding the video instead.")
+            except (FfmpegError, OSError) as e:
+                print(f"Could not encode only the fades, encoding the video instead: {e}")
+            return False
+        if settings.render_mode in ('filtergraph', 'crossfade') and clip_paths:
+            transition = ('crossfade' if settings.render_mode == 'crossfade' else 'fade') if settings.fades else None
+            await self.filtergraph_renderer.render(clip_paths, output_path, transition, self.logger.time_callback,
+                                                   settings.audio, profile)
+            return True
+        if settings.render_mode == 'parallel' and clip_paths:
+            await self.parallel_renderer.render(clip_paths, output_path, settings.fades, self.logger.progress_bar_values.emit,
+                                                settings.audio, profile)
+            return True
+        return False
+
+    async def create_video_clips(self, clip_paths, settings = None):
+        """Creates clips from file paths with fade-in and fade-out effects, without opening their files.
         
         Args:
             clip_paths (list): List of video clip file paths.
+            settings (JobSettings, optional): Settings of the video. Defaults to the default settings.
 
         Returns:
-            list: List of VideoFileClip objects.
+            list: List of LazyVideoFileClip objects.
         """
         new_clips = []
-        # lazy loading
-        from moviepy.video.fx.all import fadein, fadeout
-        from moviepy.editor import VideoFileClip
         for clip_path in clip_paths:
-            clip = VideoFileClip(clip_path, target_resolution = (720, 1280))
-            clip = fadein(clip, duration=1)
-            clip = fadeout(clip, duration=1) 
-            new_clips.append(clip)
+            new_clips.append(self.prepare_clip(clip_path, settings))
         
         return new_clips
 
     # concatenate all composite clips
-    async def make_final_vid(self, clip_paths):
+    async def make_final_vid(self, clip_paths, output_path = None, settings = None):
         """
         Concatenates video clips and writes the final video file.
 
         From a list of video clip paths, this function creates the video clip objects for each clip,
-        concatenates them into a single video, and writes the file to disk.
+        concatenates them into a single video, and writes the file to disk. Without fades, clips that
+        match the final video are joined by ffmpeg without encoding instead, in the "parallel"
+        render mode the clips are encoded in parallel processes, and in the "smart" render mode
+        only the frames around the fades are encoded. The "filtergraph" and "crossfade" render
+        modes make the video in one ffmpeg process.
 
         Args:
             clip_paths (list): List of video clip file paths, usually from the event_ids dataframe.
+            output_path (str, optional): Path of the final video. Defaults to final_vid.mp4 in the data directory.
+            settings (JobSettings, optional): Settings of the video. Defaults to the default settings.
+
+        Raises:
+            Exception: For unexpected errors during video creation.    
+        """
+        if await self.render_files(clip_paths, output_path or os.path.join(self.data_dir, "final_vid.mp4"), settings):
+            return
+        await self.write_final_vid(await self.create_video_clips(clip_paths, settings), output_path, settings)
+
+    async def write_final_vid(self, clips, output_path = None, settings = None):
+        """
+        Concatenates clips that were already prepared and writes the final video file.
+
+        The clips are closed once the video is written, or if writing it fails. The audio is encoded
+        to AAC in a temporary directory next to the video and copied into it, so jobs running at the
+        same time don't write the same file.
+
+        Args:
+            clips (list): List of LazyVideoFileClip objects from prepare_clip(), in the order they are shown.
+            output_path (str, optional): Path of the final video. Defaults to final_vid.mp4 in the data directory.
+            settings (JobSettings, optional): Settings the clips were prepared with. Defaults to the default settings.
 
         Raises:
             Exception: For unexpected errors during video creation.    
         """
-        clips = None
         final_vid = None
+        settings = settings or JobSettings()
         from moviepy.editor import concatenate_videoclips
         try:
-            clips = await self.create_video_clips(clip_paths)
+            path = output_path or os.path.join(self.data_dir, "final_vid.mp4")
             self.total_duration = sum([clip.duration for clip in clips])
             final_vid = concatenate_videoclips(clips, method="chain")
-            path = os.path.join(self.data_dir, "final_vid.mp4")
-            await asyncio.to_thread(final_vid.write_videofile, path, codec='libx264', temp_audiofile='temp-audio.mp3', fps=60, logger=self.logger)
+            # the clips are usually 30 fps, a higher frame rate would only repeat their frames
+            fps = float(match_source_fps([getattr(clip, 'fps', None) for clip in clips]))
+            self.logger.fps = fps
+            output_dir = os.path.dirname(os.path.abspath(path))
+            with tempfile.TemporaryDirectory(prefix = 'nba-audio-', dir = output_dir, ignore_cleanup_errors = True) as tmp_dir:
+                await asyncio.to_thread(final_vid.write_videofile, path, audio=settings.audio, audio_codec='aac',
+                                        temp_audiofile=os.path.join(tmp_dir, 'audio.m4a'), fps=fps, logger=self.logger,
+                                        **settings.get_encoder_profile().get_moviepy_args())
         except asyncio.CancelledError:
             print("Caught asyncio.CancelledError in make_final_vid.")
             raise
@@ -118,8 +303,4 @@ class VideoMaker():
                     clip.close()
             if final_vid:
                 final_vid.close()
-            await asyncio.sleep(1.0)
-            if os.path.exists(os.path.join("temp-audio.mp3")):
-                os.remove(os.path.join("temp-audio.mp3"))
-                print("Deleted the temp audio file")
             
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Encoder settings of the final video, and the frame rate it is made at.
+
+This module contains the class EncoderProfile, the x264 preset, rate control, tune and thread
+count of a final video, and ENCODER_PROFILES, the profiles that can be picked in the UI. The
+final video is made at the frame rate of its clips instead of a fixed 60 fps: the clips from the
+NBA website are usually 30 fps, so encoding at 60 fps doubles the frames without adding any.
+
+Typical usage example:
+    profile = ENCODER_PROFILES['preview']
+    fps = match_source_fps([clip.fps for clip in clips])
+    final_vid.write_videofile(output_path, fps = float(fps), **profile.get_moviepy_args())
+"""
+from fractions import Fraction
+
+# frame rate of the final video when the frame rate of the clips isn't known
+DEFAULT_FPS = 60
+
+class EncoderProfile:
+    """x264 settings of the final video.
+
+    Args:
+        name (str): Name of the profile in the UI.
+        preset (str): x264 preset, slower presets make smaller videos of the same quality.
+        crf (int, optional): Constant rate factor, lower is better quality and bigger. Defaults to None.
+        bitrate (str, optional): Video bitrate, i.e "6M", used instead of the CRF. Defaults to None.
+        tune (str, optional): x264 tune, i.e "film". Defaults to None.
+        threads (int, optional): Encoder threads, None to let ffmpeg pick. Defaults to None.
+
+    Attributes:
+        name (str): Name of the profile in the UI.
+        preset (str): x264 preset.
+        crf (int): Constant rate factor, None if a bitrate is used.
+        bitrate (str): Video bitrate, None if the CRF is used.
+        tune (str): x264 tune, None for none.
+        threads (int): Encoder threads, None to let ffmpeg pick.
+    """
+    def __init__(self, name, preset, crf = None, bitrate = None, tune = None, threads = None):
+        self.name = name
+        self.preset = preset
+        self.crf = crf
+        self.bitrate = bitrate
+        self.tune = tune
+        self.threads = threads
+
+    def get_rate_args(self):
+        """Gets the rate control and tune arguments of ffmpeg.
+
+        Returns:
+            list: ffmpeg arguments.
+        """
+        args = []
+        if self.bitrate:
+            # capped, so the video can be uploaded where the bitrate is limited
+            args += ['-b:v', self.bitrate, '-maxrate', self.bitrate, '-bufsize', self.bitrate]
+        elif self.crf is not None:
+            args += ['-crf', str(self.crf)]
+        if self.tune:
+            args += ['-tune', self.tune]
+        return args
+
+    def get_ffmpeg_args(self, threads = None):
+        """Gets the video encoder arguments of ffmpeg.
+
+        Args:
+            threads (int, optional): Encoder threads instead of the ones of the profile. Defaults to None.
+
+        Returns:
+            list: ffmpeg arguments.
+        """
+        args = ['-c:v', 'libx264', '-preset', self.preset, *self.get_rate_args()]
+        threads = threads or self.threads
+        if threads:
+            args += ['-threads', str(threads)]
+        return args
+
+    def get_moviepy_args(self, threads = None):
+        """Gets the video encoder arguments of MoviePy's write_videofile().
+
+        Args:
+            threads (int, optional): Encoder threads instead of the ones of the profile. Defaults to None.
+
+        Returns:
+            dict: Keyword arguments of write_videofile().
+        """
+        return {'codec': 'libx264', 'preset': self.preset, 'threads': threads or self.threads,
+                'ffmpeg_params': self.get_rate_args()}
+
+# profiles that can be picked in the UI, "standard" are the x264 defaults the video was always made with
+ENCODER_PROFILES = {
+    'standard': EncoderProfile("Standard", 'medium', crf = 23),
+    'preview': EncoderProfile("Fast preview", 'ultrafast', crf = 28, tune = 'fastdecode'),
+    'archive': EncoderProfile("Archive", 'slow', crf = 18, tune = 'film'),
+    'social': EncoderProfile("Social", 'medium', bitrate = '6M'),
+}
+DEFAULT_PROFILE = 'standard'
+
+def match_source_fps(fps_values, default = DEFAULT_FPS):
+    """Gets the frame rate of the final video from the frame rates of its clips.
+
+    The highest frame rate is used, so no clip loses frames. The NTSC rates that ffmpeg prints
+    rounded, i.e 29.97, are turned back into their exact value, i.e 30000/1001.
+
+    Args:
+        fps_values (list): Frame rate of each clip, None if not known.
+        default (int, optional): Frame rate used if no clip has a known one. Defaults to DEFAULT_FPS.
+
+    Returns:
+        Fraction: Frame rate of the final video.
+    """
+    known = [fps for fps in fps_values if fps]
+    if not known:
+        return Fraction(default)
+    fps = max(known)
+    ntsc = round(fps * 1.001)
+    if abs(fps - round(fps)) > 0.01 and abs(fps * 1.001 - ntsc) < 0.01:
+        return Fraction(ntsc * 1000, 1001)
+    return Fraction(fps).limit_denominator(1000)
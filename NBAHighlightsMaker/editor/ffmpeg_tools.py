@@ -0,0 +1,277 @@
+"""Runs ffmpeg directly, for the edits that don't need MoviePy to decode every frame.
+
+This module contains the class ClipInfo, the streams of a clip parsed from the output of
+"ffmpeg -i", and the helpers to probe clips and to join clips with the concat demuxer.
+Clips that share their codecs, resolution and frame rate can be joined by copying their
+packets into one file, which takes seconds instead of decoding and encoding the whole video.
+Only the ffmpeg binary that MoviePy uses is needed, ffprobe isn't always installed with it.
+
+Typical usage example:
+    infos = [probe_clip(clip_path) for clip_path in clip_paths]
+    if can_concat_copy(infos, 1280, 720):
+        await concat_copy(clip_paths, output_path)
+"""
+import os
+import re
+import asyncio
+import tempfile
+import subprocess
+
+class FfmpegError(Exception):
+    """Raised when ffmpeg fails or its output can't be parsed.
+    """
+
+def get_ffmpeg_exe():
+    """Gets the ffmpeg binary used by MoviePy.
+
+    Returns:
+        str: Path or name of the ffmpeg binary.
+    """
+    # lazy loading
+    from moviepy.config import get_setting
+    return get_setting('FFMPEG_BINARY')
+
+def split_fields(text):
+    """Splits a stream description of "ffmpeg -i" on the commas that aren't inside parentheses.
+
+    Args:
+        text (str): i.e "h264 (High) (avc1 / 0x31637661), yuv420p(tv, bt709), 1280x720 [SAR 1:1 DAR 16:9], 30 fps".
+
+    Returns:
+        list: The fields, stripped.
+    """
+    fields = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif char == ',' and depth == 0:
+            fields.append(text[start:i].strip())
+            start = i + 1
+    fields.append(text[start:].strip())
+    return fields
+
+class ClipInfo:
+    """Streams of a clip, as reported by "ffmpeg -i".
+
+    Args:
+        path (str): Path of the clip.
+        output (str): What "ffmpeg -i" printed about the clip.
+
+    Attributes:
+        path (str): Path of the clip.
+        duration (float): Duration in seconds, None if unknown.
+        video_codec (str): Codec of the first video stream, i.e "h264", None if there is no video.
+        video_profile (str): Profile of the video codec, i.e "High", None if not reported.
+        pix_fmt (str): Pixel format of the video, i.e "yuv420p".
+        width (int): Width of the video in pixels.
+        height (int): Height of the video in pixels.
+        fps (float): Frame rate of the video.
+        audio_codec (str): Codec of the first audio stream, i.e "aac", None if there is no audio.
+        sample_rate (int): Sample rate of the audio in Hz.
+        channels (str): Channel layout of the audio, i.e "stereo".
+
+    Raises:
+        FfmpegError: If the output has no video stream.
+    """
+    def __init__(self, path, output):
+        self.path = path
+        self.duration = None
+        self.video_codec = None
+        self.video_profile = None
+        self.pix_fmt = None
+        self.width = None
+        self.height = None
+        self.fps = None
+        self.audio_codec = None
+        self.sample_rate = None
+        self.channels = None
+        match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+        if match:
+            self.duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+        for line in output.splitlines():
+            match = re.search(r'Stream #\d+:\d+.*?: (Video|Audio): (.*)', line)
+            if not match:
+                continue
+            fields = split_fields(match.group(2))
+            codec = re.match(r'(\w+)(?: \(([^)]*)\))?', fields[0])
+            if match.group(1) == 'Video' and self.video_codec is None:
+                self.video_codec = codec.group(1)
+                # the parentheses after the codec are the profile, unless they are the codec tag
+                if codec.group(2) and '/' not in codec.group(2):
+                    self.video_profile = codec.group(2)
+                if len(fields) > 1:
+                    self.pix_fmt = re.match(r'\w+', fields[1]).group(0)
+                for field in fields[1:]:
+                    size = re.match(r'(\d+)x(\d+)', field)
+                    rate = re.match(r'(\d+(?:\.\d+)?)(k?) (fps|tbr)', field)
+                    if size and self.width is None:
+                        self.width, self.height = int(size.group(1)), int(size.group(2))
+                    elif rate and (self.fps is None or rate.group(3) == 'fps'):
+                        self.fps = float(rate.group(1)) * (1000 if rate.group(2) else 1)
+            elif match.group(1) == 'Audio' and self.audio_codec is None:
+                self.audio_codec = codec.group(1)
+                for field in fields[1:]:
+                    rate = re.match(r'(\d+) Hz', field)
+                    if rate:
+                        self.sample_rate = int(rate.group(1))
+                    elif field in ('mono', 'stereo') or re.match(r'\d\.\d', field):
+                        self.channels = field
+        if self.video_codec is None:
+            raise FfmpegError(f"No video stream found in {path}.")
+
+    def get_stream_key(self):
+        """Gets the parameters that must match for clips to be joined without encoding.
+
+        Returns:
+            tuple: Video codec, profile, pixel format, size and frame rate, then audio codec, sample rate and channels.
+        """
+        return (self.video_codec, self.video_profile, self.pix_fmt, self.width, self.height, self.fps,
+                self.audio_codec, self.sample_rate, self.channels)
+
+def probe_clip(clip_path):
+    """Gets the streams of a clip from the output of "ffmpeg -i". This is blocking, so run it in a thread.
+
+    Args:
+        clip_path (str): Path of the clip.
+
+    Returns:
+        ClipInfo: The streams of the clip.
+
+    Raises:
+        FfmpegError: If the clip can't be read.
+    """
+    # without an output file ffmpeg only prints the streams and exits with an error
+    result = subprocess.run([get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-i', clip_path],
+                            stdout = subprocess.DEVNULL, stderr = subprocess.PIPE)
+    output = result.stderr.decode('utf-8', errors = 'replace')
+    if 'Input #0' not in output:
+        raise FfmpegError(f"Could not read {clip_path}: {output.strip().splitlines()[-1:]}")
+    return ClipInfo(clip_path, output)
+
+def get_keyframes(clip_path):
+    """Gets the times of the keyframes of a clip, decoding only the keyframes. This is blocking, so run it in a thread.
+
+    Args:
+        clip_path (str): Path of the clip.
+
+    Returns:
+        list: Times of the keyframes of the first video stream in seconds, in order.
+
+    Raises:
+        FfmpegError: If the clip can't be read.
+    """
+    result = subprocess.run([get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-skip_frame', 'nokey', '-i', clip_path,
+                             '-map', '0:v:0', '-vf', 'showinfo', '-f', 'null', '-'],
+                            stdout = subprocess.DEVNULL, stderr = subprocess.PIPE)
+    output = result.stderr.decode('utf-8', errors = 'replace')
+    if result.returncode != 0:
+        raise FfmpegError(f"Could not read the keyframes of {clip_path}: {output.strip().splitlines()[-1:]}")
+    return sorted(float(time) for time in re.findall(r'pts_time:\s*(-?\d+(?:\.\d+)?)', output))
+
+def can_concat_copy(infos, width, height, audio = True):
+    """Checks if clips can be joined by copying their packets into a video of the given size.
+
+    Args:
+        infos (list): ClipInfo of each clip.
+        width (int): Width of the final video in pixels.
+        height (int): Height of the final video in pixels.
+        audio (bool, optional): Whether the audio is joined too, otherwise only the video streams must match. Defaults to True.
+
+    Returns:
+        bool: True if every clip has the same streams and is already the size of the final video.
+    """
+    if not infos:
+        return False
+    # the audio comes after the 6 video parameters
+    length = None if audio else 6
+    key = infos[0].get_stream_key()[:length]
+    return (all(info.get_stream_key()[:length] == key for info in infos)
+            and (infos[0].width, infos[0].height) == (width, height))
+
+def write_concat_list(clip_paths, list_path):
+    """Writes the input file of the concat demuxer.
+
+    Args:
+        clip_paths (list): Paths of the clips, in the order they are shown.
+        list_path (str): Path of the list file.
+    """
+    with open(list_path, 'w', encoding = 'utf-8') as f:
+        for clip_path in clip_paths:
+            # quotes are closed, escaped and reopened
+            escaped = os.path.abspath(clip_path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+def parse_progress_line(line):
+    """Gets the time of video written from a line of "ffmpeg -progress".
+
+    Args:
+        line (str): i.e "out_time_us=1234567".
+
+    Returns:
+        float: Seconds of video written, None if the line is about something else or the time isn't known yet.
+    """
+    match = re.match(r'out_time_us=(\d+)', line.strip())
+    return int(match.group(1)) / 1_000_000 if match else None
+
+async def run_ffmpeg(args, on_progress = None):
+    """Asynchronously runs ffmpeg, killing it if the task is cancelled.
+
+    The process is waited on in a thread, so this works on any event loop. With on_progress, ffmpeg
+    writes its progress to stdout, which is read in the same thread.
+
+    Args:
+        args (list): Arguments after the binary.
+        on_progress (Callable, optional): Called on the event loop with the seconds of video written.
+
+    Raises:
+        FfmpegError: If ffmpeg exits with an error, with the end of its output.
+    """
+    loop = asyncio.get_running_loop()
+    progress_args = ['-progress', 'pipe:1', '-nostats'] if on_progress else []
+
+    def wait():
+        if on_progress:
+            # the pipe is closed once ffmpeg exits or is killed
+            for line in process.stdout:
+                seconds = parse_progress_line(line.decode('utf-8', errors = 'replace'))
+                if seconds is not None:
+                    loop.call_soon_threadsafe(on_progress, seconds)
+            process.stdout.close()
+        return process.wait()
+
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen([get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-y', *progress_args, *args],
+                                   stdin = subprocess.DEVNULL, stderr = stderr,
+                                   stdout = subprocess.PIPE if on_progress else subprocess.DEVNULL)
+        try:
+            returncode = await asyncio.to_thread(wait)
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        if returncode != 0:
+            stderr.seek(0)
+            output = stderr.read().decode('utf-8', errors = 'replace').strip().splitlines()
+            raise FfmpegError(f"ffmpeg exited with code {returncode}: {' '.join(output[-3:])}")
+
+async def concat_copy(clip_paths, output_path, audio = True):
+    """Asynchronously joins clips with the concat demuxer, copying their packets without encoding.
+
+    Args:
+        clip_paths (list): Paths of the clips, in the order they are shown.
+        output_path (str): Path of the final video.
+        audio (bool, optional): Whether to copy the audio too. Defaults to True.
+
+    Raises:
+        FfmpegError: If ffmpeg fails.
+    """
+    # each join gets its own list file, so jobs running at the same time don't share one
+    with tempfile.TemporaryDirectory(prefix = 'nba-concat-') as tmp_dir:
+        list_path = os.path.join(tmp_dir, 'clips.txt')
+        write_concat_list(clip_paths, list_path)
+        audio_args = ['-map', '0:a:0?'] if audio else ['-an']
+        await run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path, '-map', '0:v:0', *audio_args, '-c', 'copy',
+                          '-movflags', '+faststart', output_path])
@@ -0,0 +1,136 @@
+"""Makes the final video with one ffmpeg process running a filter graph over every clip.
+
+This module contains the class FilterGraphRenderer. MoviePy decodes every frame into a NumPy
+array, resizes and fades it in Python, and pipes it back to ffmpeg. FilterGraphRenderer gives
+ffmpeg every clip as an input and builds one filter_complex graph that scales the clips, fades
+them, and joins them, so the frames never leave ffmpeg. The clips either fade in and out through
+black like the MoviePy render, or crossfade into each other, with their audio crossfaded too.
+The progress ffmpeg reports with "-progress" is sent to the progress bar.
+
+Typical usage example:
+    renderer = FilterGraphRenderer(target_resolution = (720, 1280))
+    await renderer.render(clip_paths, output_path, transition = 'fade', on_progress = logger.time_callback)
+"""
+import os
+import asyncio
+from NBAHighlightsMaker.editor.ffmpeg_tools import FfmpegError, probe_clip, run_ffmpeg
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE, match_source_fps
+
+# the audio of every clip is converted to this, the audio of MoviePy's VideoFileClip is read the same way
+AUDIO_FORMAT = 'aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo'
+
+def build_filter_graph(infos, width, height, fps, transition = None, fade_duration = 1, audio = True):
+    """Builds the filter graph scaling, fading and joining the clips.
+
+    The audio of each clip is padded with silence or cut to the length of the clip, so the audio
+    stays in sync with the video when the clips overlap. A clip without audio gets silence.
+
+    Args:
+        infos (list): ClipInfo of each clip, in the order they are shown. Input i of ffmpeg is clip i.
+        width (int): Width of the final video in pixels.
+        height (int): Height of the final video in pixels.
+        fps (Fraction): Frame rate of the final video.
+        transition (str, optional): "fade" to fade each clip in and out through black, "crossfade" to
+            fade each clip into the next one, or None to cut from clip to clip. Defaults to None.
+        fade_duration (float, optional): Duration of each fade in seconds. Defaults to 1.
+        audio (bool, optional): Whether to join the audio too, the graph only outputs [v] otherwise. Defaults to True.
+
+    Returns:
+        tuple: The filter graph, and the duration of the final video in seconds.
+    """
+    filters = []
+    durations = [info.duration for info in infos]
+    for index, (info, duration) in enumerate(zip(infos, durations)):
+        video = f'[{index}:v:0]scale={width}:{height},setsar=1,fps={fps},format=yuv420p'
+        first, last = index == 0, index == len(infos) - 1
+        if transition == 'fade' or (transition == 'crossfade' and first):
+            video += f',fade=t=in:st=0:d={fade_duration}'
+        if transition == 'fade' or (transition == 'crossfade' and last):
+            video += f',fade=t=out:st={max(0, duration - fade_duration):.3f}:d={fade_duration}'
+        filters.append(f'{video}[v{index}]')
+        if not audio:
+            continue
+        if info.audio_codec:
+            audio_filter = f'[{index}:a:0]{AUDIO_FORMAT}'
+        else:
+            audio_filter = 'anullsrc=r=44100:cl=stereo'
+        filters.append(f'{audio_filter},apad,atrim=end={duration:.3f}[a{index}]')
+    if transition == 'crossfade':
+        video_label, audio_label = 'v0', 'a0'
+        total = durations[0]
+        for index in range(1, len(infos)):
+            # a fade can't be longer than half of the clips on either side of it
+            overlap = min(fade_duration, durations[index - 1] / 2, durations[index] / 2)
+            filters.append(f'[{video_label}][v{index}]xfade=transition=fade:duration={overlap:.3f}'
+                           f':offset={total - overlap:.3f}[vx{index}]')
+            if audio:
+                filters.append(f'[{audio_label}][a{index}]acrossfade=d={overlap:.3f}[ax{index}]')
+            video_label, audio_label = f'vx{index}', f'ax{index}'
+            total += durations[index] - overlap
+        filters.append(f'[{video_label}]null[v]')
+        if audio:
+            filters.append(f'[{audio_label}]anull[a]')
+    else:
+        total = sum(durations)
+        if audio:
+            inputs = ''.join(f'[v{index}][a{index}]' for index in range(len(infos)))
+            filters.append(f'{inputs}concat=n={len(infos)}:v=1:a=1[v][a]')
+        else:
+            inputs = ''.join(f'[v{index}]' for index in range(len(infos)))
+            filters.append(f'{inputs}concat=n={len(infos)}:v=1:a=0[v]')
+    return ';'.join(filters), total
+
+class FilterGraphRenderer:
+    """Makes the final video from the clip files in one ffmpeg process.
+
+    Every clip is an input of the same process, so each one has a decoder open until the video is written.
+
+    Args:
+        target_resolution (tuple, optional): (height, width) of the final video. Defaults to (720, 1280).
+        fps (Fraction, optional): Frame rate of the final video, None to match the clips. Defaults to None.
+        fade_duration (float, optional): Duration of each fade in seconds. Defaults to 1.
+
+    Attributes:
+        target_resolution (tuple): (height, width) of the final video.
+        fps (Fraction): Frame rate of the final video, None to match the clips.
+        fade_duration (float): Duration of each fade in seconds.
+    """
+    def __init__(self, target_resolution = (720, 1280), fps = None, fade_duration = 1):
+        self.target_resolution = target_resolution
+        self.fps = fps
+        self.fade_duration = fade_duration
+
+    async def render(self, clip_paths, output_path, transition, on_progress, audio = True, profile = None):
+        """Asynchronously scales, fades and joins the clips into the final video.
+
+        A partly written video is removed if ffmpeg fails or the render is cancelled.
+
+        Args:
+            clip_paths (list): Paths of the clips, in the order they are shown.
+            output_path (str): Path of the final video.
+            transition (str): "fade", "crossfade" or None, see build_filter_graph().
+            on_progress (Callable): Called with the seconds of video written and the duration of the video.
+            audio (bool, optional): Whether the final video has the audio of the clips, encoded to AAC. Defaults to True.
+            profile (EncoderProfile, optional): Encoder settings. Defaults to the default profile.
+
+        Raises:
+            FfmpegError: If a clip can't be read or ffmpeg fails.
+        """
+        infos = await asyncio.to_thread(lambda: [probe_clip(clip_path) for clip_path in clip_paths])
+        unknown = [info.path for info in infos if info.duration is None]
+        if unknown:
+            raise FfmpegError(f"Unknown duration of {', '.join(unknown)}.")
+        profile = profile or ENCODER_PROFILES[DEFAULT_PROFILE]
+        height, width = self.target_resolution
+        fps = self.fps or match_source_fps([info.fps for info in infos])
+        graph, duration = build_filter_graph(infos, width, height, fps, transition, self.fade_duration, audio)
+        audio_args = ['-map', '[a]', '-c:a', 'aac'] if audio else ['-an']
+        inputs = [arg for clip_path in clip_paths for arg in ('-i', clip_path)]
+        try:
+            # xfade can pick another pixel format, players expect yuv420p
+            await run_ffmpeg([*inputs, '-filter_complex', graph, '-map', '[v]', *profile.get_ffmpeg_args(),
+                              '-pix_fmt', 'yuv420p', *audio_args, '-movflags', '+faststart', output_path], on_progress = lambda seconds: on_progress(seconds, duration))
+        except BaseException:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
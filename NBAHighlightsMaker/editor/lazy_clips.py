@@ -0,0 +1,173 @@
+"""Clips that open their file only while their frames are being read.
+
+A MoviePy VideoFileClip starts an ffmpeg process for its video and another one for its audio
+as soon as it is made, and keeps them and their buffers until it is closed, so a video of 100
+clips has 200 ffmpeg processes open while it is written. This module contains the class
+LazyVideoFileClip, which only reads the streams of its file when it is made, and the class
+ReaderPool, which opens the file the first time a frame of the clip is needed. The pool keeps
+at most max_open readers open, closing the least recently used one before opening another, so
+the processes and memory used while writing the video don't grow with the number of clips.
+
+Typical usage example:
+    pool = ReaderPool(max_open = 2)
+    clips = [LazyVideoFileClip(clip_path, pool, target_resolution = (720, 1280)) for clip_path in clip_paths]
+    concatenate_videoclips(clips).write_videofile(output_path)
+    pool.close_all()
+"""
+import threading
+from collections import OrderedDict
+from moviepy.editor import VideoClip, AudioClip, VideoFileClip, AudioFileClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+class ReaderPool:
+    """Opens the readers of clips when their frames are needed, keeping at most max_open of them open.
+
+    Reading a frame and closing a reader hold the same lock, so a reader is never closed while
+    another thread reads from it.
+
+    Args:
+        max_open (int, optional): Maximum number of readers open at the same time. Defaults to 2.
+
+    Attributes:
+        max_open (int): Maximum number of readers open at the same time.
+        readers (OrderedDict): Maps the key of each open reader to the reader, least recently used first.
+        peak_open (int): Most readers that were open at the same time.
+        lock (threading.Lock): Lock of readers.
+    """
+    def __init__(self, max_open = 2):
+        self.max_open = max(1, max_open)
+        self.readers = OrderedDict()
+        self.peak_open = 0
+        self.lock = threading.Lock()
+
+    def get_frame(self, key, open_reader, t):
+        """Gets a frame from a reader, opening it first if it isn't open.
+
+        Args:
+            key (tuple): Identifies the reader, clips with the same key share it.
+            open_reader (Callable): Opens the reader, a clip with a get_frame() and a close() method.
+            t (float or numpy.ndarray): Time of the frame, or times of the audio samples, in seconds.
+
+        Returns:
+            numpy.ndarray: The frame.
+        """
+        with self.lock:
+            reader = self.readers.get(key)
+            if reader is None:
+                while len(self.readers) >= self.max_open:
+                    _, oldest = self.readers.popitem(last = False)
+                    oldest.close()
+                reader = open_reader()
+                self.readers[key] = reader
+                self.peak_open = max(self.peak_open, len(self.readers))
+            else:
+                self.readers.move_to_end(key)
+            return reader.get_frame(t)
+
+    def close(self, key):
+        """Closes a reader if it is open.
+
+        Args:
+            key (tuple): Identifies the reader.
+        """
+        with self.lock:
+            reader = self.readers.pop(key, None)
+            if reader is not None:
+                reader.close()
+
+    def close_all(self):
+        """Closes every open reader.
+        """
+        with self.lock:
+            while self.readers:
+                _, reader = self.readers.popitem()
+                reader.close()
+
+class LazyAudioFileClip(AudioClip):
+    """Audio of a clip, read through a ReaderPool like the audio of a VideoFileClip.
+
+    Args:
+        filename (str): Path of the clip.
+        pool (ReaderPool): Pool opening the reader.
+        duration (float): Duration of the clip in seconds.
+        fps (int, optional): Sample rate the audio is read at. Defaults to 44100.
+        buffersize (int, optional): Samples buffered by the reader. Defaults to 200000.
+
+    Attributes:
+        filename (str): Path of the clip.
+        pool (ReaderPool): Pool opening the reader.
+        reader_key (tuple): Key of the reader in the pool.
+        nchannels (int): Number of channels, the audio is always read as stereo.
+    """
+    def __init__(self, filename, pool, duration, fps = 44100, buffersize = 200000):
+        AudioClip.__init__(self)
+        self.filename = filename
+        self.pool = pool
+        self.reader_key = (filename, 'audio')
+        self.fps = fps
+        self.duration = duration
+        self.end = duration
+        self.nchannels = 2
+        open_reader = lambda: AudioFileClip(filename, buffersize = buffersize, fps = fps)
+        self.make_frame = lambda t: pool.get_frame(self.reader_key, open_reader, t)
+
+    def close(self):
+        """Closes the reader of the audio if it is open.
+        """
+        self.pool.close(self.reader_key)
+
+class LazyVideoFileClip(VideoClip):
+    """Clip of a video file, with the same frames and audio as a VideoFileClip, read through a ReaderPool.
+
+    Only "ffmpeg -i" is run when the clip is made, to get its duration, frame rate and size.
+
+    Args:
+        filename (str): Path of the clip.
+        pool (ReaderPool): Pool opening the readers.
+        target_resolution (tuple, optional): (height, width) the frames are resized to. Defaults to None.
+        audio (bool, optional): Whether to read the audio of the clip. Defaults to True.
+
+    Attributes:
+        filename (str): Path of the clip.
+        pool (ReaderPool): Pool opening the readers.
+        reader_key (tuple): Key of the video reader in the pool.
+    """
+    def __init__(self, filename, pool, target_resolution = None, audio = True):
+        VideoClip.__init__(self)
+        infos = ffmpeg_parse_infos(filename)
+        self.filename = filename
+        self.pool = pool
+        self.reader_key = (filename, 'video', target_resolution)
+        self.duration = infos['video_duration']
+        self.end = self.duration
+        self.fps = infos['video_fps']
+        self.size = get_size(infos['video_size'], target_resolution)
+        open_reader = lambda: VideoFileClip(filename, audio = False, target_resolution = target_resolution)
+        self.make_frame = lambda t: pool.get_frame(self.reader_key, open_reader, t)
+        if audio and infos['audio_found']:
+            self.audio = LazyAudioFileClip(filename, pool, self.duration)
+
+    def close(self):
+        """Closes the readers of the clip if they are open.
+        """
+        self.pool.close(self.reader_key)
+        if self.audio is not None:
+            self.audio.close()
+
+def get_size(size, target_resolution):
+    """Gets the size of the frames of a clip resized to target_resolution, like MoviePy's reader does.
+
+    Args:
+        size (list): (width, height) of the video.
+        target_resolution (tuple): (height, width) to resize to, with None for a side kept in proportion, or None.
+
+    Returns:
+        tuple: (width, height) of the frames.
+    """
+    if not target_resolution:
+        return tuple(size)
+    height, width = target_resolution
+    if height is not None and width is not None:
+        return (width, height)
+    ratio = height / size[1] if height is not None else width / size[0]
+    return (int(size[0] * ratio), int(size[1] * ratio))
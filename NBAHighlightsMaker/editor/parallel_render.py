@@ -0,0 +1,206 @@
+"""Encodes the clips of a video in parallel processes, then joins them without encoding.
+
+This module contains the class ParallelRenderer. MoviePy decodes, edits and encodes a video
+in one process, so only one core is busy. ParallelRenderer encodes each clip with its fades
+in its own process of a ProcessPoolExecutor, with the same encoder profile and frame rate for
+every clip, and the encoded clips are then joined by ffmpeg's concat demuxer without encoding them again.
+The workers send their progress through a queue of a multiprocessing Manager, and stop at
+their next progress update once the render is cancelled.
+
+Typical usage example:
+    renderer = ParallelRenderer(target_resolution = (720, 1280))
+    await renderer.render(clip_paths, output_path, fades = True, on_progress = update_progress_bar)
+"""
+import os
+import time
+import queue
+import asyncio
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from proglog import ProgressBarLogger
+from NBAHighlightsMaker.editor.ffmpeg_tools import probe_clip, concat_copy
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE, match_source_fps
+
+class RenderCancelled(Exception):
+    """Raised in a worker process to stop its encode once the render was cancelled.
+    """
+
+class QueueProgressLogger(ProgressBarLogger):
+    """Progress logger of MoviePy sending the frames encoded by a worker process to the main process.
+
+    Args:
+        index (int): Position of the clip in the video.
+        progress_queue (multiprocessing.Queue): Queue of (index, frames done, total frames) updates.
+        cancel_event (multiprocessing.Event): Set by the main process to stop the encode.
+
+    Attributes:
+        index (int): Position of the clip in the video.
+        progress_queue (multiprocessing.Queue): Queue of (index, frames done, total frames) updates.
+        cancel_event (multiprocessing.Event): Set by the main process to stop the encode.
+        min_time_interval (float): Minimum time between two updates, each one is a round trip to the Manager.
+        last_update (float): time.monotonic() value of the last update.
+    """
+    def __init__(self, index, progress_queue, cancel_event):
+        super().__init__()
+        self.index = index
+        self.progress_queue = progress_queue
+        self.cancel_event = cancel_event
+        self.min_time_interval = 0.5
+        self.last_update = 0.0
+
+    def bars_callback(self, bar, attr, value, old_value = None):
+        """Sends the number of frames encoded every "min_time_interval" seconds, and on the last frame.
+
+        Args:
+            bar (str): The type of the progress bar (i.e chunk, or t).
+            attr (str): The attribute being updated (i.e index: the current number elapsed of "bar").
+            value (int): The current value of the attr.
+            old_value (int, optional): The previous value of the attr.
+
+        Raises:
+            RenderCancelled: If the render was cancelled.
+        """
+        if bar != 't' or attr != 'index':
+            return
+        total = self.bars[bar]['total']
+        now = time.monotonic()
+        if now - self.last_update < self.min_time_interval and value < total:
+            return
+        self.last_update = now
+        if self.cancel_event.is_set():
+            raise RenderCancelled()
+        # proglog sets the index to the total once the last frame is done
+        self.progress_queue.put((self.index, min(value, total), total))
+
+def encode_clip(index, clip_path, output_path, target_resolution, fades, fps, encoder_args, audio, progress_queue,
+                cancel_event):
+    """Encodes one clip with its fades. Runs in a worker process.
+
+    Every clip gets the same codecs, frame rate and audio, so the encoded clips can be joined
+    without encoding. A clip without audio gets a silent track for the same reason. The audio is
+    encoded to AAC next to the encoded clip, and copied into it.
+
+    Args:
+        index (int): Position of the clip in the video.
+        clip_path (str): Path of the downloaded clip.
+        output_path (str): Path of the encoded clip.
+        target_resolution (tuple): (height, width) of the final video.
+        fades (bool): Whether to fade the clip in and out.
+        fps (float): Frame rate of the final video.
+        encoder_args (dict): Video encoder arguments of write_videofile(), from EncoderProfile.get_moviepy_args().
+        audio (bool): Whether to read and encode the audio, otherwise the clip has none.
+        progress_queue (multiprocessing.Queue): Queue of (index, frames done, total frames) updates.
+        cancel_event (multiprocessing.Event): Set by the main process to stop the encode.
+
+    Returns:
+        str: output_path.
+    """
+    # lazy loading, in the worker process
+    import numpy as np
+    from moviepy.editor import VideoFileClip, AudioClip
+    from moviepy.video.fx.all import fadein, fadeout
+    clip = VideoFileClip(clip_path, target_resolution = target_resolution, audio = audio)
+    try:
+        edited = clip
+        if audio and edited.audio is None:
+            # the audio of a VideoFileClip is read as stereo at 44.1 kHz, so the silence is too
+            silence = lambda t: np.zeros((len(t), 2)) if np.ndim(t) else np.zeros(2)
+            edited = edited.set_audio(AudioClip(silence, duration = clip.duration, fps = 44100))
+        if fades:
+            edited = fadein(edited, duration=1)
+            edited = fadeout(edited, duration=1)
+        edited.write_videofile(output_path, audio=audio, audio_codec='aac', fps=fps, **encoder_args,
+                               temp_audiofile=os.path.splitext(output_path)[0] + '.m4a',
+                               logger=QueueProgressLogger(index, progress_queue, cancel_event))
+    finally:
+        clip.close()
+    return output_path
+
+class ParallelRenderer:
+    """Encodes clips in a pool of processes and joins the encoded clips without encoding them again.
+
+    Args:
+        workers (int, optional): Number of processes. Defaults to the number of cores.
+        target_resolution (tuple, optional): (height, width) of the final video. Defaults to (720, 1280).
+        fps (float, optional): Frame rate of the final video, None to match the clips. Defaults to None.
+
+    Attributes:
+        workers (int): Number of processes.
+        target_resolution (tuple): (height, width) of the final video.
+        fps (float): Frame rate of the final video, None to match the clips.
+    """
+    def __init__(self, workers = None, target_resolution = (720, 1280), fps = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.target_resolution = target_resolution
+        self.fps = fps
+
+    @staticmethod
+    async def report_progress(progress_queue, futures, on_progress):
+        """Aggregates the progress of the workers until every encode is done.
+
+        Args:
+            progress_queue (multiprocessing.Queue): Queue of (index, frames done, total frames) updates.
+            futures (list): Futures of the encodes.
+            on_progress (Callable): Called with the percentage done and a description.
+        """
+        done = [0.0] * len(futures)
+        while not all(future.done() for future in futures):
+            try:
+                index, value, total = await asyncio.to_thread(progress_queue.get, True, 0.2)
+            except queue.Empty:
+                continue
+            done[index] = value / total
+            percent = int(sum(done) / len(done) * 100)
+            finished = sum(1 for fraction in done if fraction >= 1)
+            on_progress(percent, f"Editing - {percent}% : {finished}/{len(done)} clips")
+
+    async def render(self, clip_paths, output_path, fades, on_progress, audio = True, profile = None):
+        """Asynchronously encodes the clips in parallel and joins them into the final video.
+
+        The encoded clips are kept in a temporary directory next to the final video, so jobs running at
+        the same time don't share files. If an encode fails or the render is cancelled, the other workers
+        are told to stop and waited for before the temporary directory is removed.
+
+        Args:
+            clip_paths (list): Paths of the clips, in the order they are shown.
+            output_path (str): Path of the final video.
+            fades (bool): Whether to fade each clip in and out.
+            on_progress (Callable): Called with the percentage done and a description.
+            audio (bool, optional): Whether the final video has the audio of the clips. Defaults to True.
+            profile (EncoderProfile, optional): Encoder settings, the same for every clip. Defaults to the default profile.
+
+        Raises:
+            Exception: If a clip can't be encoded or the encoded clips can't be joined.
+        """
+        # spawn instead of fork, the main process runs Qt and asyncio threads
+        context = multiprocessing.get_context('spawn')
+        num_workers = max(1, min(self.workers, len(clip_paths)))
+        fps = self.fps
+        if fps is None:
+            infos = await asyncio.to_thread(lambda: [probe_clip(clip_path) for clip_path in clip_paths])
+            fps = match_source_fps([info.fps for info in infos])
+        # one thread per process, the processes already use every core
+        encoder_args = (profile or ENCODER_PROFILES[DEFAULT_PROFILE]).get_moviepy_args(threads = 1)
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        with tempfile.TemporaryDirectory(prefix = 'nba-render-', dir = output_dir) as tmp_dir, context.Manager() as manager:
+            progress_queue = manager.Queue()
+            cancel_event = manager.Event()
+            segment_paths = [os.path.join(tmp_dir, f"{index}.mp4") for index in range(len(clip_paths))]
+            pool = ProcessPoolExecutor(max_workers = num_workers, mp_context = context)
+            loop = asyncio.get_running_loop()
+            futures = [loop.run_in_executor(pool, encode_clip, index, clip_path, segment_path, self.target_resolution,
+                                            fades, float(fps), encoder_args, audio, progress_queue, cancel_event)
+                       for index, (clip_path, segment_path) in enumerate(zip(clip_paths, segment_paths))]
+            progress_task = asyncio.ensure_future(self.report_progress(progress_queue, futures, on_progress))
+            try:
+                await asyncio.gather(*futures)
+            except BaseException:
+                cancel_event.set()
+                raise
+            finally:
+                # the running encodes stop at their next progress update
+                await asyncio.to_thread(pool.shutdown, True, cancel_futures = True)
+                await asyncio.gather(*futures, progress_task, return_exceptions = True)
+            on_progress(100, "Joining clips...")
+            await concat_copy(segment_paths, output_path, audio)
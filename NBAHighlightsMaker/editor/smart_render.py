@@ -0,0 +1,194 @@
+"""Encodes only the fades of each clip, and copies the frames in between.
+
+This module contains the class SmartRenderer. The fades only change the first and last second
+of each clip, so only the groups of pictures (the frames from one keyframe to the next) that
+overlap a fade are encoded again. Each clip is cut at the first keyframe after its fade-in and
+the last keyframe before its fade-out, the head and tail are encoded with their fade, and the
+middle is copied. The pieces are joined with the audio of the clip, which the fades don't change,
+and the clips are then joined without encoding. This needs clips that already have the codec and
+size of the final video, so the render time grows with the number of clips, not their length.
+
+Typical usage example:
+    renderer = SmartRenderer(target_resolution = (720, 1280))
+    if not await renderer.render(clip_paths, output_path, on_progress = update_progress_bar):
+        ...encode the video another way...
+"""
+import os
+import asyncio
+import tempfile
+from NBAHighlightsMaker.editor.ffmpeg_tools import (probe_clip, get_keyframes, can_concat_copy, write_concat_list,
+                                                    run_ffmpeg, concat_copy)
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE, match_source_fps
+
+# -profile:v value of libx264 for the profiles reported by "ffmpeg -i"
+X264_PROFILES = {
+    'Constrained Baseline': 'baseline',
+    'Baseline': 'baseline',
+    'Main': 'main',
+    'High': 'high',
+}
+
+def plan_cuts(keyframes, duration, fade_duration):
+    """Picks where to cut a clip so that only the fades are encoded.
+
+    Args:
+        keyframes (list): Times of the keyframes in seconds, in order.
+        duration (float): Duration of the clip in seconds.
+        fade_duration (float): Duration of each fade in seconds.
+
+    Returns:
+        tuple: (end of the head, start of the tail) in seconds, both keyframes, or None if no
+            keyframe lies between the fades and the whole clip has to be encoded.
+    """
+    # a frame is much longer than this, it only absorbs rounding in the printed times
+    epsilon = 0.001
+    head_end = next((keyframe for keyframe in keyframes if keyframe >= fade_duration - epsilon), None)
+    tail_start = next((keyframe for keyframe in reversed(keyframes) if keyframe <= duration - fade_duration + epsilon), None)
+    if head_end is None or tail_start is None or head_end >= tail_start:
+        return None
+    return head_end, tail_start
+
+class SmartRenderer:
+    """Adds the fades to clips by encoding only the frames around them, then joins the clips.
+
+    Args:
+        target_resolution (tuple, optional): (height, width) of the final video. Defaults to (720, 1280).
+        fade_duration (float, optional): Duration of the fade-in and fade-out of each clip in seconds. Defaults to 1.
+        workers (int, optional): Number of clips processed at the same time. Defaults to the number of cores.
+
+    Attributes:
+        target_resolution (tuple): (height, width) of the final video.
+        fade_duration (float): Duration of the fade-in and fade-out of each clip in seconds.
+        workers (int): Number of clips processed at the same time.
+    """
+    def __init__(self, target_resolution = (720, 1280), fade_duration = 1, workers = None):
+        self.target_resolution = target_resolution
+        self.fade_duration = fade_duration
+        self.workers = workers or os.cpu_count() or 1
+
+    @staticmethod
+    def get_encoder_args(info, profile):
+        """Gets the encoder arguments that make the encoded frames match the copied ones.
+
+        Args:
+            info (ClipInfo): Streams of the clip.
+            profile (EncoderProfile): Encoder settings of the encoded frames.
+
+        Returns:
+            list: ffmpeg arguments.
+        """
+        args = [*profile.get_ffmpeg_args(), '-pix_fmt', info.pix_fmt]
+        if info.video_profile in X264_PROFILES:
+            args += ['-profile:v', X264_PROFILES[info.video_profile]]
+        # a constant frame rate gives the last frame its duration, so the next piece starts right after it
+        args += ['-fps_mode', 'cfr', '-r', str(match_source_fps([info.fps]))]
+        return args
+
+    async def encode_piece(self, info, output_path, filters, profile, start = None, end = None):
+        """Asynchronously encodes the frames of a clip between two keyframes with their fades.
+
+        Args:
+            info (ClipInfo): Streams of the clip.
+            output_path (str): Path of the encoded piece.
+            filters (list): Fade filters, with times from the start of the piece.
+            profile (EncoderProfile): Encoder settings of the encoded frames.
+            start (float, optional): Keyframe the piece starts at, in seconds. Defaults to the start of the clip.
+            end (float, optional): Keyframe after the piece, in seconds. Defaults to the end of the clip.
+        """
+        # the times are moved back by less than a frame, so the keyframes are on the right side of the cuts
+        seek = ['-ss', f'{start - 0.001:.3f}'] if start is not None else []
+        until = ['-t', f'{end - 0.001:.3f}'] if end is not None else []
+        video_filter = ','.join(filters)
+        await run_ffmpeg([*seek, '-i', info.path, *until, '-map', '0:v:0', '-vf', video_filter,
+                          *self.get_encoder_args(info, profile), output_path])
+
+    async def render_clip(self, info, clip_dir, output_path, profile, audio = True):
+        """Asynchronously adds the fades to one clip.
+
+        Args:
+            info (ClipInfo): Streams of the clip.
+            clip_dir (str): Empty directory for the pieces of the clip.
+            output_path (str): Path of the clip with its fades.
+            profile (EncoderProfile): Encoder settings of the encoded frames.
+            audio (bool, optional): Whether to copy the audio of the clip. Defaults to True.
+        """
+        duration = info.duration
+        fade_out_start = max(0, duration - self.fade_duration)
+        cuts = plan_cuts(await asyncio.to_thread(get_keyframes, info.path), duration, self.fade_duration)
+        if cuts is None:
+            piece_paths = [os.path.join(clip_dir, 'whole.mp4')]
+            await self.encode_piece(info, piece_paths[0], [f'fade=t=in:st=0:d={self.fade_duration}',
+                                                           f'fade=t=out:st={fade_out_start:.3f}:d={self.fade_duration}'], profile)
+        else:
+            head_end, tail_start = cuts
+            # the segment muxer cuts at the first keyframe after each time, so the middle starts and ends on the cuts
+            await run_ffmpeg(['-i', info.path, '-map', '0:v:0', '-c', 'copy', '-f', 'segment',
+                              '-segment_times', f'{head_end - 0.001:.3f},{tail_start - 0.001:.3f}',
+                              '-segment_format', 'mp4', '-reset_timestamps', '1',
+                              os.path.join(clip_dir, 'piece%d.mp4')])
+            piece_paths = [os.path.join(clip_dir, 'head.mp4'), os.path.join(clip_dir, 'piece1.mp4'),
+                           os.path.join(clip_dir, 'tail.mp4')]
+            await self.encode_piece(info, piece_paths[0], [f'fade=t=in:st=0:d={self.fade_duration}'], profile,
+                                    end = head_end)
+            await self.encode_piece(info, piece_paths[2], [f'fade=t=out:st={fade_out_start - tail_start:.3f}:d={self.fade_duration}'],
+                                    profile, start = tail_start)
+        list_path = os.path.join(clip_dir, 'pieces.txt')
+        write_concat_list(piece_paths, list_path)
+        # the concat demuxer puts the parameter sets of each piece in the stream, so the encoded and copied
+        # frames can use different encoder settings. The fades don't change the audio, so it is copied.
+        audio_args = ['-map', '1:a:0?'] if audio else ['-an']
+        await run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', list_path, '-i', info.path,
+                          '-map', '0:v:0', *audio_args, '-c', 'copy', output_path])
+
+    async def render(self, clip_paths, output_path, on_progress, audio = True, profile = None):
+        """Asynchronously adds the fades to the clips and joins them into the final video.
+
+        Args:
+            clip_paths (list): Paths of the clips, in the order they are shown.
+            output_path (str): Path of the final video.
+            on_progress (Callable): Called with the percentage done and a description.
+            audio (bool, optional): Whether the final video has the audio of the clips. Defaults to True.
+            profile (EncoderProfile, optional): Encoder settings of the encoded frames. Defaults to the default profile.
+
+        Returns:
+            bool: True if the video was written, False if the clips don't share the codecs and size of the final video.
+
+        Raises:
+            FfmpegError: If ffmpeg fails.
+        """
+        if not clip_paths:
+            return False
+        profile = profile or ENCODER_PROFILES[DEFAULT_PROFILE]
+        infos = await asyncio.to_thread(lambda: [probe_clip(clip_path) for clip_path in clip_paths])
+        height, width = self.target_resolution
+        if (not can_concat_copy(infos, width, height, audio) or infos[0].video_codec != 'h264'
+                or any(info.duration is None for info in infos)):
+            return False
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        with tempfile.TemporaryDirectory(prefix = 'nba-smart-', dir = output_dir) as tmp_dir:
+            semaphore = asyncio.Semaphore(self.workers)
+            rendered_paths = [os.path.join(tmp_dir, f"{index}.mp4") for index in range(len(infos))]
+            done = 0
+
+            async def render_one(index):
+                nonlocal done
+                clip_dir = os.path.join(tmp_dir, str(index))
+                os.mkdir(clip_dir)
+                async with semaphore:
+                    await self.render_clip(infos[index], clip_dir, rendered_paths[index], profile, audio)
+                done += 1
+                percent = int(done / len(infos) * 100)
+                on_progress(percent, f"Editing - {percent}% : {done}/{len(infos)} clips")
+
+            tasks = [asyncio.ensure_future(render_one(index)) for index in range(len(infos))]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # ffmpeg is killed when its task is cancelled
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions = True)
+                raise
+            on_progress(100, "Joining clips...")
+            await concat_copy(rendered_paths, output_path, audio)
+        return True
@@ -11,18 +11,21 @@ Typical usage example:
 import os
 import sys
 import asyncio
+import multiprocessing
 from fake_useragent import UserAgent
 from qasync import QEventLoop
 from NBAHighlightsMaker.players.getplayers import DataRetriever
 from NBAHighlightsMaker.downloader.downloader import Downloader
+from NBAHighlightsMaker.common.http_client import HttpClient
+from NBAHighlightsMaker.common.renditions import RenditionSelector
 from NBAHighlightsMaker.ui.ui import HighlightsUI
 from PySide6.QtWidgets import QApplication
 
 def startup():
     """Initializes the NBA Highlights Maker application.
 
-    Initializes the Qt application and event loop, creates the data retriever and
-    downloader objects, and launches the main window.
+    Initializes the Qt application and event loop, creates the HTTP client shared by the
+    data retriever and downloader objects, and launches the main window.
     """
     app = QApplication(sys.argv)
     
@@ -31,13 +34,21 @@ def startup():
     # create data directory if it doesn't exist
     os.makedirs(os.path.join(data_dir, 'vids'), exist_ok=True)
     os.makedirs(os.path.join(data_dir, 'csv'), exist_ok=True)
+    os.makedirs(os.path.join(data_dir, 'cache'), exist_ok=True)
+    os.makedirs(os.path.join(data_dir, 'pbp'), exist_ok=True)
+    os.makedirs(os.path.join(data_dir, 'clips'), exist_ok=True)
     
     # useragents from these browsers are more likely to succeed
     ua = UserAgent(browsers=['Safari'], os = 'Mac OS X', platforms='desktop')
     
-    data_retriever = DataRetriever(ua, data_dir)
+    # pooled connections and per-host rate limiters shared by everything that talks to the NBA website
+    http_client = HttpClient()
+    # picks the size of the clips to download, the final video is 720p
+    renditions = RenditionSelector(target_height = 720)
+
+    data_retriever = DataRetriever(ua, data_dir, http_client, renditions)
     
-    downloader = Downloader(ua, data_dir)
+    downloader = Downloader(ua, data_dir, http_client, renditions)
     
     # make the main window
     window = HighlightsUI(data_retriever, downloader, data_dir)
@@ -55,7 +66,12 @@ def startup():
 
     with loop:
         
-        sys.exit(loop.run_forever())
+        exit_code = loop.run_forever()
+        # close the pooled connections before the loop closes
+        loop.run_until_complete(http_client.close())
+        sys.exit(exit_code)
 
 if __name__ == "__main__":
+    # the parallel render mode spawns worker processes, which need this in a PyInstaller build
+    multiprocessing.freeze_support()
     startup()
\ No newline at end of file
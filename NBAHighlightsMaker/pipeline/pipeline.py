@@ -0,0 +1,223 @@
+"""Streams the events of a video through getting links, downloading and preparing clips.
+
+This module contains the class HighlightsPipeline. Instead of getting every link, then downloading
+every clip, then preparing every clip for the editor, each event moves on to the next stage as
+soon as it is done with the previous one. The downloads are run by a DownloadScheduler, which
+starts with the clips earliest in the game and hands them on in timeline order. The number of
+clips between getting their link and being prepared is bounded, so a fast stage waits for a slow
+one instead of piling up work, and the results are put back in event order before the final
+video is written.
+
+Typical usage example:
+    pipeline = HighlightsPipeline(data_retriever, downloader, video_maker)
+    await pipeline.run(game_id, event_ids, update_progress_bar, settings = JobSettings(render_mode = 'smart'))
+"""
+import asyncio
+from NBAHighlightsMaker.common.event_records import ProgressTracker
+from NBAHighlightsMaker.common.job_settings import JobSettings
+from NBAHighlightsMaker.downloader.scheduler import DownloadScheduler
+
+class HighlightsPipeline:
+    """Makes the video of a game's events with the link, download and preparation stages running at the same time.
+
+    Link workers take events in order from the list of events and add their download to a DownloadScheduler,
+    or add the clip as done if the clip store already has it. The download workers of the scheduler take
+    the earliest clip of the game first, and its clips are put on the clip queue in timeline order.
+    Prepare workers take from the clip queue and open each clip with its effects in a thread,
+    storing it at its position, so the clips come out in event order no matter which finished first.
+    If the video is made from the clip files, the prepare workers only store the file paths. The JobSettings
+    of each run are passed to every stage, so runs with other settings can share the pipeline.
+    When a stage is done, it puts one None per worker of the next stage on its queue to stop them.
+    The clip queue holds at most queue_size items, and a link worker only takes an event once fewer than
+    queue_size plus download_workers clips are waiting to be prepared, which is the backpressure between the stages.
+
+    Args:
+        data_retriever (DataRetriever): Object used to get video links.
+        downloader (Downloader): Object used to download video clips.
+        video_maker (VideoMaker): Object used to prepare the clips and write the final video.
+        link_workers (int, optional): Number of links fetched at the same time. Defaults to 6.
+        download_workers (int, optional): Number of clips downloaded at the same time. Defaults to 6.
+        prepare_workers (int, optional): Number of clips prepared at the same time. Defaults to 2.
+        queue_size (int, optional): Maximum number of clips waiting to be prepared. Defaults to 4.
+
+    Attributes:
+        data_retriever (DataRetriever): Object used to get video links.
+        downloader (Downloader): Object used to download video clips.
+        video_maker (VideoMaker): Object used to prepare the clips and write the final video.
+        link_workers (int): Number of links fetched at the same time.
+        download_workers (int): Number of clips downloaded at the same time.
+        prepare_workers (int): Number of clips prepared at the same time.
+        queue_size (int): Maximum number of clips waiting to be prepared.
+    """
+    def __init__(self, data_retriever, downloader, video_maker, link_workers = 6,
+                 download_workers = 6, prepare_workers = 2, queue_size = 4):
+        self.data_retriever = data_retriever
+        self.downloader = downloader
+        self.video_maker = video_maker
+        self.link_workers = link_workers
+        self.download_workers = download_workers
+        self.prepare_workers = prepare_workers
+        self.queue_size = queue_size
+
+    @staticmethod
+    async def run_stage(workers, out_queue, num_next_workers, on_done = None):
+        """Waits for the workers of a stage, then tells the workers of the next stage to stop.
+
+        If a worker fails or the stage is cancelled, the other workers of the stage are cancelled too.
+
+        Args:
+            workers (list): Coroutines of the workers of the stage.
+            out_queue (asyncio.Queue): Queue the stage puts its results on, None for the last stage.
+            num_next_workers (int): Number of workers taking from out_queue.
+            on_done (Callable, optional): Called once every worker of the stage is done, instead of using out_queue.
+        """
+        tasks = [asyncio.ensure_future(worker) for worker in workers]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions = True)
+            raise
+        if on_done is not None:
+            on_done()
+        for _ in range(num_next_workers):
+            await out_queue.put(None)
+
+    @staticmethod
+    async def prepare_in_thread(prepare, clip_path, settings = None):
+        """Runs a blocking clip preparation in a thread, closing the clip if it is no longer wanted.
+
+        A thread can't be interrupted, so if the task is cancelled while the clip is being opened,
+        the clip is closed as soon as the thread is done with it.
+
+        Args:
+            prepare (Callable): Function opening a clip from its path and settings.
+            clip_path (str): Path of the clip.
+            settings (JobSettings, optional): Settings of the video the clip is in. Defaults to None.
+
+        Returns:
+            LazyVideoFileClip: The prepared clip.
+        """
+        future = asyncio.ensure_future(asyncio.to_thread(prepare, clip_path, settings))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            def close_clip(done):
+                if not done.cancelled() and done.exception() is None:
+                    done.result().close()
+            future.add_done_callback(close_clip)
+            raise
+
+    async def get_clips(self, game_id, event_ids, update_progress_bar, settings = None):
+        """Gets the links, downloads and prepares the clips of all events.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_ids (pandas.DataFrame): DataFrame of event IDs, in the order the clips are shown.
+            update_progress_bar (Callable): Function to update the progress bar.
+            settings (JobSettings, optional): Settings of the video. Defaults to the default settings.
+
+        Returns:
+            list: The prepared clips, or their file paths if the video is made from the files, in the same
+                order as event_ids.
+
+        Raises:
+            Exception: If getting a link, downloading or preparing a clip fails, after stopping every stage.
+        """
+        settings = settings or JobSettings()
+        session = self.data_retriever.http_client.get_session()
+        rows = list(enumerate(event_ids.itertuples(index = True)))
+        # ffmpeg reads the files itself, MoviePy needs them opened with their effects
+        renders_files = settings.renders_files()
+        # links, downloads and preparations
+        progress = ProgressTracker((2 if renders_files else 3) * len(rows), update_progress_bar)
+        clips = [None] * len(rows)
+
+        num_link_workers = max(1, min(self.link_workers, len(rows)))
+        num_download_workers = max(1, min(self.download_workers, len(rows)))
+        num_prepare_workers = max(1, min(self.prepare_workers, len(rows)))
+
+        # shared by the link workers, each takes the next event when it is free
+        pending = iter(rows)
+        scheduler = DownloadScheduler(self.downloader, session, game_id, workers = num_download_workers,
+                                      on_done = lambda position, row, file_path: progress.advance(f"Downloaded: {row.description}"))
+        clip_queue = asyncio.Queue(maxsize = self.queue_size)
+        # taken for each event until a prepare worker takes its clip
+        slots = asyncio.Semaphore(self.queue_size + num_download_workers)
+
+        async def link_worker():
+            for position, row in pending:
+                await slots.acquire()
+                # clips downloaded by an earlier job need neither a link nor a download
+                file_path = self.downloader.get_file_path(row, game_id)
+                stored_path = self.downloader.use_stored_clip(game_id, row, file_path, settings.proxy)
+                if stored_path:
+                    progress.advance()
+                    progress.advance(f"Found stored clip: {row.description}")
+                    scheduler.add_result(position, row, stored_path)
+                    continue
+                video_link, rendition = await self.data_retriever.fetch_download_link(session, game_id, row, settings.proxy)
+                progress.advance(f"Got link for: {row.description}")
+                scheduler.add(position, row, video_link, rendition)
+
+        async def order_worker():
+            async for item in scheduler.iter_in_order():
+                await clip_queue.put(item)
+
+        async def prepare_worker():
+            while (item := await clip_queue.get()) is not None:
+                slots.release()
+                position, row, file_path = item
+                if renders_files:
+                    clips[position] = file_path
+                    continue
+                clips[position] = await self.prepare_in_thread(self.video_maker.prepare_clip, file_path, settings)
+                progress.advance(f"Prepared: {row.description}")
+
+        stages = [
+            asyncio.create_task(self.run_stage([link_worker() for _ in range(num_link_workers)],
+                                               None, 0, on_done = scheduler.close)),
+            asyncio.create_task(self.run_stage([scheduler.run(), order_worker()],
+                                               clip_queue, num_prepare_workers)),
+            asyncio.create_task(self.run_stage([prepare_worker() for _ in range(num_prepare_workers)],
+                                               None, 0)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # a failed or cancelled stage would leave the others waiting on their queues forever
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions = True)
+            for clip in clips:
+                if clip is not None and not renders_files:
+                    clip.close()
+            raise
+        finally:
+            # keep the links resolved so far, even if a request failed
+            self.data_retriever.link_cache.save()
+            self.downloader.clip_store.save()
+        return clips
+
+    async def run(self, game_id, event_ids, update_progress_bar, output_path = None, settings = None):
+        """Makes the video of the events of a game.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_ids (pandas.DataFrame): DataFrame of event IDs, in the order the clips are shown.
+            update_progress_bar (Callable): Function to update the progress bar.
+            output_path (str, optional): Path of the final video. Defaults to final_vid.mp4 in the data directory.
+            settings (JobSettings, optional): Settings of the video. Defaults to the default settings.
+
+        Raises:
+            Exception: If any stage fails.
+        """
+        settings = settings or JobSettings()
+        clips = await self.get_clips(game_id, event_ids, update_progress_bar, settings)
+        update_progress_bar(0, "Editing video...")
+        if settings.renders_files():
+            # the clips are file paths, opened by MoviePy only if ffmpeg can't make the video
+            await self.video_maker.make_final_vid(clips, output_path, settings)
+        else:
+            await self.video_maker.write_final_vid(clips, output_path, settings)
@@ -0,0 +1,162 @@
+"""Filters the play-by-play actions of a game down to the events a user wants.
+
+This module contains the class EventSelection, which compiles the action types and
+action options chosen for a player into a set of rules, and the class EventFilter, which
+evaluates any number of selections against the actions of one game in a single pass
+using NumPy boolean arrays.
+
+Typical usage example:
+    event_filter = EventFilter([EventSelection(player_id, wanted_actions, wanted_action_options)])
+    event_ids = event_filter.filter(df)[0]
+"""
+import numpy as np
+
+# columns returned for the filtered events, period and clock place them on the game timeline
+EVENT_COLUMNS = ['actionNumber', 'period', 'clock', 'actionType', 'subType', 'personId', 'description', 'shotResult',
+                 'assistPersonId', 'foulDrawnPersonId', 'blockPersonId']
+
+# stands in for the player ID of a selection in OPTION_RULES
+PLAYER = object()
+
+# options that come in pairs, where choosing only one option of a pair drops the events of the other.
+# (option_1, option_2, action types, column, value): if only option_1 is chosen, events of the action types
+# where column == value are dropped, if only option_2 is chosen, the ones where column != value are dropped
+OPTION_RULES = [
+    # if only made field goals are wanted, drop missed shots and the other way around
+    ('Field Goals Made', 'Field Goals Missed', {'2pt', '3pt'}, 'shotResult', 'Missed'),
+    # if only fouls drawn are wanted, drop fouls committed by the player and the other way around
+    ('Fouls Drawn', 'Fouls Committed', {'foul'}, 'personId', PLAYER),
+    # if only made free throws are wanted, drop missed ones and the other way around
+    ('Free Throws Made', 'Free Throws Missed', {'freethrow'}, 'shotResult', 'Missed'),
+]
+
+class EventSelection:
+    """The events one player wants from a game, compiled from the action types and options chosen.
+
+    Args:
+        player_id (int): NBA player ID.
+        wanted_actions (set): Set of event types that the user wants to see.
+        wanted_action_options (set): Set of specific options for certain event types, e.g 'Field Goals Made', 'Fouls Committed'.
+
+    Attributes:
+        player_id (int): NBA player ID.
+        wanted_actions (frozenset): Set of event types that the user wants to see.
+        include_assists (bool): Whether assists made by the player are wanted.
+        include_fouls_drawn (bool): Whether fouls drawn by the player are wanted.
+        rule_modes (tuple): For each rule in OPTION_RULES, 0 if nothing is dropped, 1 if events where
+            column == value are dropped and 2 if events where column != value are dropped.
+        drop_offensive_foul_turnovers (bool): Whether turnovers that are offensive fouls are dropped,
+            to avoid having the same clip twice when both fouls and turnovers are wanted.
+    """
+    __slots__ = ('player_id', 'wanted_actions', 'include_assists', 'include_fouls_drawn',
+                 'rule_modes', 'drop_offensive_foul_turnovers')
+
+    def __init__(self, player_id, wanted_actions, wanted_action_options):
+        self.player_id = int(player_id)
+        self.wanted_actions = frozenset(wanted_actions)
+        self.include_assists = 'assists' in self.wanted_actions
+        self.include_fouls_drawn = 'foul' in self.wanted_actions
+        rule_modes = []
+        for option_1, option_2, _, _, _ in OPTION_RULES:
+            if option_1 in wanted_action_options and option_2 not in wanted_action_options:
+                rule_modes.append(1)
+            elif option_2 in wanted_action_options and option_1 not in wanted_action_options:
+                rule_modes.append(2)
+            else:
+                rule_modes.append(0)
+        self.rule_modes = tuple(rule_modes)
+        self.drop_offensive_foul_turnovers = 'foul' in self.wanted_actions and 'turnover' in self.wanted_actions
+
+class EventFilter:
+    """Evaluates many event selections against the actions of one game at once.
+
+    The selections are compiled into NumPy arrays with one row per selection, so evaluating
+    them is a single boolean expression over the action columns, broadcast across all selections,
+    instead of one chain of DataFrame copies per selection.
+
+    Args:
+        selections (list): List of EventSelection objects.
+
+    Attributes:
+        selections (list): List of EventSelection objects.
+        player_ids (numpy.ndarray): Player ID of each selection, shape (n_selections, 1).
+        include_assists (numpy.ndarray): Whether each selection wants assists, shape (n_selections, 1).
+        include_fouls_drawn (numpy.ndarray): Whether each selection wants fouls drawn, shape (n_selections, 1).
+        rule_modes (numpy.ndarray): Mode of each rule in OPTION_RULES for each selection, shape (n_selections, n_rules).
+        drop_offensive_foul_turnovers (numpy.ndarray): Whether each selection drops offensive foul turnovers, shape (n_selections, 1).
+    """
+    def __init__(self, selections):
+        self.selections = list(selections)
+        self.player_ids = np.array([[s.player_id] for s in self.selections], dtype = np.int64).reshape(-1, 1)
+        self.include_assists = np.array([[s.include_assists] for s in self.selections], dtype = bool).reshape(-1, 1)
+        self.include_fouls_drawn = np.array([[s.include_fouls_drawn] for s in self.selections], dtype = bool).reshape(-1, 1)
+        self.rule_modes = np.array([s.rule_modes for s in self.selections], dtype = np.int8).reshape(-1, len(OPTION_RULES))
+        self.drop_offensive_foul_turnovers = np.array([[s.drop_offensive_foul_turnovers] for s in self.selections],
+                                                      dtype = bool).reshape(-1, 1)
+
+    @staticmethod
+    def get_id_column(df, column):
+        """Gets a column of player IDs as a float array, with missing IDs as NaN so they never match.
+
+        Args:
+            df (pandas.DataFrame): Play-by-play actions of the game.
+            column (str): Name of the column.
+
+        Returns:
+            numpy.ndarray: The player IDs.
+        """
+        if column not in df.columns:
+            return np.full(len(df), np.nan)
+        return df[column].to_numpy(dtype = float, na_value = np.nan)
+
+    def evaluate(self, df):
+        """Evaluates all selections against the actions of a game.
+
+        Args:
+            df (pandas.DataFrame): Play-by-play actions of the game.
+
+        Returns:
+            numpy.ndarray: Boolean array of shape (n_selections, n_actions), True where a selection wants an action.
+        """
+        action_types = df['actionType'].astype(str).to_numpy()
+        sub_types = df['subType'].astype(str).to_numpy()
+        shot_results = df['shotResult'].astype(str).to_numpy()
+        person_ids = self.get_id_column(df, 'personId')
+        assist_ids = self.get_id_column(df, 'assistPersonId')
+        foul_drawn_ids = self.get_id_column(df, 'foulDrawnPersonId')
+
+        # map each action type to a code, so membership in each selection's wanted actions is a table lookup
+        type_names, type_codes = np.unique(action_types, return_inverse = True)
+        wanted_types = np.array([[name in s.wanted_actions for name in type_names] for s in self.selections],
+                                dtype = bool).reshape(-1, len(type_names))
+
+        is_player = person_ids[None, :] == self.player_ids
+        mask = (
+            (wanted_types[:, type_codes] & is_player)
+            | ((assist_ids[None, :] == self.player_ids) & self.include_assists)
+            | ((foul_drawn_ids[None, :] == self.player_ids) & self.include_fouls_drawn)
+        )
+
+        columns = {'shotResult': shot_results}
+        for i, (_, _, rule_types, column, value) in enumerate(OPTION_RULES):
+            matches = is_player if value is PLAYER else (columns[column] == value)[None, :]
+            in_rule_types = np.isin(action_types, list(rule_types))[None, :]
+            modes = self.rule_modes[:, i:i + 1]
+            mask &= ~(in_rule_types & (((modes == 1) & matches) | ((modes == 2) & ~matches)))
+
+        offensive_foul_turnovers = (action_types == 'turnover') & (sub_types == 'offensive foul')
+        mask &= ~(offensive_foul_turnovers[None, :] & self.drop_offensive_foul_turnovers)
+        return mask
+
+    def filter(self, df):
+        """Filters the actions of a game for each selection.
+
+        Args:
+            df (pandas.DataFrame): Play-by-play actions of the game.
+
+        Returns:
+            list: One DataFrame per selection, in the same order as the selections, with the columns in EVENT_COLUMNS.
+        """
+        masks = self.evaluate(df)
+        df = df.reindex(columns = EVENT_COLUMNS)
+        return [df.loc[mask] for mask in masks]
@@ -0,0 +1,187 @@
+"""Caches the game logs of players on disk.
+
+This module contains the class GameLogCache, which stores the game log of each
+(player, season, season type) combination in a CSV file, and keeps track of when each
+game log was last refreshed and whether its season is over.
+"""
+import os
+import json
+import time
+import datetime
+import pandas as pd
+
+# format of GAME_DATE in the game logs, i.e "APR 13, 2025"
+GAME_DATE_FORMAT = '%b %d, %Y'
+
+class GameLogCache:
+    """Persistent cache of game logs keyed by player ID, season and season type.
+
+    Game logs of completed seasons never change, so once a game log was refreshed after its
+    season ended it is used as is. Game logs of the current season are used as is for
+    refresh_interval seconds after they were refreshed. After that, only the games played since
+    the last cached GAME_DATE need to be fetched and merged in with merge().
+
+    Args:
+        cache_dir (str): Directory where the game logs are saved.
+        refresh_interval (float, optional): Seconds a game log of the current season is used without refreshing. Defaults to 10 minutes.
+
+    Attributes:
+        cache_dir (str): Directory where the game logs are saved.
+        refresh_interval (float): Seconds a game log of the current season is used without refreshing.
+        index_path (str): Path of the JSON file with the metadata of each cached game log.
+        index (dict): Maps the key of each game log to its metadata, None until loaded.
+    """
+    def __init__(self, cache_dir, refresh_interval = 10 * 60):
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self.index_path = os.path.join(cache_dir, 'game_logs.json')
+        self.index = None
+
+    @staticmethod
+    def make_key(player_id, season, season_type):
+        """Makes the key used for a game log, also used as its file name.
+
+        Args:
+            player_id (int): NBA player ID.
+            season (str): NBA season represented by years (i.e "2020-21").
+            season_type (str): NBA season type (i.e "Regular Season", "Playoffs", ...).
+
+        Returns:
+            str: Key of the form "201142_2024-25_Regular_Season".
+        """
+        return f"{int(player_id)}_{season}_{season_type.replace(' ', '_')}"
+
+    @staticmethod
+    def is_season_completed(season, today = None):
+        """Checks if a season is over, so its game logs can't change anymore.
+
+        Seasons are treated as over on July 1st of the year they end in, after the finals.
+
+        Args:
+            season (str): NBA season represented by years (i.e "2020-21").
+            today (datetime.date, optional): Date to check against. Defaults to today.
+
+        Returns:
+            bool: True if the season is over.
+        """
+        today = today or datetime.date.today()
+        end_year = int(season[:4]) + 1
+        return today >= datetime.date(end_year, 7, 1)
+
+    def load_index(self):
+        """Loads the metadata of the cached game logs, starting empty if the file is missing or corrupt.
+        """
+        self.index = {}
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding = 'utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read game log cache index, starting with an empty cache: {e}")
+
+    def get_meta(self, key):
+        """Gets the metadata of a cached game log.
+
+        Args:
+            key (str): Key of the game log.
+
+        Returns:
+            dict: The metadata with the keys refreshed and completed, or None if it isn't cached.
+        """
+        if self.index is None:
+            self.load_index()
+        return self.index.get(key)
+
+    def load(self, player_id, season, season_type):
+        """Loads a cached game log.
+
+        Args:
+            player_id (int): NBA player ID.
+            season (str): NBA season represented by years (i.e "2020-21").
+            season_type (str): NBA season type (i.e "Regular Season", "Playoffs", ...).
+
+        Returns:
+            pandas.DataFrame: The cached game log, or None if it isn't cached.
+        """
+        key = self.make_key(player_id, season, season_type)
+        file_path = os.path.join(self.cache_dir, f"{key}.csv")
+        if self.get_meta(key) is None or not os.path.exists(file_path):
+            return None
+        # keep the leading zeros of the game IDs
+        return pd.read_csv(file_path, dtype = {'Game_ID': str})
+
+    def is_up_to_date(self, player_id, season, season_type):
+        """Checks if a cached game log can be used without fetching new games.
+
+        Args:
+            player_id (int): NBA player ID.
+            season (str): NBA season represented by years (i.e "2020-21").
+            season_type (str): NBA season type (i.e "Regular Season", "Playoffs", ...).
+
+        Returns:
+            bool: True if the game log was refreshed after its season ended, or less than refresh_interval seconds ago.
+        """
+        meta = self.get_meta(self.make_key(player_id, season, season_type))
+        if meta is None:
+            return False
+        return meta['completed'] or time.time() - meta['refreshed'] < self.refresh_interval
+
+    @staticmethod
+    def get_last_game_date(game_log):
+        """Gets the date of the most recent game in a game log.
+
+        Args:
+            game_log (pandas.DataFrame): The game log.
+
+        Returns:
+            datetime.date: Date of the most recent game, or None if the game log is empty.
+        """
+        if game_log is None or game_log.empty:
+            return None
+        return pd.to_datetime(game_log['GAME_DATE'], format = GAME_DATE_FORMAT).max().date()
+
+    @staticmethod
+    def merge(cached, new_games, date_from):
+        """Merges newly fetched games into a cached game log.
+
+        Cached games on or after date_from are replaced by the fetched ones, since they were fetched again.
+
+        Args:
+            cached (pandas.DataFrame): The cached game log.
+            new_games (pandas.DataFrame): Games fetched from date_from on.
+            date_from (datetime.date): Date the new games were fetched from.
+
+        Returns:
+            pandas.DataFrame: The merged game log, most recent game first.
+        """
+        cached_dates = pd.to_datetime(cached['GAME_DATE'], format = GAME_DATE_FORMAT).dt.date
+        game_log = pd.concat([new_games, cached.loc[cached_dates < date_from]], ignore_index = True)
+        game_log = game_log.drop_duplicates('Game_ID')
+        dates = pd.to_datetime(game_log['GAME_DATE'], format = GAME_DATE_FORMAT)
+        return game_log.iloc[dates.to_numpy().argsort(kind = 'stable')[::-1]].reset_index(drop = True)
+
+    def save(self, player_id, season, season_type, game_log):
+        """Saves a game log and records when it was refreshed.
+
+        Args:
+            player_id (int): NBA player ID.
+            season (str): NBA season represented by years (i.e "2020-21").
+            season_type (str): NBA season type (i.e "Regular Season", "Playoffs", ...).
+            game_log (pandas.DataFrame): The game log to save.
+        """
+        os.makedirs(self.cache_dir, exist_ok = True)
+        key = self.make_key(player_id, season, season_type)
+        file_path = os.path.join(self.cache_dir, f"{key}.csv")
+        game_log.to_csv(file_path + '.tmp', index = False)
+        os.replace(file_path + '.tmp', file_path)
+
+        if self.index is None:
+            self.load_index()
+        self.index[key] = {
+            'refreshed': time.time(),
+            'completed': self.is_season_completed(season),
+        }
+        with open(self.index_path + '.tmp', 'w', encoding = 'utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
@@ -5,11 +5,21 @@ game logs using the nba_api library. It also gets the links for the different
 clips of the events the user wants to see. 
 """
 import os
-import random
 import pandas as pd
 import asyncio
-import aiohttp
-import json
+from NBAHighlightsMaker.players.link_cache import LinkCache
+from NBAHighlightsMaker.players.pbp_store import PlayByPlayStore, PBP_COLUMNS
+from NBAHighlightsMaker.players.event_filter import EventFilter, EventSelection
+from NBAHighlightsMaker.players.game_log_cache import GameLogCache
+from NBAHighlightsMaker.players.player_index import PlayerIndex
+from NBAHighlightsMaker.common.rate_limiter import parse_retry_after
+from NBAHighlightsMaker.common.retry import RetryableError
+from NBAHighlightsMaker.common.renditions import RenditionSelector, get_links
+from NBAHighlightsMaker.common.http_client import HttpClient
+from NBAHighlightsMaker.common.event_records import EventRecords, ProgressTracker
+
+# columns of the game log shown to the user
+GAME_LOG_COLUMNS = ['Game_ID', 'GAME_DATE', 'MATCHUP', 'WL', 'MIN', 'FGM', 'FGA', 'FTM', 'FTA', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
 
 class DataRetriever:
     """Fetches NBA player data, game logs, and links for different clips.
@@ -21,14 +31,22 @@ class DataRetriever:
     Args:
         ua (UserAgent): UserAgent object from the fake_useragent library, used to generates random user agents.
         data_dir (str): Directory path for storing data files for future use.
+        http_client (HttpClient, optional): Pooled HTTP client shared with the Downloader. Defaults to a new client.
+        renditions (RenditionSelector, optional): Rendition selector shared with the Downloader. Defaults to a new selector for 720p.
     
     Attributes:
         headers (dict): HTTP headers used for requests to get video links.
         ua (UserAgent): UserAgent object from the fake_useragent library; used to generates random user agents.
-        counter (int): Counter for tracking progress for getting links, used in progress bar UI.
         data_dir (str): Directory path for storing data files for future use.
+        link_cache (LinkCache): On-disk cache of video links that were already resolved.
+        pbp_store (PlayByPlayStore): On-disk store of the play-by-play data of games.
+        game_log_cache (GameLogCache): On-disk cache of the game logs of players.
+        http_client (HttpClient): Pooled HTTP client used for the requests to get video links.
+        rate_limiters (RateLimiterRegistry): Per-host rate limiters of the HTTP client.
+        retry_policy (RetryPolicy): Retry policy of the HTTP client.
+        renditions (RenditionSelector): Picks the rendition of each clip to download.
     """
-    def __init__(self, ua, data_dir):
+    def __init__(self, ua, data_dir, http_client = None, renditions = None):
         self.headers = {
             'Host': 'stats.nba.com',
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:72.0) Gecko/20100101 Firefox/72.0',
@@ -43,8 +61,16 @@ class DataRetriever:
             'Cache-Control': 'no-cache'
         }
         self.ua = ua
-        self.counter = 0
         self.data_dir = os.path.join(data_dir, 'csv')
+        self.link_cache = LinkCache(os.path.join(data_dir, 'cache', 'video_links.json'))
+        self.pbp_store = PlayByPlayStore(os.path.join(data_dir, 'pbp'))
+        self.game_log_cache = GameLogCache(os.path.join(self.data_dir, 'game_logs'))
+        self.http_client = http_client or HttpClient()
+        self.rate_limiters = self.http_client.rate_limiters
+        self.retry_policy = self.http_client.retry_policy
+        self.renditions = renditions or RenditionSelector()
+        # only ask for encodings the session can decode
+        self.headers['Accept-Encoding'] = self.http_client.accept_encoding
 
     def get_all_players(self):
         """Retrieves a DataFrame of all NBA players in history, and saves the data.
@@ -68,9 +94,50 @@ class DataRetriever:
             print('All Players data already exists.')
             return all_players
     
+    def get_player_index(self):
+        """Retrieves the search index over all player names, building and saving it if needed.
+
+        Returns:
+            PlayerIndex: Index used to search players by name.
+        """
+        file_path = os.path.join(self.data_dir, 'players_index.json')
+        player_index = PlayerIndex.load(file_path)
+        if player_index is None:
+            from nba_api.stats.static import players
+            # the static player data also says if the player is active, used to rank the results
+            player_index = PlayerIndex.build(players.get_players())
+            player_index.save(file_path)
+            print('Player index created.')
+        else:
+            print('Player index already exists.')
+        return player_index
+
+    def fetch_game_log(self, player_id, season, season_type, date_from = None):
+        """Fetches the game log of a player with the nba_api library.
+
+        Args:
+            player_id (int): NBA player ID.
+            season (str): NBA season represented by years (i.e "2020-21").
+            season_type (str): NBA season type (i.e "Regular Season", "Playoffs", ...).
+            date_from (datetime.date, optional): Only fetch games on or after this date. Defaults to the whole season.
+
+        Returns:
+            pandas.DataFrame: The game log with the columns in GAME_LOG_COLUMNS and VIDEO_AVAILABLE.
+        """
+        from nba_api.stats.endpoints import playergamelog
+        date_from = date_from.strftime('%m/%d/%Y') if date_from else ''
+        game_log = playergamelog.PlayerGameLog(player_id = player_id, season = season, season_type_all_star = season_type,
+                                               date_from_nullable = date_from)
+        game_log = game_log.get_data_frames()[0]
+        return game_log[GAME_LOG_COLUMNS + ['VIDEO_AVAILABLE']]
+
     def get_game_log(self, player_id, season, season_type):  
         """Retrieves a list of games played for a given player, year, and season type.
 
+        Game logs are cached. Cached game logs of completed seasons are returned as is, and
+        cached game logs of the current season are only refreshed with the games played since
+        the last cached game.
+
         Args:
             player_id (int): NBA player ID.
             season (str): NBA season represented by years (i.e "2020-21").
@@ -95,18 +162,58 @@ class DataRetriever:
                 - PF (int): Personal fouls.
                 - PTS (int): Total points scored.
         """
-        from nba_api.stats.endpoints import playergamelog
-        game_log = playergamelog.PlayerGameLog(player_id = player_id, season = season, season_type_all_star = season_type)
-        game_log = game_log.get_data_frames()[0]
+        game_log = self.game_log_cache.load(player_id, season, season_type)
+        if game_log is None or not self.game_log_cache.is_up_to_date(player_id, season, season_type):
+            date_from = self.game_log_cache.get_last_game_date(game_log)
+            if date_from is None:
+                game_log = self.fetch_game_log(player_id, season, season_type)
+            else:
+                # refetch the day of the last cached game, in case its video wasn't available yet
+                new_games = self.fetch_game_log(player_id, season, season_type, date_from)
+                print(f"Fetched {len(new_games)} games since {date_from} for the game log.")
+                game_log = self.game_log_cache.merge(game_log, new_games, date_from)
+            self.game_log_cache.save(player_id, season, season_type, game_log)
+        else:
+            print('Game log loaded from cache.')
         
         # only get rows where video is available, and the specified columns
-        game_log = game_log.loc[game_log['VIDEO_AVAILABLE'] == 1, ['Game_ID', 'GAME_DATE', 'MATCHUP', 'WL', 'MIN', 'FGM', 'FGA', 'FTM', 'FTA', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']]
+        game_log = game_log.loc[game_log['VIDEO_AVAILABLE'] == 1, GAME_LOG_COLUMNS]
         # need to reset index after filtering, as pandas preserves old index
         # set drop = true so old index not put as column
         game_log = game_log.reset_index(drop = True)
         
         return game_log
 
+    def get_play_by_play(self, game_id):
+        """Retrieves the play-by-play actions of a game, using the stored copy when the game is final.
+
+        If the game isn't stored yet or wasn't over when it was stored, the actions are fetched
+        with the nba_api library and stored. Games with a "game end" action are stored as final,
+        so they are never fetched again.
+
+        Args:
+            game_id (str): NBA game ID.
+
+        Returns:
+            pandas.DataFrame: DataFrame of the play-by-play actions with the columns in PBP_COLUMNS.
+        """
+        if self.pbp_store.is_final(game_id):
+            df = self.pbp_store.load(game_id)
+            if df is not None:
+                print(f"Loaded stored play-by-play for {game_id}.")
+                return df
+        from nba_api.live.nba.endpoints import playbyplay
+        pbp = playbyplay.PlayByPlay(game_id=game_id)
+        df = pd.DataFrame(pbp.actions.get_dict())
+        final = self.pbp_store.is_game_over(df)
+        df = df.reindex(columns = PBP_COLUMNS)
+        try:
+            self.pbp_store.save(game_id, df, final)
+        except (OSError, ValueError, TypeError) as e:
+            # storing is only an optimization, the fetched data is still usable
+            print(f"Could not store play-by-play for {game_id}: {e}")
+        return df
+
     def get_event_ids(self, game_id, player_id, wanted_actions, wanted_action_options):
         """Retrieves events for a player in a specific game, filtered by event types desired by the user.
 
@@ -119,6 +226,8 @@ class DataRetriever:
             Returns:
                 pandas.DataFrame: DataFrame of filtered events with the following columns:
                     - actionNumber (int): Unique event number within the game.
+                    - period (int): Period of the game the event happened in.
+                    - clock (str): Time left in the period, i.e PT08M15.50S.
                     - actionType (int): Type of event (i.e field goal, rebound).
                     - subType (str): More specific information about the event.
                     - personId (int): ID of the main player involved in the event.
@@ -128,183 +237,147 @@ class DataRetriever:
                     - foulDrawnPersonId (int): ID of the person who drew the foul.
                     - blockPersonId (int): ID of the person who blocked the shot.
         """
-        from nba_api.live.nba.endpoints import playbyplay
-        try:
-            pbp = playbyplay.PlayByPlay(game_id=game_id)
-            df = pd.DataFrame(pbp.actions.get_dict())
-            # choose rows that have the selected actions and involve the specified player
-            # or are assists made by the player, only if assistes are wanted
-            # or are fouls drawn by the player, only if fouls are wanted
-            filtered_df = df.loc[
-            (
-                (df['actionType'].isin(wanted_actions)) & (df['personId'] == player_id)
-            )
-            |
-                ((df['assistPersonId'] == player_id) & ('assists' in (wanted_actions)))
-            |
-                ((df['foulDrawnPersonId'] == player_id) & ('foul' in (wanted_actions)))
-            , ['actionNumber', 'actionType', 'subType', 'personId', 'description', 'shotResult', 'assistPersonId', 'foulDrawnPersonId', 'blockPersonId']
-            ]
-
-            def filtering_helper(action_1, action_2, wanted_action_set, df, specified_action_vals, 
-                                secondary_col, secondary_col_val):
-                """Helper function to filter unneeded rows based on chosen action types and secondary conditions.
-                
-                There are situations where there are options for certain event types (e.g Field Goals Made/Missed) where
-                and the user only selects one of the options. This function helps filter out the unwanted rows.
-                
-                Args:
-                    action_1 (str): Primary action type to filter using.
-                    action_2 (str): Secondary action type to filter using.
-                    wanted_action_set (set): Set of wanted actions.
-                    df (pandas.DataFrame): DataFrame to filter.
-                    specified_action_vals (set): Set of specific action values to filter using.
-                    secondary_col (str): Secondary column that we use the value from to filter out either action_1 or action_2.
-                    secondary_col_val (any): The value that we match so we can filter the row out.
-                
-                Returns:
-                    pandas.DataFrame: Filtered DataFrame.
-                """
-                if action_1 in wanted_action_set and action_2 not in wanted_action_set:
-                    df = df[
-                        ~((df['actionType'].isin(specified_action_vals)) & (df[secondary_col] == secondary_col_val))
-                    ]
-                elif action_2 in wanted_action_set and action_1 not in wanted_action_set:
-                    df = df[
-                        ~((df['actionType'].isin(specified_action_vals)) & (df[secondary_col] != secondary_col_val))
-                    ]
-                return df
-            
-            # if field goal made checked only, filter out missed shots
-            # filter again for specific cases
-            # if field goal made checked, and field goal missed not checked, only keep made shots
-            # so select rows where it's a made shot or it's not a field goal attempt
-            filtered_df = filtering_helper('Field Goals Made', 'Field Goals Missed', wanted_action_options, filtered_df,
-                                {'2pt', '3pt'}, 'shotResult', 'Missed')
-            
-            # filter for fouls committed/drawn
-            # if fouls committed is checked and fouls drawn isn't
-            # only keep rows where the actionType is foul and the person who committed it isn't the player
-            filtered_df = filtering_helper('Fouls Drawn', 'Fouls Committed', wanted_action_options, filtered_df,
-                                        {'foul'}, 'personId', player_id)
-
-            # filter for free throws made/missed
-            filtered_df = filtering_helper('Free Throws Made', 'Free Throws Missed', wanted_action_options, filtered_df,
-                                            {'freethrow'}, 'shotResult', 'Missed')
-            
-            # avoid duplicates when there is an offensive foul
-            # select rows where it's not a turnover that has subtype offensive foul
-            if 'foul' in wanted_actions and 'turnover' in wanted_actions:
-                filtered_df = filtered_df[
-                    ~((filtered_df['actionType'] == 'turnover') & (filtered_df['subType'] == 'offensive foul'))
-                ]
-            return filtered_df
-        except json.JSONDecodeError:
-            raise
-        except Exception:
-            raise
+        return self.get_events_for_selections(game_id, [EventSelection(player_id, wanted_actions, wanted_action_options)])[0]
+
+    def get_events_for_selections(self, game_id, selections):
+        """Retrieves the events of a game for many selections, fetching the play-by-play only once.
+
+        Args:
+            game_id (str): NBA game ID.
+            selections (list): List of EventSelection objects, one per player and set of wanted actions.
+
+        Returns:
+            list: One DataFrame of filtered events per selection, with the same columns as get_event_ids.
+        """
+        df = self.get_play_by_play(game_id)
+        # compile the wanted actions/options and filter all actions for every selection in one pass
+        return EventFilter(selections).filter(df)
     
-    async def get_download_link(self, session, game_id, row, event_ids, 
-                                update_progress_bar, semaphore, lock):
-        """Asynchronously fetches the video download link and description for an event.
+    @staticmethod
+    def get_event_num(row):
+        """Gets the event number the videoeventsasset endpoint uses for an event.
 
-        Generates a random user agent, sleeps for a random duration to stagger requests, and limits
-        how many requests are happening at a time using a semaphore. Then, it makes a request to get the event link,
-        updates the event_ids dataframe with the video link and description, and updates the progress bar.
-        If the request fails, an error message is saved for that try, and this process is retried until max_retries is exceeded.
+        Steals and blocks are stored one event after the play they belong to,
+        and offensive foul turnovers two events after the foul.
+
+        Args:
+            row (pandas.Series): Row of data for the event containing actionNumber, actionType and subType.
+
+        Returns:
+            int: The adjusted event number.
+        """
+        event_num = row.actionNumber
+        if (row.actionType == 'steal') or (row.actionType == 'block'):
+            event_num -= 1
+        elif row.actionType == 'turnover' and row.subType == 'offensive foul':
+            event_num -= 2
+        return event_num
+
+    async def fetch_download_link(self, session, game_id, row, proxy = False):
+        """Asynchronously fetches the video download link for an event.
+
+        The videoeventsasset response has a link per rendition (size) of the video. All of them are cached,
+        and the rendition selector picks the one to download, i.e the smallest one as tall as the final video.
+        Returns the link right away if the event is in the link cache. Otherwise, generates a random user agent,
+        and waits for the rate limiter of stats.nba.com, which paces the requests and limits how many are
+        happening at a time. Then, it makes a request to get the event link and saves it in the link cache.
+        Failed requests are retried by the retry policy of the HTTP client, which backs off between tries without holding a slot.
 
         Args:
             session (aiohttp.ClientSession): A session object used for the HTTP requests.
             game_id (str): The NBA game ID specified.
             row (pandas.Series): Row of data for the event containing actionNumber, etc.
-            event_ids (pandas.DataFrame): DataFrame to update with video links and the description.
-            update_progress_bar (Callable): Function to update the progress bar in the UI.
-            semaphore (asyncio.Semaphore): Semaphore to limit concurrency.
-            lock (asyncio.Lock): Lock to update the counter and dataframe event_ids safely.
+            proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
+
+        Returns:
+            tuple: (download link of the video of the event, its rendition).
+
+        Raises:
+            RetryError: If every try failed or the host is down, with the outcome of each try.
+        """
+        event_num = self.get_event_num(row)
+        cached = self.get_cached_link(game_id, event_num, proxy)
+        if cached:
+            return cached
+        url = 'https://stats.nba.com/stats/videoeventsasset?GameEventID={}&GameID={}'.format(event_num, game_id)
+        print("Getting link for url: ", url)
+
+        async def attempt():
+            self.headers['User-Agent'] = self.ua.random
+            async with session.get(url, headers=self.headers, timeout=5) as response:
+                if response.status != 200:
+                    raise RetryableError(f"Response Status: {response.status}", response.status,
+                                         parse_retry_after(response.headers.get('Retry-After')))
+                r_json = await response.json()
+                return get_links(r_json['resultSets']['Meta']['videoUrls'][0])
+
+        links = await self.retry_policy.run(attempt, self.rate_limiters.get(url),
+                                            f"getting link for event {row.actionNumber}: {row.description}")
+        # every rendition is cached, so a job wanting another size doesn't ask again
+        self.link_cache.put(game_id, event_num, links)
+        rendition = self.renditions.select(links, proxy)
+        return links[rendition], rendition
+
+    def get_cached_link(self, game_id, event_num, proxy = False):
+        """Gets the link of the rendition to download from the link cache.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used by the videoeventsasset endpoint.
+            proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
+
+        Returns:
+            tuple: (link of the rendition picked by the rendition selector, the rendition), or None if the event isn't cached.
+        """
+        links = self.link_cache.get_links(game_id, event_num)
+        if not links:
+            return None
+        rendition = self.renditions.select(links, proxy)
+        return links[rendition], rendition
+
+    async def get_download_link(self, session, game_id, position, row, records, progress, proxy = False):
+        """Asynchronously fetches the video download link for an event and records it.
+
+        Gets the link with fetch_download_link(), then stores it and its rendition at the position
+        of the event in records and updates the progress.
+
+        Args:
+            session (aiohttp.ClientSession): A session object used for the HTTP requests.
+            game_id (str): The NBA game ID specified.
+            position (int): Position of the event in the DataFrame of events.
+            row (pandas.Series): Row of data for the event containing actionNumber, etc.
+            records (EventRecords): Per-event results of the job, with VIDEO_LINK and RENDITION columns.
+            progress (ProgressTracker): Progress of the job.
+            proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
 
         Raises:
             Exception: If maximum retries are exceeded for a request, raises an exception with details.
         """
-        retry_count = 0
-        error_msg_string = ''
-        while retry_count < 3:
-            async with semaphore:
-                print(f"Retry count: {retry_count + 1}")
-                self.headers['User-Agent'] = self.ua.random
-                print("Headers: ", self.headers)
-                time = random.uniform(0, 2.0)
-                print(f"Sleeping for {time:.2f} seconds before getting link for {row.actionNumber}...")
-                await asyncio.sleep(time)
-                event_num = row.actionNumber
-                if (row.actionType == 'steal') or (row.actionType == 'block'):
-                    event_num -= 1
-                elif row.actionType == 'turnover' and row.subType == 'offensive foul':
-                    event_num -= 2
-                url = 'https://stats.nba.com/stats/videoeventsasset?GameEventID={}&GameID={}'.format(event_num, game_id)
-                print("Getting link for url: ", url)
-                try:
-                    async with session.get(url, headers=self.headers, timeout=5) as response:
-                        if response.status == 200:
-                            r_json = await response.json()
-                            video_link = r_json['resultSets']['Meta']['videoUrls'][0]['lurl']
-                            async with lock:
-                                # add the link and description to event_ids
-                                # 1st part of loc filters rows, 2nd part is for columns
-                                event_ids.loc[event_ids['actionNumber'] == row.actionNumber, 'VIDEO_LINK'] = video_link
-                                self.counter += 1
-                                value = int((self.counter) / len(event_ids) * 100)
-                                update_progress_bar(value, "Get link for: {}".format(row.description))
-                            print("Sleeping...")
-                            await asyncio.sleep(random.uniform(0, 1.0))
-                            return
-                        elif response.status == 429:
-                            print(f"Rate limit exceeded for {row.actionNumber}. Retrying after a delay...")
-                            error_msg_string += f"Retry {retry_count + 1} failed: Rate limit exceeded, Response Status: {response.status}\n"
-                            await asyncio.sleep(random.uniform(3, 7))
-                            # Retry the download after waiting
-                            retry_count += 1
-                        else:
-                            print(f"Failed to get link for {row.actionNumber}, Response Status: {response.status}")
-                            error_msg_string += f"Retry {retry_count + 1} failed: Response Status: {response.status}\n"
-                            retry_count += 1
-                except aiohttp.ClientConnectionError as e:
-                    print(f"Client Connection error: {e}")
-                    error_msg_string += f"Retry {retry_count + 1} failed: Client Connection error.\n"
-                    retry_count += 1
-                except aiohttp.ClientResponseError as e:
-                    print(f"Response error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Client Response error.\n"
-                    retry_count += 1
-                except aiohttp.ClientError as e:
-                    print(f"Client error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Client error.\n"
-                    retry_count += 1
-                except asyncio.TimeoutError as e:
-                    print(f"Timeout error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Timeout error.\n"
-                    retry_count += 1
-                except Exception as e:
-                    print(f"Unexpected error: {e}")
-                    error_msg_string += f"Try #{retry_count + 1} failed: Unexpected error.\n"
-                    retry_count += 1
-        print(f"Max retries exceeded for {row.actionNumber}. Skipping.")
-        raise Exception(f"Max retries exceeded while getting link for event {row.actionNumber}: {row.description}.\n\n{error_msg_string}")
-        
-    async def get_download_links_async(self, game_id, event_ids, update_progress_bar):
+        video_link, rendition = await self.fetch_download_link(session, game_id, row, proxy = proxy)
+        records.set(position, 'VIDEO_LINK', video_link)
+        records.set(position, 'RENDITION', rendition)
+        progress.advance("Get link for: {}".format(row.description))
+
+    async def get_download_links_async(self, game_id, event_ids, update_progress_bar, proxy = False):
         """Creates a task for each event to fetch video download links and execute the tasks.
 
-        Creates a ClientSession, and using that, creates a task for each event to fetch the video download link.
-        The tasks are then run concurrently, but limited by a semaphore so only three requests happen at a time.
-        As each task completes, the event_ids DataFrame is updated with the video links and descriptions.
+        Events whose link is already in the link cache are filled in right away. For the rest,
+        uses the shared session of the HTTP client to create a task for each event to fetch the video download link.
+        The tasks are then run concurrently, paced by the adaptive rate limiter of stats.nba.com.
+        Each task stores its link by the position of its event, and the VIDEO_LINK and RENDITION columns
+        are added to the event_ids DataFrame once every task is done.
 
         Args:
             game_id (str): NBA game ID.
             event_ids (pandas.DataFrame): DataFrame of event IDs.
             update_progress_bar (Callable): Function to update the progress bar.
+            proxy (bool, optional): Whether to download the smallest rendition, for previews. Defaults to False.
 
         Returns:
             pandas.DataFrame: DataFrame with the following columns:
                 - actionNumber (int): Unique event number within the game.
+                - period (int): Period of the game the event happened in.
+                - clock (str): Time left in the period, i.e PT08M15.50S.
                 - actionType (int): Type of event (i.e field goal, rebound).
                 - subType (str): More specific information about the event.
                 - personId (int): ID of the main player involved in the event.
@@ -314,27 +387,40 @@ class DataRetriever:
                 - foulDrawnPersonId (int): ID of the person who drew the foul.
                 - blockPersonId (int): ID of the person who blocked the shot.
                 - VIDEO_LINK (str): The download link for the event.
+                - RENDITION (str): The rendition of the link, i.e "lurl".
         """
-        # make new columns for vid link and desc
-        event_ids['VIDEO_LINK'] = ''
-        # limit the number of concurrent requests
-        semaphore = asyncio.Semaphore(3)
-        async with aiohttp.ClientSession(
-            headers = self.headers,
-        ) as session:
-            tasks = []
-            lock = asyncio.Lock()
-            for row in event_ids.itertuples(index=True):
-                tasks.append(self.get_download_link(session, game_id, row, event_ids, 
-                                                    update_progress_bar, semaphore, 
-                                                    lock))
-            try:
-                await asyncio.gather(*tasks)
-            except Exception:
-                raise
-            finally:
-                self.counter = 0
-        print("Finished getting download links.")
+        records = EventRecords(len(event_ids), ['VIDEO_LINK', 'RENDITION'])
+        progress = ProgressTracker(len(event_ids), update_progress_bar)
+        # fill in links we already have, only go to the network for the rest
+        missing_rows = []
+        for position, row in enumerate(event_ids.itertuples(index=True)):
+            cached = self.get_cached_link(game_id, self.get_event_num(row), proxy)
+            if cached:
+                records.set(position, 'VIDEO_LINK', cached[0])
+                records.set(position, 'RENDITION', cached[1])
+                progress.advance()
+            else:
+                missing_rows.append((position, row))
+        if progress.done > 0:
+            print(f"Found {progress.done} of {len(event_ids)} links in the link cache.")
+            progress.report("Loaded cached links")
+        if not missing_rows:
+            self.link_cache.save()
+            print("Finished getting download links.")
+            return records.to_frame(event_ids)
+        session = self.http_client.get_session()
+        tasks = []
+        for position, row in missing_rows:
+            tasks.append(self.get_download_link(session, game_id, position, row, records, progress, proxy))
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            raise
+        finally:
+            # keep the links resolved so far, even if a request failed
+            self.link_cache.save()
+        event_ids = records.to_frame(event_ids)
+        print("Finished getting download links.", self.rate_limiters.get('stats.nba.com').metrics(), self.retry_policy.metrics())
         return event_ids
 
 
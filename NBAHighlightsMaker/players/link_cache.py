@@ -0,0 +1,159 @@
+"""Caches the video links of events on disk.
+
+This module contains the class LinkCache, which stores the video download links of every
+rendition for each (game ID, event number) pair in a JSON file, so links that were already
+resolved don't have to be requested from the NBA website again, whichever rendition is wanted.
+"""
+import os
+import json
+import time
+from collections import OrderedDict
+from NBAHighlightsMaker.common.renditions import DEFAULT_RENDITION
+
+class LinkCache:
+    """Persistent cache of video links keyed by game ID and event number.
+
+    Each entry records when it was created and when it expires. Entries are kept in an
+    OrderedDict, least recently used first: a hit moves its entry to the end, and when the
+    cache grows past max_entries the entries at the front are evicted. Expired entries are
+    treated as misses and removed when they are looked up or when the cache is saved.
+    The file is loaded lazily on first use and only written back by save() when something changed.
+
+    Args:
+        file_path (str): Path of the JSON file used to store the cache.
+        ttl (float, optional): Number of seconds before an entry expires. Defaults to 7 days.
+        max_entries (int, optional): Maximum number of entries kept in the cache. Defaults to 5000.
+
+    Attributes:
+        file_path (str): Path of the JSON file used to store the cache.
+        ttl (float): Number of seconds before an entry expires.
+        max_entries (int): Maximum number of entries kept in the cache.
+        entries (OrderedDict): Maps "game_id:event_num" to the entry for that event, least recently used first,
+            None until loaded.
+        dirty (bool): Whether the entries changed since the last save.
+    """
+    def __init__(self, file_path, ttl = 7 * 24 * 60 * 60, max_entries = 5000):
+        self.file_path = file_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = None
+        self.dirty = False
+
+    @staticmethod
+    def make_key(game_id, event_num):
+        """Makes the key used to store the entry of an event.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used by the videoeventsasset endpoint.
+
+        Returns:
+            str: Key of the form "game_id:event_num".
+        """
+        return f"{game_id}:{int(event_num)}"
+
+    def load(self):
+        """Loads the entries from disk, starting with an empty cache if the file is missing or corrupt.
+
+        The file keeps the entries in the order of the cache, so the least recently used ones stay first.
+        """
+        self.entries = OrderedDict()
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding = 'utf-8') as f:
+                data = json.load(f)
+            self.entries = OrderedDict(data.get('entries', {}))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not read link cache, starting with an empty cache: {e}")
+            self.entries = OrderedDict()
+
+    def get(self, game_id, event_num, rendition = DEFAULT_RENDITION):
+        """Gets the cached link of one rendition for an event.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used by the videoeventsasset endpoint.
+            rendition (str, optional): Rendition of the link. Defaults to DEFAULT_RENDITION.
+
+        Returns:
+            str: The cached video link, or None if there is no entry, the entry expired or it has no link of that rendition.
+        """
+        links = self.get_links(game_id, event_num)
+        return links.get(rendition) if links else None
+
+    def get_links(self, game_id, event_num):
+        """Gets the cached links of every rendition for an event, marking the entry as the most recently used.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used by the videoeventsasset endpoint.
+
+        Returns:
+            dict: Maps renditions to their link, or None if there is no entry or the entry expired.
+        """
+        if self.entries is None:
+            self.load()
+        key = self.make_key(game_id, event_num)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires'] <= time.time():
+            del self.entries[key]
+            self.dirty = True
+            return None
+        if next(reversed(self.entries)) != key:
+            self.entries.move_to_end(key)
+            self.dirty = True
+        return entry['links']
+
+    def put(self, game_id, event_num, links):
+        """Stores the links for an event, evicting the least recently used entries if the cache is full.
+
+        Args:
+            game_id (str): NBA game ID.
+            event_num (int): Event number used by the videoeventsasset endpoint.
+            links (dict): Maps renditions to their video link, or the link of the default rendition as a str.
+        """
+        if self.entries is None:
+            self.load()
+        if isinstance(links, str):
+            links = {DEFAULT_RENDITION: links}
+        now = time.time()
+        key = self.make_key(game_id, event_num)
+        self.entries[key] = {'links': links, 'created': now, 'expires': now + self.ttl}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+        self.dirty = True
+
+    def remove_expired(self):
+        """Removes the expired entries.
+        """
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if entry['expires'] <= now]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.dirty = True
+
+    def save(self):
+        """Writes the entries to disk if they changed, without the expired ones.
+
+        The file is written to a temporary path first and then renamed,
+        so a crash while saving can't leave a half written cache behind.
+        """
+        if self.entries is None or not self.dirty:
+            return
+        self.remove_expired()
+        os.makedirs(os.path.dirname(self.file_path), exist_ok = True)
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w', encoding = 'utf-8') as f:
+            json.dump({'entries': self.entries}, f)
+        os.replace(tmp_path, self.file_path)
+        self.dirty = False
+
+    def __len__(self):
+        if self.entries is None:
+            self.load()
+        return len(self.entries)
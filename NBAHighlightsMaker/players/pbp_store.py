@@ -0,0 +1,174 @@
+"""Stores the play-by-play data of games on disk.
+
+This module contains the class PlayByPlayStore, which saves the play-by-play actions
+of each game in a compact columnar file, so games that are already over don't have to
+be fetched from the NBA website again.
+"""
+import os
+import json
+import time
+import pandas as pd
+
+# columns of the play-by-play actions that are kept in the store
+PBP_COLUMNS = ['actionNumber', 'period', 'clock', 'actionType', 'subType', 'personId', 'description',
+               'shotResult', 'assistPersonId', 'foulDrawnPersonId', 'blockPersonId']
+
+class PlayByPlayStore:
+    """Persistent per-game store of play-by-play actions.
+
+    Each game is saved as a Feather file (or a pickle file if pyarrow isn't installed)
+    next to a small JSON file with its metadata. Once a game is marked final, the stored
+    copy is authoritative and is read back instead of fetching the game again. Only the
+    requested columns of a Feather file are read.
+
+    Args:
+        store_dir (str): Directory where the play-by-play files are saved.
+
+    Attributes:
+        store_dir (str): Directory where the play-by-play files are saved.
+        file_format (str): Format used for new files, either "feather" or "pickle".
+    """
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        try:
+            import pyarrow.feather
+            self.file_format = 'feather'
+        except ImportError:
+            self.file_format = 'pickle'
+
+    def get_meta_path(self, game_id):
+        """Gets the path of the metadata file for a game.
+
+        Args:
+            game_id (str): NBA game ID.
+
+        Returns:
+            str: Path of the JSON metadata file.
+        """
+        return os.path.join(self.store_dir, f"{game_id}.json")
+
+    def get_meta(self, game_id):
+        """Reads the metadata of a stored game.
+
+        Args:
+            game_id (str): NBA game ID.
+
+        Returns:
+            dict: The metadata with the keys final, format, file, rows and fetched, or None if the game isn't stored.
+        """
+        meta_path = self.get_meta_path(game_id)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding = 'utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read play-by-play metadata for {game_id}: {e}")
+            return None
+
+    def is_final(self, game_id):
+        """Checks if the stored copy of a game is final and can be used without fetching the game.
+
+        Args:
+            game_id (str): NBA game ID.
+
+        Returns:
+            bool: True if the game is stored and marked final.
+        """
+        meta = self.get_meta(game_id)
+        return bool(meta and meta['final'] and os.path.exists(os.path.join(self.store_dir, meta['file'])))
+
+    def load(self, game_id, columns = None):
+        """Loads the stored actions of a game.
+
+        Args:
+            game_id (str): NBA game ID.
+            columns (list, optional): Columns to load. Defaults to all of PBP_COLUMNS.
+
+        Returns:
+            pandas.DataFrame: The stored actions, or None if the game isn't stored.
+        """
+        meta = self.get_meta(game_id)
+        if meta is None:
+            return None
+        file_path = os.path.join(self.store_dir, meta['file'])
+        if not os.path.exists(file_path):
+            return None
+        if meta['format'] == 'feather':
+            from pyarrow import feather
+            return feather.read_table(file_path, columns = columns).to_pandas()
+        df = pd.read_pickle(file_path)
+        return df if columns is None else df[columns]
+
+    def save(self, game_id, df, final):
+        """Saves the actions of a game, replacing any previous copy.
+
+        The data file is written before the metadata file, and both are written to temporary
+        paths and renamed, so a stored game is never marked final with a partial file.
+
+        Args:
+            game_id (str): NBA game ID.
+            df (pandas.DataFrame): Play-by-play actions of the game.
+            final (bool): Whether the game is over, making the stored copy authoritative.
+        """
+        os.makedirs(self.store_dir, exist_ok = True)
+        # not every game has every column, e.g. a game without blocks has no blockPersonId
+        df = df.reindex(columns = PBP_COLUMNS).reset_index(drop = True)
+        file_name = f"{game_id}.{self.file_format}"
+        file_path = os.path.join(self.store_dir, file_name)
+        tmp_path = file_path + '.tmp'
+        if self.file_format == 'feather':
+            df.to_feather(tmp_path)
+        else:
+            df.to_pickle(tmp_path, compression = None)
+        os.replace(tmp_path, file_path)
+
+        self.write_meta(game_id, {
+            'final': bool(final),
+            'format': self.file_format,
+            'file': file_name,
+            'rows': len(df),
+            'fetched': time.time(),
+        })
+
+    def write_meta(self, game_id, meta):
+        """Writes the metadata of a stored game.
+
+        Args:
+            game_id (str): NBA game ID.
+            meta (dict): The metadata to write.
+        """
+        meta_path = self.get_meta_path(game_id)
+        with open(meta_path + '.tmp', 'w', encoding = 'utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def mark_final(self, game_id):
+        """Marks a stored game as final so the stored copy is used from now on.
+
+        Args:
+            game_id (str): NBA game ID.
+
+        Returns:
+            bool: True if the game was stored and is now marked final.
+        """
+        meta = self.get_meta(game_id)
+        if meta is None:
+            return False
+        meta['final'] = True
+        self.write_meta(game_id, meta)
+        return True
+
+    @staticmethod
+    def is_game_over(df):
+        """Checks if the actions of a game include the end of the game.
+
+        Args:
+            df (pandas.DataFrame): Play-by-play actions of the game.
+
+        Returns:
+            bool: True if there is a "game end" action.
+        """
+        if 'actionType' not in df.columns or 'subType' not in df.columns:
+            return False
+        return bool(((df['actionType'] == 'game') & (df['subType'] == 'end')).any())
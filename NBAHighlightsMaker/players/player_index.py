@@ -0,0 +1,232 @@
+"""Searches player names by prefix and by similarity.
+
+This module contains the class PlayerIndex, a prebuilt search index over the names of all
+NBA players. It combines a prefix trie, where every node keeps the best ranked players under it,
+with a trigram index for fuzzy matches, and ranks players by whether they are active and how
+recent they are. The index can be saved to and loaded from a JSON file, and has no Qt dependency.
+
+Typical usage example:
+    player_index = PlayerIndex.build(players.get_players())
+    player_index.search("jokic", limit = 5)
+"""
+import os
+import json
+import unicodedata
+
+class PlayerIndex:
+    """Prebuilt search index over player names.
+
+    Names are normalized (accents removed, lower case, only letters, digits and spaces) so
+    "Jokic" finds "Nikola Jokić". Players are ranked with active players first, then by ID,
+    as newer players have higher IDs. The trie holds every normalized full name and every name
+    after the first word, so a query can start with either the first or the last name. Each trie
+    node keeps the top_k best ranked players under it, so a prefix lookup costs the length of the
+    query no matter how many players there are. If there aren't enough prefix matches, names
+    sharing trigrams with the query are added.
+
+    Args:
+        players (list): List of [id, full_name, is_active] entries, best ranked first.
+        trie (dict): Nested dicts of characters, where the key "" of each node holds its top player positions.
+        trigrams (dict): Maps each trigram to the positions of the players whose name contains it.
+        top_k (int, optional): Number of players kept per trie node. Defaults to 10.
+
+    Attributes:
+        players (list): List of [id, full_name, is_active] entries, best ranked first.
+        trie (dict): Nested dicts of characters, where the key "" of each node holds its top player positions.
+        trigrams (dict): Maps each trigram to the positions of the players whose name contains it.
+        top_k (int): Number of players kept per trie node.
+        normalized_names (list): Normalized name of each player.
+    """
+    VERSION = 1
+
+    def __init__(self, players, trie, trigrams, top_k = 10):
+        self.players = players
+        self.trie = trie
+        self.trigrams = trigrams
+        self.top_k = top_k
+        self.normalized_names = [self.normalize(full_name) for _, full_name, _ in players]
+
+    @staticmethod
+    def normalize(text):
+        """Normalizes a name or query for matching.
+
+        Args:
+            text (str): Name or query.
+
+        Returns:
+            str: Lower case text without accents or punctuation, i.e "D'Angelo Russell" -> "dangelo russell".
+        """
+        text = unicodedata.normalize('NFKD', str(text))
+        text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+        text = ''.join(c if c.isalnum() or c.isspace() else (' ' if c == '-' else '') for c in text)
+        return ' '.join(text.split())
+
+    @staticmethod
+    def get_trigrams(text):
+        """Gets the trigrams of a normalized text, padded so the start and end of words count.
+
+        Args:
+            text (str): Normalized text.
+
+        Returns:
+            set: Set of trigrams.
+        """
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @classmethod
+    def build(cls, players, top_k = 10):
+        """Builds the index from the player data of the nba_api library.
+
+        Args:
+            players (list): List of dicts with the keys id, full_name and optionally is_active.
+            top_k (int, optional): Number of players kept per trie node. Defaults to 10.
+
+        Returns:
+            PlayerIndex: The index.
+        """
+        ranked = sorted(
+            ([int(p['id']), p['full_name'], bool(p.get('is_active', False))] for p in players),
+            key = lambda p: (not p[2], -p[0])
+        )
+        trie = {}
+        trigrams = {}
+        for position, (_, full_name, _) in enumerate(ranked):
+            name = cls.normalize(full_name)
+            words = name.split(' ')
+            # the full name and every suffix starting at a later word, i.e "jokic" for "nikola jokic"
+            keys = {' '.join(words[i:]) for i in range(len(words))}
+            for key in keys:
+                node = trie
+                for c in key:
+                    node = node.setdefault(c, {'': []})
+                    # players are inserted best ranked first, so each list stays sorted
+                    if len(node['']) < top_k and position not in node['']:
+                        node[''].append(position)
+            for trigram in cls.get_trigrams(name):
+                trigrams.setdefault(trigram, []).append(position)
+        return cls(ranked, trie, trigrams, top_k)
+
+    @classmethod
+    def load(cls, file_path):
+        """Loads an index saved with save().
+
+        Args:
+            file_path (str): Path of the JSON file.
+
+        Returns:
+            PlayerIndex: The index, or None if the file is missing, corrupt or from another version.
+        """
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, 'r', encoding = 'utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read player index: {e}")
+            return None
+        if data.get('version') != cls.VERSION:
+            return None
+        return cls(data['players'], data['trie'], data['trigrams'], data['top_k'])
+
+    def save(self, file_path):
+        """Saves the index to a JSON file.
+
+        Args:
+            file_path (str): Path of the JSON file.
+        """
+        data = {
+            'version': self.VERSION,
+            'top_k': self.top_k,
+            'players': self.players,
+            'trie': self.trie,
+            'trigrams': self.trigrams,
+        }
+        with open(file_path + '.tmp', 'w', encoding = 'utf-8') as f:
+            json.dump(data, f, ensure_ascii = False, separators = (',', ':'))
+        os.replace(file_path + '.tmp', file_path)
+
+    def prefix_search(self, query):
+        """Gets the best ranked players with a name, or a name after its first word, starting with the query.
+
+        Args:
+            query (str): Normalized query.
+
+        Returns:
+            list: Up to top_k player positions, best ranked first.
+        """
+        node = self.trie
+        for c in query:
+            node = node.get(c)
+            if node is None:
+                return []
+        return node['']
+
+    def fuzzy_search(self, query, limit, min_similarity = 0.3):
+        """Gets the players whose names share the most trigrams with the query.
+
+        Args:
+            query (str): Normalized query.
+            limit (int): Maximum number of players returned.
+            min_similarity (float, optional): Minimum share of the query's trigrams a name must have. Defaults to 0.3.
+
+        Returns:
+            list: Player positions, most similar first, ties broken by rank.
+        """
+        query_trigrams = self.get_trigrams(query)
+        counts = {}
+        for trigram in query_trigrams:
+            for position in self.trigrams.get(trigram, ()):
+                counts[position] = counts.get(position, 0) + 1
+        min_count = max(1, int(min_similarity * len(query_trigrams) + 0.5))
+        matches = [position for position, count in counts.items() if count >= min_count]
+        matches.sort(key = lambda position: (-counts[position], position))
+        return matches[:limit]
+
+    def search(self, query, limit = 10):
+        """Searches players by name.
+
+        Prefix matches come first, then fuzzy matches if there aren't enough prefix matches.
+        An empty query returns the best ranked players.
+
+        Args:
+            query (str): Text typed by the user.
+            limit (int, optional): Maximum number of players returned. Defaults to 10.
+
+        Returns:
+            list: List of (id, full_name) tuples, best match first.
+        """
+        query = self.normalize(query)
+        if not query:
+            positions = list(range(min(limit, len(self.players))))
+        else:
+            positions = list(self.prefix_search(query)[:limit])
+            if len(positions) < limit:
+                for position in self.fuzzy_search(query, limit):
+                    if position not in positions:
+                        positions.append(position)
+                    if len(positions) == limit:
+                        break
+        return [(self.players[p][0], self.players[p][1]) for p in positions]
+
+    def find_id(self, full_name):
+        """Gets the ID of the best ranked player with exactly this name, ignoring accents and case.
+
+        Args:
+            full_name (str): Full name of the player.
+
+        Returns:
+            int: The player ID, or None if no player has this name.
+        """
+        name = self.normalize(full_name)
+        for position in self.prefix_search(name):
+            if self.normalized_names[position] == name:
+                return self.players[position][0]
+        # more than top_k names start with this name, so it wasn't kept in the trie node
+        for position, normalized_name in enumerate(self.normalized_names):
+            if normalized_name == name:
+                return self.players[position][0]
+        return None
+
+    def __len__(self):
+        return len(self.players)
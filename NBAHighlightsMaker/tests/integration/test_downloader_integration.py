@@ -5,6 +5,7 @@ from fake_useragent import UserAgent
 import os
 import pandas as pd
 from NBAHighlightsMaker.downloader.downloader import Downloader
+from NBAHighlightsMaker.common.event_records import EventRecords, ProgressTracker
 
 @pytest.fixture(scope='session')
 def make_data(tmp_path_factory):
@@ -44,11 +45,9 @@ async def test_downloader_integration(make_data):
         nonlocal string
         string = f"Progress: {value}%, {description}"
     
-    # make semaphore
-    semaphore = asyncio.Semaphore(3)
-
-    # make lock
-    lock = asyncio.Lock()
+    # make per-event records and progress of the job
+    records = EventRecords(len(event_ids), ['FILE_PATH'])
+    progress = ProgressTracker(len(event_ids), update_progress_bar)
 
     # make file path
     file_path = os.path.join(data_dir, "{}.mp4".format(row.actionNumber))
@@ -56,8 +55,8 @@ async def test_downloader_integration(make_data):
     # make aiohttp session
     async with aiohttp.ClientSession() as session:
         # call to download file
-        await downloader.download_file(session, event_ids, row, file_path,
-                                       update_progress_bar, semaphore, lock)
+        await downloader.download_file(session, 0, row, file_path, records, progress)
+    event_ids = records.to_frame(event_ids)
     
     # check that we get a new file path
     assert event_ids.loc[event_ids['actionNumber'] == 8, 'FILE_PATH'].values[0] != "", "The FILE_PATH should not be empty."
@@ -2,6 +2,7 @@ import asyncio
 import aiohttp
 import pytest
 from NBAHighlightsMaker.players.getplayers import DataRetriever
+from NBAHighlightsMaker.common.event_records import EventRecords, ProgressTracker
 from fake_useragent import UserAgent
 from NBAHighlightsMaker.common.enums import EventMsgType
 import os
@@ -113,15 +114,14 @@ async def test_get_download_link_integration(make_data):
         nonlocal string
         string = f"Progress: {value}%, Description: {description}"
     
-    # make semaphore
-    semaphore = asyncio.Semaphore(3)
-
-    # make lock
-    lock = asyncio.Lock()
+    # make per-event records and progress of the job
+    records = EventRecords(len(event_ids), ['VIDEO_LINK'])
+    progress = ProgressTracker(len(event_ids), update_progress_bar)
     # make aiohttp session
     async with aiohttp.ClientSession() as session:
         # call to get download link
-        await data_retriever.get_download_link(session, game_id, row, event_ids, update_progress_bar, semaphore, lock)
+        await data_retriever.get_download_link(session, game_id, 0, row, records, progress)
+    event_ids = records.to_frame(event_ids)
     
     assert string == "Progress: 100%, Description: Get link for: J. McDaniels 24' 3PT  (3 PTS) (J. Randle 1 AST)"
 
@@ -0,0 +1,33 @@
+import subprocess
+import pytest
+from NBAHighlightsMaker.editor.ffmpeg_tools import get_ffmpeg_exe
+
+# what "ffmpeg -i" prints for a clip from the NBA website
+FFMPEG_OUTPUT = """Input #0, mov,mp4,m4a,3gp,3g2,mj2, from '8.mp4':
+  Duration: 00:00:07.51, start: 0.000000, bitrate: 2213 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(tv, bt709, progressive), 1280x720 [SAR 1:1 DAR 16:9], 2080 kb/s, 29.97 fps, 29.97 tbr, 30k tbn (default)
+  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), 48000 Hz, stereo, fltp, 128 kb/s (default)
+"""
+
+def encode_clip(path, size = '1280x720', rate = 30, duration = 1, audio = True, gop = None):
+    """Encodes a test pattern with a tone, like the clips from the NBA website, with a keyframe every "gop" frames.
+    """
+    audio_args = ['-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000', '-c:a', 'aac'] if audio else []
+    gop_args = ['-g', str(gop)] if gop else []
+    subprocess.run([get_ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'testsrc=size={size}:rate={rate}', *audio_args,
+                    '-t', str(duration), '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                    *gop_args, str(path)], check = True)
+    return str(path)
+
+@pytest.fixture(scope = 'session')
+def make_clip():
+    """Function encoding a test clip, see encode_clip().
+    """
+    return encode_clip
+
+@pytest.fixture(scope = 'session')
+def ffmpeg_output():
+    """What "ffmpeg -i" prints for a 7.51 second 720p clip with AAC audio.
+    """
+    return FFMPEG_OUTPUT
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.batch.batch import BatchHighlightsMaker, BatchJob
+from NBAHighlightsMaker.players.event_filter import EventFilter
+from NBAHighlightsMaker.players.getplayers import DataRetriever
+
+SCORER_ID = 1630183
+PASSER_ID = 203944
+
+class FakeDataRetriever:
+    """Counts play-by-play fetches and link requests instead of going to the network.
+    """
+    get_event_num = staticmethod(DataRetriever.get_event_num)
+
+    def __init__(self):
+        self.pbp_fetches = []
+        self.link_requests = []
+
+    def get_events_for_selections(self, game_id, selections):
+        self.pbp_fetches.append(game_id)
+        df = pd.DataFrame({
+            'actionNumber': [8, 9, 12, 13],
+            'actionType': ['3pt', 'rebound', '2pt', 'block'],
+            'subType': ['Jump Shot', 'defensive', 'Layup', ''],
+            'personId': [SCORER_ID, PASSER_ID, SCORER_ID, PASSER_ID],
+            'description': ["3PT (1 AST)", "REBOUND", "Layup", "BLOCK"],
+            'shotResult': ['Made', None, 'Missed', None],
+            'assistPersonId': [PASSER_ID, None, None, None],
+            'foulDrawnPersonId': [None, None, None, None],
+            'blockPersonId': [None, None, PASSER_ID, None],
+        })
+        return EventFilter(selections).filter(df)
+
+    async def get_download_links_async(self, game_id, event_ids, update_progress_bar, proxy = False):
+        self.link_requests.extend((game_id, num) for num in event_ids['EVENT_NUM'])
+        event_ids['VIDEO_LINK'] = [f"https://videos.nba.com/{game_id}/{num}.mp4" for num in event_ids['EVENT_NUM']]
+        return event_ids
+
+class FakeDownloader:
+    def __init__(self):
+        self.downloads = []
+
+    async def download_files(self, event_ids, update_progress_bar, game_id = None, proxy = False):
+        self.downloads.extend(event_ids['VIDEO_LINK'])
+        event_ids = event_ids.reset_index(drop = True)
+        event_ids['FILE_PATH'] = [f"{game_id}_{n}.mp4" for n in event_ids['actionNumber']]
+        return event_ids
+
+class FakeVideoMaker:
+    def __init__(self):
+        self.videos = {}
+
+    async def make_final_vid(self, clip_paths, output_path = None, settings = None):
+        self.videos[output_path] = clip_paths
+
+@pytest.mark.asyncio
+async def test_shared_fetches(tmp_path):
+    data_retriever = FakeDataRetriever()
+    downloader = FakeDownloader()
+    video_maker = FakeVideoMaker()
+    batch_maker = BatchHighlightsMaker(data_retriever, downloader, video_maker, str(tmp_path))
+
+    actions = {'2pt', '3pt', 'assists', 'rebound', 'block'}
+    jobs = [
+        (SCORER_ID, "0022400001", actions),
+        (PASSER_ID, "0022400001", actions),
+        BatchJob(SCORER_ID, "0022400002", actions),
+    ]
+    output_paths = await batch_maker.make_highlights(jobs, lambda value, description: None)
+
+    # play-by-play fetched once per game
+    assert data_retriever.pbp_fetches == ["0022400001", "0022400002"]
+
+    # the assisted 3 and the blocked layup are shared, so game 1 has 3 distinct clips, not 5
+    assert data_retriever.link_requests == [("0022400001", 8), ("0022400001", 9), ("0022400001", 12),
+                                            ("0022400002", 8), ("0022400002", 12)]
+    assert len(downloader.downloads) == len(set(downloader.downloads)) == 5
+
+    # every job gets its own video, made from its own clips in order
+    assert len(output_paths) == 3
+    scorer_path = str(tmp_path / 'vids' / f"{SCORER_ID}_0022400001.mp4")
+    passer_path = str(tmp_path / 'vids' / f"{PASSER_ID}_0022400001.mp4")
+    assert video_maker.videos[scorer_path] == ["0022400001_8.mp4", "0022400001_12.mp4"]
+    # the passer's block uses the clip of the blocked layup
+    assert video_maker.videos[passer_path] == ["0022400001_8.mp4", "0022400001_9.mp4", "0022400001_12.mp4"]
+
+@pytest.mark.asyncio
+async def test_job_without_clips(tmp_path):
+    video_maker = FakeVideoMaker()
+    batch_maker = BatchHighlightsMaker(FakeDataRetriever(), FakeDownloader(), video_maker, str(tmp_path))
+
+    output_paths = await batch_maker.make_highlights([(SCORER_ID, "0022400001", {'steal'})],
+                                                     lambda value, description: None)
+
+    assert list(output_paths.values()) == [None]
+    assert video_maker.videos == {}
@@ -0,0 +1,23 @@
+import pytest
+from NBAHighlightsMaker.editor.benchmark import benchmark_profiles, format_results, main
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES
+
+@pytest.mark.asyncio
+async def test_benchmark_reports_each_profile(tmp_path, make_clip):
+    pytest.importorskip('moviepy')
+    clip_path = make_clip(tmp_path / 'clip.mp4', size = '320x180')
+    profiles = {name: ENCODER_PROFILES[name] for name in ('preview', 'standard')}
+    results = await benchmark_profiles([clip_path], str(tmp_path), profiles, target_resolution = (180, 320))
+    assert [result['profile'] for result in results] == ['preview', 'standard']
+    # one second at the 30 fps of the clip
+    assert all(result['frames'] == 30 and result['size'] > 0 and result['encode_fps'] > 0 for result in results)
+    lines = format_results(results).splitlines()
+    assert len(lines) == 3 and lines[1].startswith('preview')
+
+def test_main_creates_the_output_dir(tmp_path, capsys, make_clip):
+    pytest.importorskip('moviepy')
+    clip_path = make_clip(tmp_path / 'clip.mp4', size = '320x180')
+    output_dir = tmp_path / 'videos' / 'benchmark'
+    main([clip_path, '--profiles', 'preview', '--output-dir', str(output_dir)])
+    assert (output_dir / 'preview.mp4').stat().st_size > 0
+    assert capsys.readouterr().out.splitlines()[1].startswith('preview')
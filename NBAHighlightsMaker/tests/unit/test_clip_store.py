@@ -0,0 +1,46 @@
+import os
+from NBAHighlightsMaker.downloader.clip_store import ClipStore
+
+def write_clip(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+def test_put_then_link_into_new_workspace(tmp_path):
+    clip_store = ClipStore(str(tmp_path / "clips"))
+    workspace = tmp_path / "vids"
+    workspace.mkdir()
+    file_path = clip_store.put("0022400001", 8, write_clip(str(workspace / "8.mp4"), b"clip 8"))
+    assert open(file_path, 'rb').read() == b"clip 8"
+
+    # a later job with an empty workspace gets the clip without downloading it
+    os.remove(file_path)
+    clip_store = ClipStore(str(tmp_path / "clips"))
+    linked_path = clip_store.link("0022400001", 8, str(workspace / "other_8.mp4"))
+    assert open(linked_path, 'rb').read() == b"clip 8"
+    assert clip_store.link("0022400001", 9, str(workspace / "9.mp4")) is None
+    assert clip_store.link("0022400001", 8, str(workspace / "8_surl.mp4"), rendition = 'surl') is None
+
+def test_same_content_is_stored_once(tmp_path):
+    clip_store = ClipStore(str(tmp_path / "clips"))
+    clip_store.put("0022400001", 8, write_clip(str(tmp_path / "a.mp4"), b"same"))
+    clip_store.put("0022400001", 7, write_clip(str(tmp_path / "b.mp4"), b"same"))
+    objects = [f for _, _, files in os.walk(tmp_path / "clips" / "objects") for f in files]
+    assert len(objects) == 1
+    assert clip_store.get_total_size() == 4
+
+def test_least_recently_used_clips_are_evicted(tmp_path, monkeypatch):
+    clip_store = ClipStore(str(tmp_path / "clips"), max_bytes = 25)
+    clock = [1000.0]
+    monkeypatch.setattr('NBAHighlightsMaker.downloader.clip_store.time.time', lambda: clock[0])
+    for event_num in (1, 2):
+        clip_store.put("g", event_num, write_clip(str(tmp_path / f"{event_num}.mp4"), bytes([event_num]) * 10))
+        clock[0] += 1
+    # use clip 1, so clip 2 is the least recently used
+    assert clip_store.get("g", 1) is not None
+    clock[0] += 1
+    clip_store.put("g", 3, write_clip(str(tmp_path / "3.mp4"), b"\x03" * 10))
+    assert clip_store.get("g", 2) is None
+    assert clip_store.get("g", 1) is not None
+    assert clip_store.get("g", 3) is not None
+    assert clip_store.get_total_size() == 20
@@ -0,0 +1,74 @@
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from NBAHighlightsMaker.downloader.download_sink import DownloadSink, write_at
+from NBAHighlightsMaker.downloader.partial_download import PartialDownload
+
+DATA = os.urandom(300000)
+
+@pytest.fixture
+def writer():
+    writer = ThreadPoolExecutor(max_workers = 1)
+    yield writer
+    writer.shutdown()
+
+def test_write_at_keeps_other_bytes(tmp_path):
+    path = tmp_path / 'clip.mp4.part'
+    path.write_bytes(bytes(10))
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        write_at(fd, b'abc', 4)
+    finally:
+        os.close(fd)
+    assert path.read_bytes() == bytes(4) + b'abc' + bytes(3)
+
+@pytest.mark.asyncio
+async def test_sink_coalesces_chunks_into_buffers(tmp_path, writer):
+    path = tmp_path / 'clip.mp4.part'
+    sink = DownloadSink(str(path), writer, buffer_size = 100000)
+    writes = []
+    flush = sink.flush
+
+    async def counting_flush():
+        if sink.buffer:
+            writes.append(len(sink.buffer))
+        await flush()
+
+    sink.flush = counting_flush
+    for start in range(0, len(DATA), 1000):
+        await sink.write(DATA[start:start + 1000])
+    await sink.close()
+    assert path.read_bytes() == DATA
+    assert writes == [100000, 100000, 100000]
+    assert sink.num_bytes == len(DATA)
+    assert sink.get_throughput() > 0
+
+@pytest.mark.asyncio
+async def test_sink_writes_at_offset(tmp_path, writer):
+    path = tmp_path / 'clip.mp4.part'
+    path.write_bytes(DATA[:1000])
+    sink = DownloadSink(str(path), writer, offset = 1000)
+    await sink.write(DATA[1000:])
+    await sink.close()
+    assert path.read_bytes() == DATA
+
+@pytest.mark.asyncio
+async def test_preallocated_sink_is_cut_back_when_incomplete(tmp_path, writer):
+    path = tmp_path / 'clip.mp4.part'
+    sink = DownloadSink(str(path), writer, length = len(DATA), truncate = True)
+    if not sink.preallocated:
+        pytest.skip("Preallocation isn't supported here.")
+    assert os.path.getsize(path) == len(DATA)
+    await sink.write(DATA[:5000])
+    await sink.close()
+    # the size tells how much was downloaded again, so the download can be resumed
+    assert path.read_bytes() == DATA[:5000]
+
+def test_crashed_preallocated_download_is_not_resumed(tmp_path):
+    partial = PartialDownload(str(tmp_path / 'clip.mp4'))
+    partial.start('https://videos.nba.com/1.mp4', {'Content-Length': str(len(DATA)), 'ETag': '"v1"'}, 0)
+    with open(partial.part_path, 'wb') as f:
+        f.write(DATA[:5000] + bytes(len(DATA) - 5000))
+    partial.set_preallocated(True)
+    assert partial.get_offset('https://videos.nba.com/1.mp4') == 0
+    assert not os.path.exists(partial.part_path)
@@ -0,0 +1,26 @@
+from fractions import Fraction
+from NBAHighlightsMaker.editor.encoder_profiles import EncoderProfile, ENCODER_PROFILES, DEFAULT_PROFILE, match_source_fps
+
+def test_crf_profile_args():
+    profile = EncoderProfile("Archive", 'slow', crf = 18, tune = 'film', threads = 4)
+    assert profile.get_ffmpeg_args() == ['-c:v', 'libx264', '-preset', 'slow', '-crf', '18', '-tune', 'film', '-threads', '4']
+    assert profile.get_ffmpeg_args(threads = 1)[-2:] == ['-threads', '1']
+    assert profile.get_moviepy_args() == {'codec': 'libx264', 'preset': 'slow', 'threads': 4,
+                                          'ffmpeg_params': ['-crf', '18', '-tune', 'film']}
+
+def test_bitrate_profile_caps_the_bitrate():
+    profile = EncoderProfile("Social", 'medium', crf = 23, bitrate = '6M')
+    assert profile.get_rate_args() == ['-b:v', '6M', '-maxrate', '6M', '-bufsize', '6M']
+    assert '-threads' not in profile.get_ffmpeg_args()
+
+def test_profiles():
+    assert {'preview', 'archive', 'social'} <= set(ENCODER_PROFILES)
+    assert DEFAULT_PROFILE in ENCODER_PROFILES
+
+def test_match_source_fps():
+    assert match_source_fps([30.0, 25.0, None]) == 30
+    assert match_source_fps([29.97]) == Fraction(30000, 1001)
+    assert match_source_fps([59.94, 29.97]) == Fraction(60000, 1001)
+    assert match_source_fps([12.5]) == Fraction(25, 2)
+    assert match_source_fps([None]) == 60
+    assert match_source_fps([], default = 30) == 30
@@ -0,0 +1,100 @@
+import itertools
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.players.event_filter import EventFilter, EventSelection, EVENT_COLUMNS
+
+PLAYER_ID = 201142
+OTHER_ID = 1630183
+
+ACTIONS = ['2pt', '3pt', 'assists', 'rebound', 'block', 'steal', 'turnover', 'foul', 'freethrow', 'jumpball']
+OPTIONS = ['Field Goals Made', 'Field Goals Missed', 'Fouls Committed', 'Fouls Drawn',
+           'Free Throws Made', 'Free Throws Missed']
+
+@pytest.fixture
+def actions():
+    """Makes play-by-play actions covering each rule for two players.
+    """
+    rows = [
+        # actionType, subType, personId, shotResult, assistPersonId, foulDrawnPersonId
+        ('2pt', 'Layup', PLAYER_ID, 'Made', None, None),
+        ('2pt', 'Layup', PLAYER_ID, 'Missed', None, None),
+        ('3pt', 'Jump Shot', PLAYER_ID, 'Made', OTHER_ID, None),
+        ('3pt', 'Jump Shot', OTHER_ID, 'Made', PLAYER_ID, None),
+        ('3pt', 'Jump Shot', OTHER_ID, 'Missed', None, None),
+        ('rebound', 'defensive', PLAYER_ID, None, None, None),
+        ('block', '', PLAYER_ID, None, None, None),
+        ('steal', '', OTHER_ID, None, None, None),
+        ('turnover', 'offensive foul', PLAYER_ID, None, None, None),
+        ('turnover', 'bad pass', PLAYER_ID, None, None, None),
+        ('foul', 'offensive', PLAYER_ID, None, None, OTHER_ID),
+        ('foul', 'personal', OTHER_ID, None, None, PLAYER_ID),
+        ('freethrow', '1 of 2', PLAYER_ID, 'Made', None, None),
+        ('freethrow', '2 of 2', PLAYER_ID, 'Missed', None, None),
+        ('jumpball', 'recovered', PLAYER_ID, None, None, None),
+        ('period', 'start', 0, None, None, None),
+    ]
+    df = pd.DataFrame(rows, columns = ['actionType', 'subType', 'personId', 'shotResult',
+                                       'assistPersonId', 'foulDrawnPersonId'])
+    df.insert(0, 'actionNumber', range(1, len(df) + 1))
+    df['description'] = [f"event {n}" for n in df['actionNumber']]
+    df.insert(1, 'period', 1)
+    df.insert(2, 'clock', [f"PT{11 - n // 2:02d}M{30 * (n % 2):02d}.00S" for n in range(len(df))])
+    df['blockPersonId'] = None
+    return df
+
+def reference_filter(df, player_id, wanted_actions, wanted_action_options):
+    """The filtering chain used before the EventFilter, kept to check the results match.
+    """
+    filtered_df = df.loc[
+        ((df['actionType'].isin(wanted_actions)) & (df['personId'] == player_id))
+        | ((df['assistPersonId'] == player_id) & ('assists' in (wanted_actions)))
+        | ((df['foulDrawnPersonId'] == player_id) & ('foul' in (wanted_actions))),
+        EVENT_COLUMNS
+    ]
+    def filtering_helper(action_1, action_2, wanted_action_set, df, specified_action_vals,
+                         secondary_col, secondary_col_val):
+        if action_1 in wanted_action_set and action_2 not in wanted_action_set:
+            df = df[~((df['actionType'].isin(specified_action_vals)) & (df[secondary_col] == secondary_col_val))]
+        elif action_2 in wanted_action_set and action_1 not in wanted_action_set:
+            df = df[~((df['actionType'].isin(specified_action_vals)) & (df[secondary_col] != secondary_col_val))]
+        return df
+    filtered_df = filtering_helper('Field Goals Made', 'Field Goals Missed', wanted_action_options, filtered_df,
+                                   {'2pt', '3pt'}, 'shotResult', 'Missed')
+    filtered_df = filtering_helper('Fouls Drawn', 'Fouls Committed', wanted_action_options, filtered_df,
+                                   {'foul'}, 'personId', player_id)
+    filtered_df = filtering_helper('Free Throws Made', 'Free Throws Missed', wanted_action_options, filtered_df,
+                                   {'freethrow'}, 'shotResult', 'Missed')
+    if 'foul' in wanted_actions and 'turnover' in wanted_actions:
+        filtered_df = filtered_df[
+            ~((filtered_df['actionType'] == 'turnover') & (filtered_df['subType'] == 'offensive foul'))
+        ]
+    return filtered_df
+
+def option_combinations():
+    """Every combination of the options, with and without fouls/turnovers/assists wanted.
+    """
+    for n in range(len(OPTIONS) + 1):
+        for options in itertools.combinations(OPTIONS, n):
+            yield set(ACTIONS), set(options)
+            yield {'2pt', '3pt', 'foul', 'freethrow'}, set(options)
+
+def test_matches_reference(actions):
+    combinations = list(option_combinations())
+    for player_id in (PLAYER_ID, OTHER_ID):
+        selections = [EventSelection(player_id, wanted, options) for wanted, options in combinations]
+        results = EventFilter(selections).filter(actions)
+        for (wanted, options), result in zip(combinations, results):
+            expected = reference_filter(actions, player_id, wanted, options)
+            assert result['actionNumber'].tolist() == expected['actionNumber'].tolist(), \
+                f"Mismatch for player {player_id}, actions {wanted}, options {options}."
+
+def test_keeps_index_and_columns(actions):
+    event_filter = EventFilter([EventSelection(PLAYER_ID, {'3pt'}, {'Field Goals Made'})])
+    result = event_filter.filter(actions)[0]
+
+    assert list(result.columns) == EVENT_COLUMNS
+    # index should point at the original rows, like DataFrame.loc does
+    assert result.index.tolist() == [2]
+
+def test_no_selections(actions):
+    assert EventFilter([]).filter(actions) == []
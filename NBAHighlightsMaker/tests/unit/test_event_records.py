@@ -0,0 +1,47 @@
+import asyncio
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.common.event_records import EventRecords, ProgressTracker
+from NBAHighlightsMaker.players.getplayers import DataRetriever
+
+def test_records_are_written_by_position():
+    event_ids = pd.DataFrame({'actionNumber': [12, 4, 30]}, index = [7, 3, 9])
+    records = EventRecords(len(event_ids), ['VIDEO_LINK', 'FILE_PATH'])
+    records.set(2, 'VIDEO_LINK', 'c')
+    records.set(0, 'VIDEO_LINK', 'a')
+    assert records.count('VIDEO_LINK') == 2
+    event_ids = records.to_frame(event_ids)
+    assert event_ids['VIDEO_LINK'].tolist() == ['a', '', 'c']
+    assert event_ids['FILE_PATH'].tolist() == ['', '', '']
+
+def test_progress_only_reports_with_description():
+    reported = []
+    progress = ProgressTracker(4, lambda value, description: reported.append((value, description)))
+    progress.advance()
+    progress.advance("second")
+    assert reported == [(50, "second")]
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs_keep_their_own_progress(tmp_path, monkeypatch):
+    data_retriever = DataRetriever(None, str(tmp_path))
+
+    async def fetch_download_link(session, game_id, row, proxy = False):
+        await asyncio.sleep(0.001 * row.actionNumber)
+        return f"https://videos.nba.com/{game_id}/{row.actionNumber}.mp4", 'lurl'
+    monkeypatch.setattr(data_retriever, 'fetch_download_link', fetch_download_link)
+
+    progress = {'a': [], 'b': []}
+    jobs = []
+    for game_id, count in (('a', 3), ('b', 5)):
+        event_ids = pd.DataFrame({'actionNumber': range(count, 0, -1), 'actionType': '2pt',
+                                  'subType': '', 'description': 'shot'})
+        update = lambda value, description, game_id = game_id: progress[game_id].append(value)
+        jobs.append(data_retriever.get_download_links_async(game_id, event_ids, update))
+    results = await asyncio.gather(*jobs)
+    await data_retriever.http_client.close()
+
+    assert results[0]['VIDEO_LINK'].tolist() == [f"https://videos.nba.com/a/{n}.mp4" for n in (3, 2, 1)]
+    assert results[1]['VIDEO_LINK'].tolist() == [f"https://videos.nba.com/b/{n}.mp4" for n in (5, 4, 3, 2, 1)]
+    assert results[1]['RENDITION'].tolist() == ['lurl'] * 5
+    assert progress['a'] == [33, 66, 100]
+    assert progress['b'] == [20, 40, 60, 80, 100]
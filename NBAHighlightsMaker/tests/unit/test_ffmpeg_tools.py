@@ -0,0 +1,95 @@
+import os
+import pytest
+from NBAHighlightsMaker.common.job_settings import JobSettings
+from NBAHighlightsMaker.editor.ffmpeg_tools import (ClipInfo, FfmpegError, split_fields, can_concat_copy,
+                                                    write_concat_list, probe_clip, parse_progress_line)
+
+@pytest.fixture(scope = 'module')
+def clips(tmp_path_factory, make_clip):
+    pytest.importorskip('moviepy')
+    tmp_path = tmp_path_factory.mktemp('clips')
+    return [make_clip(tmp_path / f"{n}.mp4") for n in range(3)]
+
+def test_split_fields_ignores_commas_in_parentheses():
+    assert split_fields("yuv420p(tv, bt709), 1280x720, 30 fps") == ["yuv420p(tv, bt709)", "1280x720", "30 fps"]
+
+def test_clip_info_parses_streams(ffmpeg_output):
+    info = ClipInfo('8.mp4', ffmpeg_output)
+    assert info.duration == pytest.approx(7.51)
+    assert (info.video_codec, info.video_profile, info.pix_fmt) == ('h264', 'High', 'yuv420p')
+    assert (info.width, info.height, info.fps) == (1280, 720, 29.97)
+    assert (info.audio_codec, info.sample_rate, info.channels) == ('aac', 48000, 'stereo')
+
+def test_clip_info_without_video():
+    with pytest.raises(FfmpegError):
+        ClipInfo('8.mp4', "Input #0, mov,mp4\n  Duration: 00:00:07.51\n")
+
+def test_can_concat_copy_needs_matching_streams_and_size(ffmpeg_output):
+    info = ClipInfo('8.mp4', ffmpeg_output)
+    other = ClipInfo('9.mp4', ffmpeg_output.replace('29.97 fps', '59.94 fps'))
+    assert can_concat_copy([info, ClipInfo('9.mp4', ffmpeg_output)], 1280, 720)
+    assert not can_concat_copy([info, other], 1280, 720)
+    assert not can_concat_copy([info], 1920, 1080)
+    assert not can_concat_copy([], 1280, 720)
+
+def test_parse_progress_line():
+    assert parse_progress_line("out_time_us=1500000\n") == 1.5
+    assert parse_progress_line("out_time_us=N/A") is None
+    assert parse_progress_line("progress=continue") is None
+
+def test_write_concat_list_escapes_quotes(tmp_path):
+    list_path = tmp_path / 'clips.txt'
+    write_concat_list([str(tmp_path / "it's.mp4")], str(list_path))
+    assert list_path.read_text() == f"file '{tmp_path}/it'\\''s.mp4'\n"
+
+def test_probe_clip(clips):
+    info = probe_clip(clips[0])
+    assert (info.width, info.height, info.fps, info.audio_codec) == (1280, 720, 30.0, 'aac')
+
+def test_probe_clip_not_a_video(tmp_path):
+    pytest.importorskip('moviepy')
+    path = tmp_path / 'page.mp4'
+    path.write_text("<html></html>")
+    with pytest.raises(FfmpegError):
+        probe_clip(str(path))
+
+@pytest.mark.asyncio
+async def test_make_final_vid_joins_without_encoding(clips, tmp_path):
+    pytest.importorskip('PySide6')
+    from NBAHighlightsMaker.editor.editor import VideoMaker
+    progress = []
+    video_maker = VideoMaker(lambda value, description: progress.append(description), str(tmp_path))
+    output_path = str(tmp_path / 'final.mp4')
+    await video_maker.make_final_vid(clips, output_path, JobSettings(fades = False))
+    assert progress == ["Joining clips...", "Joined clips"]
+    assert probe_clip(output_path).duration == pytest.approx(3, abs = 0.1)
+
+@pytest.mark.asyncio
+async def test_make_final_vid_with_fades_does_not_join(clips, tmp_path, make_clip):
+    pytest.importorskip('PySide6')
+    from NBAHighlightsMaker.editor.editor import VideoMaker
+    video_maker = VideoMaker(lambda value, description: None, str(tmp_path))
+    assert not await video_maker.try_concat_copy(clips, str(tmp_path / 'final.mp4'), JobSettings())
+    small_clip = make_clip(tmp_path / 'small.mp4', size = '640x360')
+    assert not await video_maker.try_concat_copy([clips[0], small_clip], str(tmp_path / 'final.mp4'), JobSettings(fades = False))
+    assert not os.path.exists(tmp_path / 'final.mp4')
+
+def test_can_concat_copy_without_audio_ignores_audio(ffmpeg_output):
+    info = ClipInfo('8.mp4', ffmpeg_output)
+    other = ClipInfo('9.mp4', ffmpeg_output.replace('48000 Hz', '44100 Hz'))
+    assert not can_concat_copy([info, other], 1280, 720)
+    assert can_concat_copy([info, other], 1280, 720, audio = False)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('audio, audio_codec', [(True, 'aac'), (False, None)])
+async def test_make_final_vid_encodes_audio_in_its_own_directory(clips, tmp_path, monkeypatch, audio, audio_codec):
+    pytest.importorskip('PySide6')
+    from NBAHighlightsMaker.editor.editor import VideoMaker
+    monkeypatch.chdir(tmp_path)
+    video_maker = VideoMaker(lambda value, description: None, str(tmp_path))
+    video_maker.target_resolution = (180, 320)
+    output_path = str(tmp_path / 'final.mp4')
+    await video_maker.make_final_vid(clips[:2], output_path, JobSettings(encoder_profile = 'preview', audio = audio))
+    assert probe_clip(output_path).audio_codec == audio_codec
+    # no temporary audio file is left, in the working directory or next to the video
+    assert os.listdir(tmp_path) == ['final.mp4']
@@ -0,0 +1,86 @@
+import os
+import pytest
+from NBAHighlightsMaker.editor.filtergraph_render import FilterGraphRenderer, build_filter_graph
+from NBAHighlightsMaker.editor.ffmpeg_tools import ClipInfo, probe_clip
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES
+
+@pytest.fixture(scope = 'module')
+def clips(tmp_path_factory, make_clip):
+    pytest.importorskip('moviepy')
+    tmp_path = tmp_path_factory.mktemp('clips')
+    return [make_clip(tmp_path / "0.mp4", size = '640x360', duration = 3),
+            make_clip(tmp_path / "1.mp4", size = '320x180', rate = 25, duration = 2, audio = False)]
+
+@pytest.fixture
+def infos(ffmpeg_output):
+    # 7.51 and 5 seconds, the second clip without audio
+    return [ClipInfo('8.mp4', ffmpeg_output),
+            ClipInfo('9.mp4', ffmpeg_output.replace('00:00:07.51', '00:00:05.00').split('  Stream #0:1')[0])]
+
+def test_build_filter_graph_fades_each_clip(infos):
+    graph, duration = build_filter_graph(infos, 1280, 720, 60, 'fade')
+    assert duration == pytest.approx(12.51)
+    assert '[0:v:0]scale=1280:720,setsar=1,fps=60,format=yuv420p,fade=t=in:st=0:d=1,fade=t=out:st=6.510:d=1[v0]' in graph
+    assert 'anullsrc=r=44100:cl=stereo,apad,atrim=end=5.000[a1]' in graph
+    assert graph.endswith('[v0][a0][v1][a1]concat=n=2:v=1:a=1[v][a]')
+
+def test_build_filter_graph_crossfades_clips(infos):
+    graph, duration = build_filter_graph(infos, 1280, 720, 60, 'crossfade')
+    assert duration == pytest.approx(11.51)
+    assert '[v0][v1]xfade=transition=fade:duration=1.000:offset=6.510[vx1]' in graph
+    assert '[a0][a1]acrossfade=d=1.000[ax1]' in graph
+    # only the start and the end of the video fade through black
+    assert graph.count('fade=t=') == 2
+
+def test_build_filter_graph_without_transitions(infos):
+    graph, duration = build_filter_graph(infos, 1280, 720, 60)
+    assert duration == pytest.approx(12.51)
+    assert 'fade' not in graph
+
+def test_build_filter_graph_without_audio(infos):
+    graph, duration = build_filter_graph(infos, 1280, 720, 60, 'crossfade', audio = False)
+    assert duration == pytest.approx(11.51)
+    assert 'anullsrc' not in graph and 'acrossfade' not in graph and '[a' not in graph
+    graph, duration = build_filter_graph(infos, 1280, 720, 60, 'fade', audio = False)
+    assert graph.endswith('[v0][v1]concat=n=2:v=1:a=0[v]')
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('transition, duration', [('fade', 5), ('crossfade', 4), (None, 5)])
+async def test_render_scales_and_joins_clips(clips, tmp_path, transition, duration):
+    progress = []
+    output_path = str(tmp_path / 'final.mp4')
+    renderer = FilterGraphRenderer(target_resolution = (180, 320), fps = 15)
+    await renderer.render(clips, output_path, transition, lambda seconds, total: progress.append((seconds, total)),
+                          profile = ENCODER_PROFILES['preview'])
+    info = probe_clip(output_path)
+    assert (info.width, info.height, info.fps, info.pix_fmt, info.audio_codec) == (320, 180, 15.0, 'yuv420p', 'aac')
+    assert info.duration == pytest.approx(duration, abs = 0.1)
+    assert progress[-1] == (pytest.approx(duration, abs = 0.1), pytest.approx(duration))
+
+@pytest.mark.asyncio
+async def test_failed_render_removes_the_video(clips, tmp_path):
+    output_path = tmp_path / 'final.mp4'
+    output_path.write_bytes(b'')
+    renderer = FilterGraphRenderer(target_resolution = (181, 320))
+    # libx264 can't encode an odd height in yuv420p
+    with pytest.raises(Exception):
+        await renderer.render(clips, str(output_path), 'fade', lambda seconds, total: None, profile = ENCODER_PROFILES['preview'])
+    assert not os.path.exists(output_path)
+
+@pytest.mark.asyncio
+async def test_render_matches_the_frame_rate_of_the_clips(clips, tmp_path):
+    output_path = str(tmp_path / 'final.mp4')
+    renderer = FilterGraphRenderer(target_resolution = (180, 320))
+    await renderer.render(clips, output_path, None, lambda seconds, total: None, profile = ENCODER_PROFILES['preview'])
+    # the clips are 30 and 25 fps
+    assert probe_clip(output_path).fps == 30.0
+
+@pytest.mark.asyncio
+async def test_render_without_audio(clips, tmp_path):
+    output_path = str(tmp_path / 'final.mp4')
+    renderer = FilterGraphRenderer(target_resolution = (180, 320))
+    await renderer.render(clips, output_path, 'fade', lambda seconds, total: None, audio = False,
+                          profile = ENCODER_PROFILES['preview'])
+    info = probe_clip(output_path)
+    assert info.audio_codec is None
+    assert info.duration == pytest.approx(5, abs = 0.1)
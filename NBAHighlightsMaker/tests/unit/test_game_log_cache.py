@@ -0,0 +1,72 @@
+import datetime
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.players.game_log_cache import GameLogCache
+from NBAHighlightsMaker.players.getplayers import DataRetriever, GAME_LOG_COLUMNS
+
+def make_game_log(games):
+    """Makes a game log from (game ID, game date, video available) tuples, most recent first.
+    """
+    rows = []
+    for game_id, game_date, video_available in games:
+        row = {column: 0 for column in GAME_LOG_COLUMNS}
+        row.update({'Game_ID': game_id, 'GAME_DATE': game_date, 'MATCHUP': 'PHX vs. LAL', 'WL': 'W',
+                    'VIDEO_AVAILABLE': video_available})
+        rows.append(row)
+    return pd.DataFrame(rows, columns = GAME_LOG_COLUMNS + ['VIDEO_AVAILABLE'])
+
+@pytest.fixture
+def data_retriever(tmp_path, monkeypatch):
+    """DataRetriever whose fetch_game_log records its calls and returns the games in its "server" list.
+    """
+    data_retriever = DataRetriever(None, str(tmp_path))
+    data_retriever.server_games = []
+    data_retriever.fetches = []
+
+    def fetch_game_log(player_id, season, season_type, date_from = None):
+        data_retriever.fetches.append(date_from)
+        games = data_retriever.server_games
+        if date_from:
+            games = [g for g in games if datetime.datetime.strptime(g[1], '%b %d, %Y').date() >= date_from]
+        return make_game_log(games)
+
+    monkeypatch.setattr(data_retriever, 'fetch_game_log', fetch_game_log)
+    return data_retriever
+
+def test_is_season_completed():
+    assert GameLogCache.is_season_completed("2023-24", today = datetime.date(2024, 7, 1))
+    assert not GameLogCache.is_season_completed("2023-24", today = datetime.date(2024, 6, 20))
+    assert not GameLogCache.is_season_completed("2024-25", today = datetime.date(2024, 12, 25))
+
+def test_completed_season_is_fetched_once(data_retriever):
+    data_retriever.server_games = [("0022300002", "APR 14, 2024", 1), ("0022300001", "APR 12, 2024", 1)]
+
+    first = data_retriever.get_game_log(201142, "2023-24", "Regular Season")
+    second = data_retriever.get_game_log(201142, "2023-24", "Regular Season")
+
+    assert data_retriever.fetches == [None], "A completed season should only be fetched once."
+    assert second.equals(first)
+    # game IDs keep their leading zeros when read back from the cache
+    assert second['Game_ID'].tolist() == ["0022300002", "0022300001"]
+
+def test_current_season_is_refreshed_incrementally(data_retriever):
+    cache = data_retriever.game_log_cache
+    season = "2099-00"
+    data_retriever.server_games = [("0029900002", "NOV 03, 2099", 0), ("0029900001", "NOV 01, 2099", 1)]
+
+    game_log = data_retriever.get_game_log(201142, season, "Regular Season")
+    assert game_log['Game_ID'].tolist() == ["0029900001"], "Games without video shouldn't be shown."
+
+    # within the refresh interval the cache is used as is
+    data_retriever.get_game_log(201142, season, "Regular Season")
+    assert data_retriever.fetches == [None]
+
+    # after the interval, only games since the last cached game are fetched
+    cache.refresh_interval = 0
+    data_retriever.server_games = [("0029900003", "NOV 05, 2099", 1), ("0029900002", "NOV 03, 2099", 1),
+                                   ("0029900001", "NOV 01, 2099", 1)]
+    game_log = data_retriever.get_game_log(201142, season, "Regular Season")
+
+    assert data_retriever.fetches == [None, datetime.date(2099, 11, 3)]
+    # the game whose video became available is updated, and the new game is added
+    assert game_log['Game_ID'].tolist() == ["0029900003", "0029900002", "0029900001"]
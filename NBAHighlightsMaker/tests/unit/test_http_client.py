@@ -0,0 +1,27 @@
+import pytest
+from NBAHighlightsMaker.common.http_client import HttpClient
+from NBAHighlightsMaker.common.rate_limiter import RateLimiterRegistry
+from NBAHighlightsMaker.players.getplayers import DataRetriever
+from NBAHighlightsMaker.downloader.downloader import Downloader
+
+@pytest.mark.asyncio
+async def test_session_is_reused_until_closed():
+    http_client = HttpClient(limit_per_host = 5)
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+    assert session.connector.limit_per_host == 5
+    await http_client.close()
+    assert session.closed
+    new_session = http_client.get_session()
+    assert new_session is not session
+    await http_client.close()
+
+def test_classes_share_client_and_limiters(tmp_path):
+    rate_limiters = RateLimiterRegistry()
+    http_client = HttpClient(rate_limiters)
+    data_retriever = DataRetriever(None, str(tmp_path), http_client)
+    downloader = Downloader(None, str(tmp_path), http_client)
+    assert data_retriever.http_client is downloader.http_client
+    assert data_retriever.rate_limiters is rate_limiters
+    assert downloader.rate_limiters is rate_limiters
+    assert data_retriever.headers['Accept-Encoding'] == http_client.accept_encoding
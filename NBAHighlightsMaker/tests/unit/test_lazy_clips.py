@@ -0,0 +1,53 @@
+import pytest
+from NBAHighlightsMaker.editor.ffmpeg_tools import probe_clip
+
+moviepy = pytest.importorskip('moviepy')
+from NBAHighlightsMaker.editor.lazy_clips import ReaderPool, LazyVideoFileClip, get_size
+
+class FakeReader:
+    def __init__(self, name, closed):
+        self.name = name
+        self.closed = closed
+
+    def get_frame(self, t):
+        return (self.name, t)
+
+    def close(self):
+        self.closed.append(self.name)
+
+def test_reader_pool_closes_least_recently_used():
+    closed = []
+    pool = ReaderPool(max_open = 2)
+    for name in ['a', 'b', 'a', 'c']:
+        assert pool.get_frame(name, lambda name = name: FakeReader(name, closed), 1.0) == (name, 1.0)
+    # "a" was used after "b", so "b" was closed to open "c"
+    assert closed == ['b']
+    assert list(pool.readers) == ['a', 'c'] and pool.peak_open == 2
+    pool.close('a')
+    pool.close_all()
+    assert sorted(closed) == ['a', 'b', 'c'] and not pool.readers
+
+def test_get_size():
+    assert get_size([1280, 720], None) == (1280, 720)
+    assert get_size([640, 360], (720, 1280)) == (1280, 720)
+    assert get_size([640, 360], (720, None)) == (1280, 720)
+
+def test_lazy_clips_open_a_few_readers_at_a_time(tmp_path, make_clip):
+    from moviepy.editor import concatenate_videoclips
+    clip_paths = [make_clip(tmp_path / f"{n}.mp4", size = '320x180', audio = n != 2) for n in range(5)]
+    pool = ReaderPool(max_open = 2)
+    clips = [LazyVideoFileClip(clip_path, pool, target_resolution = (90, 160)) for clip_path in clip_paths]
+    assert not pool.readers
+    assert (clips[0].size, clips[0].fps, clips[0].duration) == ((160, 90), 30.0, 1.0)
+    assert clips[2].audio is None
+    output_path = str(tmp_path / 'final.mp4')
+    final_vid = concatenate_videoclips(clips, method = "chain")
+    final_vid.write_videofile(output_path, fps = 15, preset = 'ultrafast', logger = None,
+                              temp_audiofile = str(tmp_path / 'audio.mp3'))
+    assert pool.peak_open == 2
+    for clip in clips:
+        clip.close()
+    assert not pool.readers
+    info = probe_clip(output_path)
+    assert (info.width, info.height) == (160, 90)
+    assert info.duration == pytest.approx(5, abs = 0.1)
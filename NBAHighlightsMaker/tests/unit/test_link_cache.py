@@ -0,0 +1,101 @@
+import time
+import pytest
+from NBAHighlightsMaker.players import link_cache
+from NBAHighlightsMaker.players.link_cache import LinkCache
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Path of the cache file inside a temporary directory that doesn't exist yet.
+    """
+    return str(tmp_path / 'cache' / 'video_links.json')
+
+def test_get_and_put(cache_path):
+    cache = LinkCache(cache_path)
+
+    assert cache.get("0022400832", 8) is None, "An empty cache should miss."
+
+    cache.put("0022400832", 8, "https://videos.nba.com/8.mp4")
+    assert cache.get("0022400832", 8) == "https://videos.nba.com/8.mp4"
+
+    # other games with the same event number should still miss
+    assert cache.get("0022400833", 8) is None
+
+def test_save_and_reload(cache_path):
+    cache = LinkCache(cache_path)
+    cache.put("0022400832", 8, "https://videos.nba.com/8.mp4")
+    cache.save()
+
+    # a new instance should read the entries back from disk
+    new_cache = LinkCache(cache_path)
+    assert new_cache.get("0022400832", 8) == "https://videos.nba.com/8.mp4"
+    assert len(new_cache) == 1
+
+def test_expired_entries_miss(cache_path, monkeypatch):
+    cache = LinkCache(cache_path, ttl = 60)
+    cache.put("0022400832", 8, "https://videos.nba.com/8.mp4")
+
+    # move the clock past the ttl
+    now = time.time()
+    monkeypatch.setattr(link_cache.time, 'time', lambda: now + 61)
+
+    assert cache.get("0022400832", 8) is None, "Expired entries should miss."
+    assert len(cache) == 0, "Expired entries should be removed."
+
+def test_evicts_least_recently_used(cache_path, monkeypatch):
+    cache = LinkCache(cache_path, max_entries = 2)
+    clock = [1000.0]
+    monkeypatch.setattr(link_cache.time, 'time', lambda: clock[0])
+
+    cache.put("0022400832", 1, "link1")
+    clock[0] += 1
+    cache.put("0022400832", 2, "link2")
+    clock[0] += 1
+    # use event 1 so event 2 becomes the least recently used
+    cache.get("0022400832", 1)
+    clock[0] += 1
+    cache.put("0022400832", 3, "link3")
+
+    assert len(cache) == 2
+    assert cache.get("0022400832", 2) is None, "The least recently used entry should be evicted."
+    assert cache.get("0022400832", 1) == "link1"
+    assert cache.get("0022400832", 3) == "link3"
+
+def test_corrupt_file_starts_empty(cache_path):
+    import os
+    os.makedirs(os.path.dirname(cache_path))
+    with open(cache_path, 'w') as f:
+        f.write("not json")
+
+    cache = LinkCache(cache_path)
+    assert len(cache) == 0
+
+def test_keeps_every_rendition(cache_path):
+    cache = LinkCache(cache_path)
+    links = {'surl': "https://videos.nba.com/8_640x360.mp4", 'lurl': "https://videos.nba.com/8_1280x720.mp4"}
+    cache.put("0022400832", 8, links)
+    assert cache.get_links("0022400832", 8) == links
+    assert cache.get("0022400832", 8, 'surl') == links['surl']
+    assert cache.get("0022400832", 8, 'murl') is None
+
+def test_save_drops_expired_entries_and_keeps_the_order(cache_path, monkeypatch):
+    cache = LinkCache(cache_path, ttl = 60, max_entries = 2)
+    clock = [1000.0]
+    monkeypatch.setattr(link_cache.time, 'time', lambda: clock[0])
+    cache.put("0022400832", 1, "link1")
+    clock[0] += 30
+    cache.put("0022400832", 2, "link2")
+    cache.put("0022400832", 3, "link3")
+    cache.get("0022400832", 2)
+    # event 1 was evicted, and event 2 is now the most recently used
+    assert list(cache.entries) == ["0022400832:3", "0022400832:2"]
+    cache.save()
+
+    new_cache = LinkCache(cache_path, ttl = 60, max_entries = 2)
+    new_cache.load()
+    assert list(new_cache.entries) == ["0022400832:3", "0022400832:2"]
+    # events 2 and 3 expired, 3 is evicted by the new entry and 2 is dropped when saving
+    clock[0] += 65
+    new_cache.put("0022400832", 4, "link4")
+    new_cache.save()
+    assert list(LinkCache(cache_path).get_links("0022400832", 4)) == ['lurl']
+    assert len(LinkCache(cache_path)) == 1
@@ -0,0 +1,94 @@
+import os
+import struct
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from NBAHighlightsMaker.downloader.downloader import Downloader
+from NBAHighlightsMaker.downloader.segmented import SegmentTuner
+from NBAHighlightsMaker.downloader.mp4_check import Mp4Validator, Mp4ValidationError, check_content_type
+
+def make_mp4(payload):
+    """Wraps a payload in the ftyp, moov and mdat boxes of an MP4 file.
+    """
+    ftyp = struct.pack('>I4s4sI', 16, b'ftyp', b'isom', 512)
+    moov = struct.pack('>I4s', 16, b'moov') + bytes(8)
+    return ftyp + moov + struct.pack('>I4s', 8 + len(payload), b'mdat') + payload
+
+DATA = make_mp4(os.urandom(50000))
+
+class FakeUserAgent:
+    random = 'Mozilla/5.0'
+
+class Row:
+    actionNumber = 8
+    description = "3PT Jump Shot"
+
+def feed_in_chunks(data, chunk_size):
+    validator = Mp4Validator()
+    for start in range(0, len(data), chunk_size):
+        validator.feed(data[start:start + chunk_size])
+    return validator
+
+def test_valid_file_in_any_chunk_size():
+    for chunk_size in (1, 5, 4096, len(DATA)):
+        validator = feed_in_chunks(DATA, chunk_size)
+        validator.finish(len(DATA))
+        assert validator.box_types == [b'ftyp', b'moov', b'mdat']
+
+def test_64_bit_box_size():
+    data = struct.pack('>I4s4sI', 16, b'ftyp', b'isom', 512) + struct.pack('>I4sQ', 1, b'mdat', 16 + 4) + b'abcd'
+    data += struct.pack('>I4s', 8, b'moov')
+    feed_in_chunks(data, 3).finish(len(data))
+
+def test_invalid_files():
+    with pytest.raises(Mp4ValidationError, match = "instead of ftyp"):
+        feed_in_chunks(b'<!DOCTYPE html><html><body>Access Denied</body></html>', 4096)
+    with pytest.raises(Mp4ValidationError, match = "truncated"):
+        feed_in_chunks(DATA[:-10], 4096).finish()
+    with pytest.raises(Mp4ValidationError, match = "no moov"):
+        data = DATA[:16] + DATA[32:]
+        feed_in_chunks(data, 4096).finish(len(data))
+    with pytest.raises(Mp4ValidationError):
+        check_content_type('text/html; charset=utf-8')
+    check_content_type('video/mp4')
+    check_content_type(None)
+
+@pytest_asyncio.fixture
+async def error_page_server():
+    """Answers the first request with an error page sent as 200, and the next ones with the clip.
+    """
+    requests = []
+
+    async def handle(request):
+        requests.append(request.headers.get('Range'))
+        if len(requests) == 1:
+            return web.Response(text = "<html><body>Access Denied</body></html>", content_type = 'text/html')
+        return web.Response(body = DATA, content_type = 'video/mp4')
+
+    app = web.Application()
+    app.router.add_get('/clip.mp4', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/clip.mp4", requests
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_error_page_is_downloaded_again(tmp_path, error_page_server):
+    url, requests = error_page_server
+    downloader = Downloader(FakeUserAgent(), str(tmp_path))
+    downloader.segment_tuner = SegmentTuner(start_segments = 1)
+    downloader.retry_policy.base_delay = 0.01
+    os.makedirs(downloader.data_dir)
+    file_path = os.path.join(downloader.data_dir, "8.mp4")
+    session = downloader.http_client.get_session()
+    try:
+        await downloader.fetch_file(session, Row(), url, file_path)
+    finally:
+        await downloader.http_client.close()
+    with open(file_path, 'rb') as f:
+        assert f.read() == DATA
+    assert len(requests) == 2
+    assert [record.outcome for record in downloader.retry_policy.history] == ['error', 'success']
@@ -0,0 +1,43 @@
+import os
+import asyncio
+import pytest
+from NBAHighlightsMaker.editor.parallel_render import ParallelRenderer
+from NBAHighlightsMaker.editor.ffmpeg_tools import probe_clip
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES
+
+@pytest.fixture(scope = 'module')
+def clips(tmp_path_factory, make_clip):
+    pytest.importorskip('moviepy')
+    tmp_path = tmp_path_factory.mktemp('clips')
+    # a clip without audio gets a silent track, so it can be joined with the others
+    return [make_clip(tmp_path / "0.mp4", size = '320x180'),
+            make_clip(tmp_path / "1.mp4", size = '640x360', rate = 25, duration = 2, audio = False)]
+
+def make_renderer():
+    return ParallelRenderer(workers = 2, target_resolution = (180, 320), fps = 15)
+
+@pytest.mark.asyncio
+async def test_render_joins_encoded_clips(clips, tmp_path):
+    progress = []
+    output_path = str(tmp_path / 'final.mp4')
+    await make_renderer().render(clips, output_path, True, lambda value, description: progress.append((value, description)),
+                                 profile = ENCODER_PROFILES['preview'])
+    info = probe_clip(output_path)
+    assert (info.width, info.height, info.fps, info.audio_codec) == (320, 180, 15.0, 'aac')
+    assert info.duration == pytest.approx(3, abs = 0.2)
+    assert progress[-2] == (100, "Editing - 100% : 2/2 clips")
+    assert progress[-1] == (100, "Joining clips...")
+    # the encoded clips were removed
+    assert os.listdir(tmp_path) == ['final.mp4']
+
+@pytest.mark.asyncio
+async def test_cancelled_render_stops_workers(clips, tmp_path):
+    progress = asyncio.Event()
+    output_path = str(tmp_path / 'final.mp4')
+    task = asyncio.ensure_future(make_renderer().render(clips * 4, output_path, True, lambda value, description: progress.set(),
+                                                        profile = ENCODER_PROFILES['preview']))
+    await asyncio.wait_for(progress.wait(), 60)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, 60)
+    assert os.listdir(tmp_path) == []
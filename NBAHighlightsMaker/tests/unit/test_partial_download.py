@@ -0,0 +1,99 @@
+import os
+import struct
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from NBAHighlightsMaker.downloader.downloader import Downloader
+from NBAHighlightsMaker.downloader.partial_download import PartialDownload, parse_content_range
+from NBAHighlightsMaker.downloader.segmented import SegmentTuner
+
+def make_mp4(payload):
+    """Wraps a payload in the ftyp, moov and mdat boxes of an MP4 file.
+    """
+    ftyp = struct.pack('>I4s4sI', 16, b'ftyp', b'isom', 512)
+    moov = struct.pack('>I4s', 16, b'moov') + bytes(8)
+    return ftyp + moov + struct.pack('>I4s', 8 + len(payload), b'mdat') + payload
+
+DATA = make_mp4(bytes(range(256)) * 4000)
+
+class FakeUserAgent:
+    random = 'Mozilla/5.0'
+
+class Row:
+    actionNumber = 8
+    description = "3PT Jump Shot"
+
+@pytest_asyncio.fixture
+async def flaky_server():
+    """Serves DATA, dropping the connection halfway through the first response.
+    """
+    requests = []
+
+    async def handle(request):
+        requests.append(request.headers.get('Range'))
+        start = 0
+        if request.headers.get('Range') and request.headers.get('If-Range') == '"v1"':
+            start = int(request.headers['Range'][len('bytes='):-1])
+        headers = {'ETag': '"v1"', 'Content-Length': str(len(DATA) - start)}
+        status = 200
+        if start:
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"
+        response = web.StreamResponse(status = status, headers = headers)
+        await response.prepare(request)
+        if len(requests) == 1:
+            await response.write(DATA[:len(DATA) // 2])
+            # let the client read the first half before the connection drops
+            await asyncio.sleep(0.2)
+            request.transport.close()
+            return response
+        await response.write(DATA[start:])
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get('/clip.mp4', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/clip.mp4", requests
+    await runner.cleanup()
+
+def test_parse_content_range():
+    assert parse_content_range("bytes 100-999/1000") == (100, 999, 1000)
+    assert parse_content_range("bytes 0-9/*") == (0, 9, None)
+    assert parse_content_range(None) is None
+
+def test_part_from_another_url_is_discarded(tmp_path):
+    partial = PartialDownload(str(tmp_path / "clip.mp4"))
+    with open(partial.part_path, 'wb') as f:
+        f.write(b'abc')
+    partial.start("https://videos.nba.com/a.mp4", {'ETag': '"x"', 'Content-Length': '10'}, 0)
+    assert partial.get_offset("https://videos.nba.com/a.mp4") == 3
+    assert partial.get_range_headers(3) == {'Range': 'bytes=3-', 'If-Range': '"x"'}
+    assert partial.get_offset("https://videos.nba.com/b.mp4") == 0
+    assert not os.path.exists(partial.part_path)
+    assert not os.path.exists(partial.meta_path)
+
+@pytest.mark.asyncio
+async def test_retry_resumes_from_part_file(tmp_path, flaky_server):
+    url, requests = flaky_server
+    downloader = Downloader(FakeUserAgent(), str(tmp_path))
+    # a single stream, the clip is too small for segments anyway
+    downloader.segment_tuner = SegmentTuner(start_segments = 1)
+    os.makedirs(downloader.data_dir)
+    file_path = os.path.join(downloader.data_dir, "8.mp4")
+    session = downloader.http_client.get_session()
+    try:
+        await downloader.fetch_file(session, Row(), url, file_path)
+    finally:
+        await downloader.http_client.close()
+
+    with open(file_path, 'rb') as f:
+        assert f.read() == DATA
+    # the retry only asked for the second half
+    assert requests == [None, f"bytes={len(DATA) // 2}-"]
+    assert os.listdir(downloader.data_dir) == ["8.mp4"]
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.players.pbp_store import PlayByPlayStore, PBP_COLUMNS
+
+@pytest.fixture
+def actions():
+    """Makes a small play-by-play DataFrame, without a blockPersonId column like a game with no blocks.
+    """
+    return pd.DataFrame({
+        'actionNumber': [1, 2, 7, 8],
+        'period': [1, 1, 1, 4],
+        'clock': ['PT12M00.00S', 'PT11M40.00S', 'PT11M20.00S', 'PT00M00.00S'],
+        'actionType': ['period', 'jumpball', '3pt', 'game'],
+        'subType': ['start', 'recovered', 'Jump Shot', 'end'],
+        'personId': [0, 1630183, 1630183, 0],
+        'description': ['Period Start', 'Jump Ball', "J. McDaniels 24' 3PT", 'Game End'],
+        'shotResult': [None, None, 'Made', None],
+        'assistPersonId': [None, None, 203944, None],
+        'foulDrawnPersonId': [None, None, None, None],
+        'qualifiers': [[], [], ['fastbreak'], []],
+    })
+
+@pytest.mark.parametrize('file_format', ['feather', 'pickle'])
+def test_save_and_load(tmp_path, actions, file_format):
+    if file_format == 'feather':
+        pytest.importorskip('pyarrow')
+    store = PlayByPlayStore(str(tmp_path / 'pbp'))
+    store.file_format = file_format
+
+    assert store.load("0022400832") is None, "Games that were never saved shouldn't load."
+
+    store.save("0022400832", actions, final = True)
+    df = store.load("0022400832")
+
+    assert list(df.columns) == PBP_COLUMNS, "Only the stored columns should be kept, missing ones added."
+    assert df['actionNumber'].tolist() == [1, 2, 7, 8]
+    assert df['description'].tolist() == actions['description'].tolist()
+
+    # only load some columns
+    df = store.load("0022400832", columns = ['actionNumber', 'actionType'])
+    assert list(df.columns) == ['actionNumber', 'actionType']
+
+def test_final_flag(tmp_path, actions):
+    store = PlayByPlayStore(str(tmp_path / 'pbp'))
+
+    store.save("0022400832", actions.iloc[:3], final = False)
+    assert not store.is_final("0022400832"), "Games saved before they ended shouldn't be final."
+
+    assert store.mark_final("0022400832")
+    assert store.is_final("0022400832")
+
+    assert not store.mark_final("0022400999"), "Games that aren't stored can't be marked final."
+
+def test_is_game_over(actions):
+    assert PlayByPlayStore.is_game_over(actions)
+    assert not PlayByPlayStore.is_game_over(actions.iloc[:3])
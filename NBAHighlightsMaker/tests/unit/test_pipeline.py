@@ -0,0 +1,188 @@
+import asyncio
+import random
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.pipeline.pipeline import HighlightsPipeline
+from NBAHighlightsMaker.common.job_settings import JobSettings
+
+class FakeHttpClient:
+    def get_session(self):
+        return None
+
+class FakeLinkCache:
+    def __init__(self):
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+class FakeDataRetriever:
+    """Resolves links after a random delay instead of going to the network.
+    """
+    def __init__(self):
+        self.http_client = FakeHttpClient()
+        self.link_cache = FakeLinkCache()
+        self.link_requests = 0
+
+    async def fetch_download_link(self, session, game_id, row, proxy = False):
+        self.link_requests += 1
+        await asyncio.sleep(random.uniform(0, 0.01))
+        return f"https://videos.nba.com/{game_id}/{row.actionNumber}.mp4", 'surl' if proxy else 'murl'
+
+class FakeDownloader:
+    """Downloads after a random delay, and keeps the downloaded clips in a set instead of a clip store.
+    """
+    def __init__(self, fail_on = None, delay = None):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.started = []
+        self.downloaded = 0
+        self.stored = set()
+        self.renditions = set()
+        self.clip_store = FakeLinkCache()
+
+    def get_file_path(self, row, game_id = None):
+        return f"{game_id}_{row.actionNumber}.mp4"
+
+    def use_stored_clip(self, game_id, row, file_path, proxy = False):
+        return file_path if file_path in self.stored else None
+
+    def store_clip(self, game_id, row, file_path, rendition = 'lurl'):
+        self.stored.add(file_path)
+        self.renditions.add(rendition)
+        return file_path
+
+    async def fetch_file(self, session, row, video_link, file_path):
+        self.started.append(row.actionNumber)
+        await asyncio.sleep(random.uniform(0, 0.01) if self.delay is None else self.delay)
+        if row.actionNumber == self.fail_on:
+            raise Exception(f"Max retries exceeded for {row.actionNumber}")
+        self.downloaded += 1
+        return file_path
+
+class FakeClip:
+    def __init__(self, path):
+        self.path = path
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeVideoMaker:
+    def __init__(self, downloader = None):
+        self.downloader = downloader
+        self.prepared = []
+        self.max_waiting = 0
+        self.written = None
+        self.rendered = None
+        self.settings = None
+
+    def prepare_clip(self, clip_path, settings = None):
+        if self.downloader:
+            # clips downloaded but not prepared yet
+            self.max_waiting = max(self.max_waiting, self.downloader.downloaded - len(self.prepared))
+        clip = FakeClip(clip_path)
+        self.prepared.append(clip)
+        return clip
+
+    async def write_final_vid(self, clips, output_path = None, settings = None):
+        self.written = [clip.path for clip in clips]
+        self.settings = settings
+
+    async def make_final_vid(self, clip_paths, output_path = None, settings = None):
+        self.rendered = clip_paths
+        self.settings = settings
+
+def make_events(n):
+    return pd.DataFrame({'actionNumber': range(1, n + 1), 'description': [f"event {i}" for i in range(1, n + 1)]})
+
+@pytest.mark.asyncio
+async def test_clips_come_out_in_event_order():
+    data_retriever = FakeDataRetriever()
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(data_retriever, FakeDownloader(), video_maker)
+    progress = []
+    await pipeline.run("0022400001", make_events(20), lambda value, description: progress.append(value))
+    assert video_maker.written == [f"0022400001_{i}.mp4" for i in range(1, 21)]
+    assert max(progress) == 100
+    assert data_retriever.link_cache.saves == 1
+
+@pytest.mark.asyncio
+async def test_ffmpeg_render_modes_get_the_clip_files():
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(FakeDataRetriever(), FakeDownloader(), video_maker)
+    progress = []
+    settings = JobSettings(render_mode = 'smart')
+    await pipeline.run("0022400001", make_events(10), lambda value, description: progress.append(value), settings = settings)
+    # no clip is opened for MoviePy, the files go straight to ffmpeg
+    assert video_maker.prepared == []
+    assert video_maker.written is None
+    assert video_maker.rendered == [f"0022400001_{i}.mp4" for i in range(1, 11)]
+    assert video_maker.settings is settings
+    assert max(progress) == 100
+
+@pytest.mark.asyncio
+async def test_jobs_keep_their_own_settings():
+    downloader = FakeDownloader()
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(FakeDataRetriever(), downloader, video_maker)
+    preview = JobSettings(proxy = True, render_mode = 'filtergraph', encoder_profile = 'preview')
+    preview_job = asyncio.ensure_future(pipeline.run("0022400001", make_events(5), lambda value, description: None,
+                                                     settings = preview))
+    await pipeline.run("0022400002", make_events(5), lambda value, description: None)
+    await preview_job
+    # the preview job got the smallest rendition and kept its settings, the other one got the default ones
+    assert downloader.renditions == {'surl', 'murl'}
+    assert video_maker.rendered == [f"0022400001_{i}.mp4" for i in range(1, 6)]
+    assert video_maker.written == [f"0022400002_{i}.mp4" for i in range(1, 6)]
+
+@pytest.mark.asyncio
+async def test_downloads_follow_the_game_timeline():
+    # the clips are shown in action order, but the later actions happened earlier in the period
+    events = make_events(6)
+    events['period'] = 1
+    events['clock'] = [f"PT0{i}M00.00S" for i in range(1, 7)]
+    downloader = FakeDownloader(delay = 0.05)
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(FakeDataRetriever(), downloader, video_maker, download_workers = 1, queue_size = 8)
+    await pipeline.run("0022400001", events, lambda value, description: None)
+    # every link is resolved while the first clip downloads, the rest start earliest first
+    assert downloader.started[1:] == sorted(downloader.started[1:], reverse = True)
+    assert video_maker.written == [f"0022400001_{i}.mp4" for i in range(1, 7)]
+
+@pytest.mark.asyncio
+async def test_repeat_job_uses_stored_clips():
+    data_retriever = FakeDataRetriever()
+    downloader = FakeDownloader()
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(data_retriever, downloader, video_maker)
+    await pipeline.run("0022400001", make_events(5), lambda value, description: None)
+    await pipeline.run("0022400001", make_events(8), lambda value, description: None)
+    # only the 3 new events needed a link and a download
+    assert data_retriever.link_requests == 8
+    assert downloader.downloaded == 8
+    # the rendition picked with the link is the one the clip is stored under
+    assert downloader.renditions == {'murl'}
+    assert video_maker.written == [f"0022400001_{i}.mp4" for i in range(1, 9)]
+
+@pytest.mark.asyncio
+async def test_slow_stage_holds_back_downloads():
+    downloader = FakeDownloader()
+    video_maker = FakeVideoMaker(downloader)
+    pipeline = HighlightsPipeline(FakeDataRetriever(), downloader, video_maker,
+                                  download_workers = 2, prepare_workers = 1, queue_size = 2)
+    await pipeline.get_clips("0022400001", make_events(30), lambda value, description: None)
+    # at most queue_size clips queued, one per download worker waiting to queue and one being prepared
+    assert video_maker.max_waiting <= 2 + 2 + 1
+
+@pytest.mark.asyncio
+async def test_failure_stops_every_stage_and_closes_clips():
+    video_maker = FakeVideoMaker()
+    pipeline = HighlightsPipeline(FakeDataRetriever(), FakeDownloader(fail_on = 15), video_maker)
+    with pytest.raises(Exception, match = "Max retries exceeded for 15"):
+        await pipeline.get_clips("0022400001", make_events(20), lambda value, description: None)
+    assert video_maker.written is None
+    assert all(clip.closed for clip in video_maker.prepared)
+    # no worker is left running
+    await asyncio.sleep(0.05)
+    assert len(asyncio.all_tasks()) == 1
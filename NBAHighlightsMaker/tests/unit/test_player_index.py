@@ -0,0 +1,87 @@
+import pytest
+from PySide6.QtWidgets import QApplication
+from NBAHighlightsMaker.players.player_index import PlayerIndex
+from NBAHighlightsMaker.ui.player_search import PlayerSearchBox
+
+PLAYERS = [
+    {'id': 203999, 'full_name': 'Nikola Jokić', 'is_active': True},
+    {'id': 203994, 'full_name': 'Jusuf Nurkić', 'is_active': True},
+    {'id': 2544, 'full_name': 'LeBron James', 'is_active': True},
+    {'id': 893, 'full_name': 'Michael Jordan', 'is_active': False},
+    {'id': 78497, 'full_name': 'Michael Jordan', 'is_active': False},
+    {'id': 1626156, 'full_name': "D'Angelo Russell", 'is_active': True},
+    {'id': 201142, 'full_name': 'Kevin Durant', 'is_active': True},
+    {'id': 76621, 'full_name': 'Devin Durrant', 'is_active': False},
+    {'id': 1628386, 'full_name': 'Jarrett Allen', 'is_active': True},
+]
+
+@pytest.fixture
+def player_index():
+    return PlayerIndex.build(PLAYERS)
+
+def test_normalize():
+    assert PlayerIndex.normalize("Nikola Jokić") == "nikola jokic"
+    assert PlayerIndex.normalize("  D'Angelo   Russell ") == "dangelo russell"
+    assert PlayerIndex.normalize("Karl-Anthony Towns") == "karl anthony towns"
+
+def test_prefix_search_first_and_last_name(player_index):
+    assert player_index.search("nik", 1) == [(203999, 'Nikola Jokić')]
+    # accents and case don't matter, and the last name works too
+    assert player_index.search("JOKIC", 1) == [(203999, 'Nikola Jokić')]
+    assert player_index.search("dangelo", 1) == [(1626156, "D'Angelo Russell")]
+
+def test_ranking(player_index):
+    # active players come first, then the newer ones
+    ids = [player_id for player_id, _ in player_index.search("j", 10)]
+    assert ids.index(2544) < ids.index(893), "Active players should rank above retired ones."
+    assert ids.index(78497) < ids.index(893), "Newer players should rank above older ones."
+
+def test_fuzzy_search(player_index):
+    # misspelled, no prefix match
+    assert player_index.search("durrent", 2)[0][1] in {'Kevin Durant', 'Devin Durrant'}
+    assert player_index.search("lebrn james", 1) == [(2544, 'LeBron James')]
+
+def test_limit_and_empty_query(player_index):
+    assert len(player_index.search("", 3)) == 3
+    assert len(player_index.search("j", 2)) == 2
+    assert player_index.search("zzzzzz", 5) == []
+
+def test_find_id(player_index):
+    assert player_index.find_id("nikola jokic") == 203999
+    assert player_index.find_id("Michael Jordan") == 78497, "The best ranked player with the name should be used."
+    assert player_index.find_id("Nikola") is None
+
+def test_save_and_load(tmp_path, player_index):
+    file_path = str(tmp_path / 'players_index.json')
+    player_index.save(file_path)
+    loaded = PlayerIndex.load(file_path)
+
+    assert len(loaded) == len(PLAYERS)
+    assert loaded.search("jok", 3) == player_index.search("jok", 3)
+    assert PlayerIndex.load(str(tmp_path / 'missing.json')) is None
+
+class FakeDataRetriever:
+    """Gives the index of PLAYERS, and fails if the DataFrame of every player is asked for.
+    """
+    def get_player_index(self):
+        return PlayerIndex.build(PLAYERS)
+
+    def get_all_players(self):
+        raise AssertionError("The search box shouldn't need the DataFrame of every player.")
+
+def test_search_box_resolves_players_through_the_index():
+    app = QApplication.instance() or QApplication([])
+    search_box = PlayerSearchBox(FakeDataRetriever())
+    # no player is added to the box, the completer starts with the best ranked ones
+    assert search_box.search_box.count() == 0
+    assert search_box.completer_model.rowCount() == len(PLAYERS)
+
+    search_box.handle_text_edited("michael jor")
+    assert [player_id for player_id, _ in search_box.completer_model.hits] == [78497, 893]
+    search_box.search_box.setEditText("Michael Jordan")
+    assert search_box.get_selected_player_id() == 78497
+    # the player picked from the completer wins over the best ranked one with the same name
+    search_box.handle_completion_activated(search_box.completer_model.index(1))
+    assert search_box.get_selected_player_id() == 893
+    search_box.search_box.setEditText("lebron")
+    assert search_box.get_selected_player_id() == 2544
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from NBAHighlightsMaker.common.rate_limiter import AdaptiveRateLimiter, RateLimiterRegistry, parse_retry_after
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    # http dates in the past mean no wait
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+def test_registry_shares_limiters_per_host():
+    registry = RateLimiterRegistry()
+    limiter = registry.get("https://stats.nba.com/stats/videoeventsasset?GameEventID=8")
+    assert registry.get("stats.nba.com") is limiter
+    assert registry.get("https://videos.nba.com/nba/pbp/8.mp4") is not limiter
+    assert limiter.concurrency == 3, "stats.nba.com should use its own starting settings."
+
+def test_aimd():
+    limiter = AdaptiveRateLimiter('host', rate = 2.0, max_rate = 3.0, concurrency = 2, max_concurrency = 3,
+                                  rate_increase = 0.5)
+    limiter.record_success()
+    limiter.record_success()
+    assert limiter.rate == 3.0
+    assert limiter.concurrency == 3, "Concurrency should go up after 'concurrency' successes."
+
+    limiter.record_throttle(retry_after = 10)
+    assert limiter.rate == 1.5
+    assert limiter.concurrency == 1
+    assert limiter.paused_until >= time.monotonic() + 9
+    assert limiter.metrics()['throttles'] == 1
+
+@pytest.mark.asyncio
+async def test_limits_in_flight():
+    limiter = AdaptiveRateLimiter('host', rate = 1000.0, concurrency = 2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_paces_requests():
+    limiter = AdaptiveRateLimiter('host', rate = 20.0, concurrency = 10)
+    # use up the burst
+    limiter.next_token = time.monotonic()
+    start = time.monotonic()
+    for _ in range(5):
+        async with limiter.slot():
+            pass
+    # 5 requests at 20 per second need at least 4 gaps of 50ms
+    assert time.monotonic() - start >= 0.18
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_back_slot():
+    limiter = AdaptiveRateLimiter('host', rate = 1000.0, concurrency = 1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert not limiter.waiters
+
+@pytest.mark.asyncio
+async def test_try_acquire_slot_doesnt_wait():
+    limiter = AdaptiveRateLimiter('host', rate = 1000.0, concurrency = 2)
+    await limiter.acquire()
+    assert limiter.try_acquire_slot()
+    assert not limiter.try_acquire_slot()
+    assert limiter.in_flight == 2
+    limiter.release()
+    limiter.release()
+    assert limiter.in_flight == 0
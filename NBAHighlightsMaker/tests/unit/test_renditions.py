@@ -0,0 +1,35 @@
+import pytest
+from NBAHighlightsMaker.common.renditions import RenditionSelector, get_height, get_links
+
+VIDEO_URLS = {
+    'uuid': '1b2c',
+    'surl': "https://videos.nba.com/nba/pbp/media/8_640x360.mp4",
+    'murl': "https://videos.nba.com/nba/pbp/media/8_960x540.mp4",
+    'lurl': "https://videos.nba.com/nba/pbp/media/8_1920x1080.mp4",
+    'sth': "https://videos.nba.com/nba/pbp/media/8_640x360.jpg",
+}
+
+def test_get_links_and_heights():
+    links = get_links(VIDEO_URLS)
+    assert list(links) == ['surl', 'murl', 'lurl']
+    assert get_height('lurl', links['lurl']) == 1080
+    # no size in the link, assume the smallest it could be
+    assert get_height('murl', "https://videos.nba.com/8.mp4") == 540
+
+def test_smallest_rendition_tall_enough():
+    links = get_links(VIDEO_URLS)
+    assert RenditionSelector(target_height = 540).select(links) == 'murl'
+    assert RenditionSelector(target_height = 720).select(links) == 'lurl'
+    # nothing tall enough, take the tallest
+    assert RenditionSelector(target_height = 2160).select(links) == 'lurl'
+
+def test_proxy_takes_the_smallest():
+    selector = RenditionSelector(target_height = 720)
+    assert selector.select(get_links(VIDEO_URLS), proxy = True) == 'surl'
+    assert selector.get_stored_renditions(proxy = True) == ['surl', 'murl', 'lurl']
+    # the same selector still picks the full size rendition for other jobs
+    assert selector.select(get_links(VIDEO_URLS)) == 'lurl'
+
+def test_no_links():
+    with pytest.raises(ValueError):
+        RenditionSelector().select({})
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from NBAHighlightsMaker.common.rate_limiter import AdaptiveRateLimiter
+from NBAHighlightsMaker.common.retry import RetryPolicy, RetryableError, RetryError, CircuitOpenError, CircuitBreaker
+
+def make_limiter(concurrency = 1):
+    return AdaptiveRateLimiter('videos.nba.com', rate = 1000.0, max_rate = 1000.0,
+                               concurrency = concurrency, max_concurrency = concurrency, cooldown = 0.0)
+
+def test_delay_backs_off_with_jitter_and_honours_retry_after():
+    policy = RetryPolicy(base_delay = 1.0, max_delay = 5.0)
+    assert 0.5 <= policy.get_delay(1) <= 1.0
+    assert 2.0 <= policy.get_delay(3) <= 4.0
+    assert policy.get_delay(10) <= 5.0
+    assert policy.get_delay(1, retry_after = 7.0) == 7.0
+
+@pytest.mark.asyncio
+async def test_slot_is_free_while_backing_off():
+    policy = RetryPolicy(base_delay = 0.2)
+    limiter = make_limiter(concurrency = 1)
+    events = []
+
+    async def flaky():
+        if not events:
+            events.append('failed')
+            raise RetryableError("Response Status: 503", 503)
+        events.append('retried')
+        return 'link'
+
+    async def healthy():
+        events.append('healthy')
+        return 'other link'
+
+    flaky_task = asyncio.ensure_future(policy.run(flaky, limiter, "getting link for event 8"))
+    await asyncio.sleep(0.05)
+    # the only slot isn't held during the backoff of the flaky request
+    assert await policy.run(healthy, limiter, "getting link for event 9") == 'other link'
+    assert await flaky_task == 'link'
+    assert events == ['failed', 'healthy', 'retried']
+
+@pytest.mark.asyncio
+async def test_failed_tries_are_recorded():
+    policy = RetryPolicy(base_delay = 0.01)
+    limiter = make_limiter()
+
+    async def throttled():
+        raise RetryableError("Response Status: 429", 429, 0.02)
+
+    with pytest.raises(RetryError, match = "Max retries exceeded while downloading event 8") as error:
+        await policy.run(throttled, limiter, "downloading event 8")
+    attempts = error.value.attempts
+    assert [record.outcome for record in attempts] == ['throttled'] * 3
+    assert attempts[0].delay >= 0.02
+    assert attempts[-1].delay is None
+    assert limiter.throttles == 3
+    assert policy.metrics()['outcomes'] == {'videos.nba.com': {'throttled': 3}}
+
+@pytest.mark.asyncio
+async def test_missing_file_is_not_retried():
+    policy = RetryPolicy(base_delay = 0.01)
+
+    async def missing():
+        raise RetryableError("Response Status: 404", 404)
+
+    with pytest.raises(RetryError) as error:
+        await policy.run(missing, make_limiter(), "downloading event 8")
+    assert len(error.value.attempts) == 1
+
+@pytest.mark.asyncio
+async def test_circuit_opens_when_host_is_down():
+    policy = RetryPolicy(max_attempts = 2, base_delay = 0.01, failure_threshold = 3, reset_timeout = 60.0)
+    limiter = make_limiter()
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(RetryError):
+        await policy.run(down, limiter, "downloading event 8")
+    with pytest.raises(CircuitOpenError):
+        await policy.run(down, limiter, "downloading event 9")
+    # the third failure opened the breaker, the fourth try was never sent
+    assert len(calls) == 3
+    assert policy.metrics()['breakers'] == {'videos.nba.com': 'open'}
+
+def test_half_open_breaker_lets_one_request_through():
+    breaker = CircuitBreaker('videos.nba.com', failure_threshold = 1, reset_timeout = 0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow(), "Only one request should be let through while half open."
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
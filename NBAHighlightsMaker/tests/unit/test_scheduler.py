@@ -0,0 +1,123 @@
+import asyncio
+import pandas as pd
+import pytest
+from NBAHighlightsMaker.downloader.scheduler import DownloadScheduler, get_timeline_key, parse_clock
+from NBAHighlightsMaker.players.event_filter import EventSelection
+from NBAHighlightsMaker.players.getplayers import DataRetriever
+from NBAHighlightsMaker.players.pbp_store import PBP_COLUMNS
+
+class FakeDownloader:
+    """Downloads after a delay given per action number, failing the ones in fail_once the first time.
+    """
+    def __init__(self, delays = None, fail_once = ()):
+        self.delays = delays or {}
+        self.fail_once = set(fail_once)
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    def get_file_path(self, row, game_id = None):
+        return f"{row.actionNumber}.mp4"
+
+    async def fetch_file(self, session, row, video_link, file_path):
+        self.started.append(row.actionNumber)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(row.actionNumber, 0.001))
+            if row.actionNumber in self.fail_once:
+                self.fail_once.remove(row.actionNumber)
+                raise Exception(f"Max retries exceeded for {row.actionNumber}")
+        finally:
+            self.running -= 1
+        return file_path
+
+def make_events():
+    # listed out of timeline order
+    return pd.DataFrame({
+        'actionNumber': [40, 7, 25, 12],
+        'period': [2, 1, 1, 1],
+        'clock': ['PT11M00.00S', 'PT10M00.00S', 'PT02M30.00S', 'PT08M15.50S'],
+        'description': ['a', 'b', 'c', 'd'],
+    })
+
+def add_events(scheduler, events):
+    for position, row in enumerate(events.itertuples()):
+        scheduler.add(position, row, f"https://videos.nba.com/{row.actionNumber}.mp4")
+    scheduler.close()
+
+def test_timeline_key():
+    assert parse_clock('PT08M15.50S') == 495.5
+    rows = list(make_events().itertuples())
+    assert [row.actionNumber for row in sorted(rows, key = get_timeline_key)] == [7, 12, 25, 40]
+    # without a clock, the action number decides
+    assert get_timeline_key(pd.DataFrame({'actionNumber': [3]}).iloc[0]) == (0, 0.0, 3)
+
+@pytest.mark.asyncio
+async def test_earliest_clips_start_first_and_come_out_in_order():
+    downloader = FakeDownloader(delays = {7: 0.05})
+    scheduler = DownloadScheduler(downloader, None, workers = 1)
+    add_events(scheduler, make_events())
+    run_task = asyncio.ensure_future(scheduler.run())
+    clips = [row.actionNumber async for position, row, file_path in scheduler.iter_in_order()]
+    await run_task
+    assert downloader.started == [7, 12, 25, 40]
+    assert clips == [7, 12, 25, 40]
+
+@pytest.mark.asyncio
+async def test_filtered_events_are_scheduled_on_the_game_timeline(tmp_path):
+    # action numbers out of timeline order, like actions added to the play-by-play after the fact
+    pbp = pd.DataFrame({
+        'actionNumber': [40, 7, 25, 12],
+        'period': [1, 2, 1, 1],
+        'clock': ['PT11M00.00S', 'PT10M00.00S', 'PT02M30.00S', 'PT08M15.50S'],
+        'actionType': ['2pt', '2pt', '3pt', 'rebound'],
+        'subType': ['Layup', 'Layup', 'Jump Shot', 'defensive'],
+        'personId': [201142] * 4,
+        'description': ['a', 'b', 'c', 'd'],
+        'shotResult': ['Made', 'Made', 'Made', None],
+    }).reindex(columns = PBP_COLUMNS)
+    data_retriever = DataRetriever(None, str(tmp_path))
+    data_retriever.pbp_store.save('0022400001', pbp, True)
+    events = data_retriever.get_events_for_selections('0022400001', [EventSelection(201142, {'2pt', '3pt', 'rebound'}, set())])[0]
+    downloader = FakeDownloader()
+    scheduler = DownloadScheduler(downloader, None, workers = 1)
+    add_events(scheduler, events)
+    await scheduler.run()
+    assert downloader.started == [40, 12, 25, 7]
+
+@pytest.mark.asyncio
+async def test_clip_waits_for_earlier_clips():
+    # 12 finishes long before 7, but is only yielded after it
+    downloader = FakeDownloader(delays = {7: 0.1})
+    scheduler = DownloadScheduler(downloader, None, workers = 4)
+    add_events(scheduler, make_events())
+    run_task = asyncio.ensure_future(scheduler.run())
+    iterator = scheduler.iter_in_order()
+    position, row, file_path = await iterator.__anext__()
+    assert row.actionNumber == 7
+    assert len(scheduler.results) == 4
+    await iterator.aclose()
+    await run_task
+
+@pytest.mark.asyncio
+async def test_failed_download_is_requeued_and_host_capped():
+    downloader = FakeDownloader(fail_once = [12])
+    scheduler = DownloadScheduler(downloader, None, workers = 4, host_limit = 2)
+    add_events(scheduler, make_events())
+    await scheduler.run()
+    assert downloader.started.count(12) == 2
+    assert sorted(scheduler.results) == [0, 1, 2, 3]
+    assert downloader.max_running <= 2
+
+@pytest.mark.asyncio
+async def test_failure_after_requeues_stops_the_iterator():
+    downloader = FakeDownloader(fail_once = [25])
+    scheduler = DownloadScheduler(downloader, None, max_requeues = 0)
+    add_events(scheduler, make_events())
+    run_task = asyncio.ensure_future(scheduler.run())
+    with pytest.raises(Exception, match = "Max retries exceeded for 25"):
+        async for clip in scheduler.iter_in_order():
+            pass
+    with pytest.raises(Exception):
+        await run_task
@@ -0,0 +1,146 @@
+import os
+import struct
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from NBAHighlightsMaker.downloader.downloader import Downloader
+from NBAHighlightsMaker.downloader.segmented import SegmentTuner, MIN_SEGMENT_SIZE, plan_segments
+
+def make_mp4(payload):
+    """Wraps a payload in the ftyp, moov and mdat boxes of an MP4 file.
+    """
+    ftyp = struct.pack('>I4s4sI', 16, b'ftyp', b'isom', 512)
+    moov = struct.pack('>I4s', 16, b'moov') + bytes(8)
+    return ftyp + moov + struct.pack('>I4s', 8 + len(payload), b'mdat') + payload
+
+DATA = make_mp4(os.urandom(4 * MIN_SEGMENT_SIZE + 123))
+
+class FakeUserAgent:
+    random = 'Mozilla/5.0'
+
+class Row:
+    actionNumber = 8
+    description = "3PT Jump Shot"
+
+@pytest_asyncio.fixture
+async def range_server():
+    """Serves DATA with Range support, failing the range starting at fail_at once if it is set,
+    and counting the most range requests handled at the same time.
+    """
+    state = {'requests': [], 'fail_at': None, 'ranges': True, 'active': 0, 'max_active': 0}
+
+    async def handle(request):
+        range_header = request.headers.get('Range')
+        state['requests'].append(range_header)
+        if not range_header or not state['ranges']:
+            headers = {'ETag': '"v1"', 'Accept-Ranges': 'bytes'} if state['ranges'] else {'ETag': '"v1"'}
+            return web.Response(body = DATA, headers = headers)
+        start, end = range_header[len('bytes='):].split('-')
+        start = int(start)
+        end = int(end) if end else len(DATA) - 1
+        if start == state['fail_at']:
+            state['fail_at'] = None
+            return web.Response(status = 503)
+        state['active'] += 1
+        state['max_active'] = max(state['max_active'], state['active'])
+        await asyncio.sleep(0.05)
+        state['active'] -= 1
+        headers = {'ETag': '"v1"', 'Content-Range': f"bytes {start}-{end}/{len(DATA)}"}
+        return web.Response(status = 206, body = DATA[start:end + 1], headers = headers)
+
+    app = web.Application()
+    app.router.add_get('/clip.mp4', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/clip.mp4", state
+    await runner.cleanup()
+
+async def download(tmp_path, url, segment_tuner, concurrency = None):
+    downloader = Downloader(FakeUserAgent(), str(tmp_path))
+    downloader.segment_tuner = segment_tuner
+    limiter = downloader.rate_limiters.get(url)
+    if concurrency is not None:
+        limiter.concurrency = concurrency
+    os.makedirs(downloader.data_dir, exist_ok = True)
+    file_path = os.path.join(downloader.data_dir, "8.mp4")
+    session = downloader.http_client.get_session()
+    try:
+        await downloader.fetch_file(session, Row(), url, file_path)
+    finally:
+        await downloader.http_client.close()
+    with open(file_path, 'rb') as f:
+        assert f.read() == DATA
+    assert os.listdir(downloader.data_dir) == ["8.mp4"]
+    # every slot taken for a segment was given back
+    assert limiter.in_flight == 0
+
+def test_plan_segments():
+    assert plan_segments(10, 3, min_segment_size = 1) == [[0, 3, 0], [4, 7, 0], [8, 9, 0]]
+    # too small to split
+    assert plan_segments(MIN_SEGMENT_SIZE, 4) == [[0, MIN_SEGMENT_SIZE - 1, 0]]
+
+def test_tuner_climbs_while_faster_and_halves_on_failure():
+    tuner = SegmentTuner(start_segments = 2, max_segments = 4)
+    tuner.record('videos.nba.com', 1, 100.0)
+    tuner.record('videos.nba.com', 2, 180.0)
+    assert tuner.get('videos.nba.com') == 3
+    tuner.record('videos.nba.com', 3, 150.0)
+    # 3 segments were slower than 2
+    assert tuner.get('videos.nba.com') == 2
+    tuner.record_failure('videos.nba.com')
+    assert tuner.get('videos.nba.com') == 1
+
+@pytest.mark.asyncio
+async def test_segments_are_downloaded_into_one_file(tmp_path, range_server):
+    url, state = range_server
+    tuner = SegmentTuner(start_segments = 4)
+    await download(tmp_path, url, tuner, concurrency = 4)
+    # the first request brings the length and the first segment, then one request per other segment
+    segments = plan_segments(len(DATA), 4)
+    assert state['requests'] == [None] + [f"bytes={start}-{end}" for start, end, _ in segments[1:]]
+    assert tuner.throughputs['127.0.0.1'][4] > 0
+
+@pytest.mark.asyncio
+async def test_segments_take_a_slot_of_the_limiter(tmp_path, range_server):
+    url, state = range_server
+    # the try holds the only slot, so the other segments are fetched one at a time
+    await download(tmp_path, url, SegmentTuner(start_segments = 4), concurrency = 1)
+    assert len(state['requests']) == 4
+    assert state['max_active'] == 1
+
+@pytest.mark.asyncio
+async def test_small_clip_is_not_split(tmp_path, range_server):
+    url, state = range_server
+    small = make_mp4(os.urandom(MIN_SEGMENT_SIZE))
+    global DATA
+    DATA, data = small, DATA
+    try:
+        await download(tmp_path, url, SegmentTuner(start_segments = 4))
+    finally:
+        DATA = data
+    # one request, no probe and no second download
+    assert state['requests'] == [None]
+
+@pytest.mark.asyncio
+async def test_retry_only_asks_for_the_failed_segment(tmp_path, range_server):
+    url, state = range_server
+    segments = plan_segments(len(DATA), 4)
+    state['fail_at'] = segments[2][0]
+    await download(tmp_path, url, SegmentTuner(start_segments = 4), concurrency = 4)
+    failed = f"bytes={segments[2][0]}-{segments[2][1]}"
+    assert state['requests'].count(failed) == 2
+    assert len(state['requests']) == 5
+
+@pytest.mark.asyncio
+async def test_host_without_ranges_falls_back_to_a_single_stream(tmp_path, range_server):
+    url, state = range_server
+    state['ranges'] = False
+    tuner = SegmentTuner(start_segments = 4)
+    await download(tmp_path, url, tuner)
+    # the clip is downloaded by the same request that showed the host doesn't support ranges
+    assert state['requests'] == [None]
+    assert tuner.get('127.0.0.1') == 1
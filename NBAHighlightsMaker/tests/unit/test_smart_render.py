@@ -0,0 +1,66 @@
+import os
+import pytest
+from NBAHighlightsMaker.editor.smart_render import SmartRenderer, plan_cuts
+from NBAHighlightsMaker.editor.ffmpeg_tools import probe_clip, get_keyframes
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, EncoderProfile
+
+@pytest.fixture(scope = 'module')
+def clips(tmp_path_factory, make_clip):
+    pytest.importorskip('moviepy')
+    tmp_path = tmp_path_factory.mktemp('clips')
+    # a keyframe every half second, and a clip too short to have one between its fades
+    return [make_clip(tmp_path / "0.mp4", size = '320x180', duration = 3, gop = 15),
+            make_clip(tmp_path / "1.mp4", size = '320x180', duration = 2, gop = 15),
+            make_clip(tmp_path / "2.mp4", size = '320x180', duration = 1.5, gop = 15)]
+
+def make_renderer():
+    return SmartRenderer(target_resolution = (180, 320), workers = 2)
+
+def test_plan_cuts_picks_keyframes_outside_the_fades():
+    keyframes = [0.0, 0.5005, 1.001, 1.5015, 2.002, 2.5025, 3.003]
+    assert plan_cuts(keyframes, 4.0, 1) == (1.001, 2.5025)
+    assert plan_cuts([0.0, 1.0, 2.0, 3.0], 4.0, 1) == (1.0, 3.0)
+
+def test_plan_cuts_without_keyframes_between_the_fades():
+    assert plan_cuts([0.0], 4.0, 1) is None
+    assert plan_cuts([0.0, 0.5, 1.0], 1.5, 1) is None
+
+def test_get_keyframes(clips):
+    assert get_keyframes(clips[0]) == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5], abs = 0.01)
+
+def test_encoder_args_use_the_profile(clips):
+    profile = EncoderProfile("Archive", 'slow', crf = 18, tune = 'film')
+    args = SmartRenderer.get_encoder_args(probe_clip(clips[0]), profile)
+    assert args[:8] == ['-c:v', 'libx264', '-preset', 'slow', '-crf', '18', '-tune', 'film']
+    assert args[-4:] == ['-fps_mode', 'cfr', '-r', '30']
+
+@pytest.mark.asyncio
+async def test_render_encodes_fades_and_joins_clips(clips, tmp_path):
+    progress = []
+    output_path = str(tmp_path / 'final.mp4')
+    assert await make_renderer().render(clips, output_path, lambda value, description: progress.append((value, description)),
+                                        profile = ENCODER_PROFILES['preview'])
+    info = probe_clip(output_path)
+    assert (info.width, info.height, info.fps, info.audio_codec) == (320, 180, 30.0, 'aac')
+    assert info.duration == pytest.approx(6.5, abs = 0.1)
+    assert progress[-2] == (100, "Editing - 100% : 3/3 clips")
+    assert progress[-1] == (100, "Joining clips...")
+    # the pieces were removed
+    assert os.listdir(tmp_path) == ['final.mp4']
+
+@pytest.mark.asyncio
+async def test_render_needs_clips_matching_the_final_video(clips, tmp_path, make_clip):
+    small_clip = make_clip(tmp_path / 'small.mp4', size = '160x90', gop = 15)
+    output_path = str(tmp_path / 'final.mp4')
+    assert not await make_renderer().render([clips[0], small_clip], output_path, lambda value, description: None,
+                                            profile = ENCODER_PROFILES['preview'])
+    assert not os.path.exists(output_path)
+
+@pytest.mark.asyncio
+async def test_render_without_audio(clips, tmp_path):
+    output_path = str(tmp_path / 'final.mp4')
+    assert await make_renderer().render(clips, output_path, lambda value, description: None, audio = False,
+                                        profile = ENCODER_PROFILES['preview'])
+    info = probe_clip(output_path)
+    assert info.audio_codec is None
+    assert info.duration == pytest.approx(6.5, abs = 0.1)
@@ -10,13 +10,20 @@ the user that the video has been created and if they want to open it immediately
 import json
 import time
 from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QCheckBox, QPushButton, QTableWidget, QWidget, QTableWidgetItem, QMessageBox
-from NBAHighlightsMaker.editor.editor import VideoMaker
+from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QCheckBox, QComboBox, QPushButton, QTableWidget, QWidget, QTableWidgetItem, QMessageBox
+from NBAHighlightsMaker.editor.editor import VideoMaker, RENDER_MODES
+from NBAHighlightsMaker.editor.encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE
+from NBAHighlightsMaker.pipeline.pipeline import HighlightsPipeline
+from NBAHighlightsMaker.common.job_settings import JobSettings
+from NBAHighlightsMaker.downloader.partial_download import is_partial_file
 from NBAHighlightsMaker.common.enums import EventMsgType
 import os
 import shutil
 import asyncio
 
+# seconds partly downloaded clips are kept for a later job to resume
+PARTIAL_MAX_AGE = 24 * 60 * 60
+
 class GameLogTable(QWidget):
     """Widget to display the selected player's game log, select a game and event types wanted, and create the video.
     
@@ -32,16 +39,20 @@ class GameLogTable(QWidget):
         data_retriever (DataRetriever): Object used to get player data.
         downloader (Downloader): Object used to download video clips.
         video_maker (VideoMaker): Object used to concatenate all clips and add fade effects between clips.
+        pipeline (HighlightsPipeline): Object streaming each event through getting its link, downloading and preparing its clip.
         curr_game_log (pandas.DataFrame): The dataframe with the game log for the currently selected player.
         player_id (int): The id for the currently selected player.
         game_id (str): The id for the currently selected game.
-        get_links_task (asyncio.Task): Asyncio task to fetch all relevant video links.
-        download_task (asyncio.Task): Asyncio task to download video clips.
-        edit_task (asyncio.Task): Asyncio task to edit the final video.
+        pipeline_task (asyncio.Task): Asyncio task to get the links, download the clips and edit the final video.
         create_video_flag (bool): Flag indicating if video creation is in progress.
         layout (QVBoxLayout): Main vertical layout for the widget.
         table_widget (QTableWidget): Table widget displaying the game log.
         select_all_button (QCheckBox): Checkbox to select/deselect all actions.
+        preview_quality_box (QCheckBox): Checkbox to download the smallest rendition of the clips.
+        fades_box (QCheckBox): Checkbox to fade each clip in and out, when unchecked the clips can be joined without encoding.
+        render_mode_box (QComboBox): Dropdown of the ways the final video can be encoded.
+        encoder_profile_box (QComboBox): Dropdown of the encoder settings of the final video.
+        audio_box (QCheckBox): Checkbox to keep the audio of the clips, when unchecked it isn't read at all.
         action_type_boxes (dict): Dictionary of checkboxes for each possible action.
         layout_action_type_boxes (QHBoxLayout): Horizontal layout for the action_type_boxes.
         layout_action_options_boxes (QHBoxLayout): Horizontal layout for action options based on the action types.
@@ -58,14 +69,13 @@ class GameLogTable(QWidget):
         self.downloader = downloader
         self.data_dir = os.path.join(data_dir, 'vids')
         self.video_maker = VideoMaker(self.update_progress_bar, data_dir)
+        self.pipeline = HighlightsPipeline(data_retriever, downloader, self.video_maker)
 
         self.curr_game_log = None
         self.player_id = None
         self.game_id = None
 
-        self.get_links_task = None
-        self.download_task = None
-        self.edit_task = None
+        self.pipeline_task = None
 
         self.create_video_flag = False
 
@@ -85,6 +95,25 @@ class GameLogTable(QWidget):
         self.select_all_button = QCheckBox("Select All")
         self.select_all_button.setChecked(True)
         self.select_all_button.clicked.connect(self.handle_select_all_click)
+        # downloads the smallest clips, for a quick preview of the video
+        self.preview_quality_box = QCheckBox("Preview Quality")
+        self.preview_quality_box.setToolTip("Download the smallest version of each clip. Faster, but lower quality.")
+        # without fades, clips that match can be joined without encoding
+        self.fades_box = QCheckBox("Fade Transitions")
+        self.fades_box.setChecked(True)
+        self.fades_box.setToolTip("Fade each clip in and out. Unchecked, the video is made much faster.")
+        self.render_mode_box = QComboBox()
+        for render_mode, name in RENDER_MODES.items():
+            self.render_mode_box.addItem(name, render_mode)
+        self.render_mode_box.setToolTip("How the final video is encoded.")
+        self.encoder_profile_box = QComboBox()
+        for encoder_profile, profile in ENCODER_PROFILES.items():
+            self.encoder_profile_box.addItem(profile.name, encoder_profile)
+        self.encoder_profile_box.setCurrentIndex(self.encoder_profile_box.findData(DEFAULT_PROFILE))
+        self.encoder_profile_box.setToolTip("Speed, quality and size of the final video.")
+        self.audio_box = QCheckBox("Audio")
+        self.audio_box.setChecked(True)
+        self.audio_box.setToolTip("Keep the sound of the clips. Unchecked, the video is made without audio.")
 
         # make dictionary of checkboxes for each action, 
         # make them checked as default, add to layout
@@ -148,6 +177,11 @@ class GameLogTable(QWidget):
         # add objects to layout
         self.layout.addWidget(self.table_widget)
         self.layout.addWidget(self.select_all_button)
+        self.layout.addWidget(self.preview_quality_box)
+        self.layout.addWidget(self.fades_box)
+        self.layout.addWidget(self.render_mode_box)
+        self.layout.addWidget(self.encoder_profile_box)
+        self.layout.addWidget(self.audio_box)
         self.layout.addLayout(self.layout_action_type_boxes)
         self.layout.addLayout(self.layout_action_options_boxes)
         self.layout.addWidget(self.progress_bar_label)
@@ -277,38 +311,35 @@ class GameLogTable(QWidget):
         self.create_video_flag = False
     
     def clean_data_dir(self):
-        """Deletes all files in the data directory.
+        """Deletes all files in the data directory, except partly downloaded clips.
 
+        Partly downloaded clips and their sidecars are kept, so a later job downloading
+        the same clips can resume them, unless they weren't touched for PARTIAL_MAX_AGE seconds.
         """
-        if os.path.exists(self.data_dir):
-            shutil.rmtree(self.data_dir)
         # create/recreate data folder
-        os.makedirs(self.data_dir)
+        os.makedirs(self.data_dir, exist_ok = True)
+        now = time.time()
+        for entry in os.scandir(self.data_dir):
+            if entry.is_dir(follow_symlinks = False):
+                shutil.rmtree(entry.path)
+            elif not is_partial_file(entry.name) or now - entry.stat().st_mtime > PARTIAL_MAX_AGE:
+                os.remove(entry.path)
 
     def cancel_tasks(self):
-        """Cancels any ongoing tasks for getting links, downloading, or editing the video.
+        """Cancels the ongoing task for getting links, downloading, and editing the video.
         
         """
-        if self.get_links_task:
-            self.get_links_task.cancel()
-            self.get_links_task = None
-            print("Getting Links task cancelled.")
-        
-        if self.download_task:
-            self.download_task.cancel()
-            self.download_task = None
-            print("Downloading task cancelled.")
-        
-        if self.edit_task:
-            self.edit_task.cancel()
-            self.edit_task = None
+        if self.pipeline_task:
+            self.pipeline_task.cancel()
+            self.pipeline_task = None
             print("Creating video task cancelled.")
 
     async def handle_create_vid_click(self):
         """Gets event links, downloads all clips needed, and stitches them together.
 
         Clears the data directory, filters the needed events using what the user selected,
-        gets links to all of these events and downloads them, and concatenates the clips together.
+        and streams the events through getting their links, downloading and preparing their clips,
+        then concatenates the clips together.
         During this whole process, the user is updated with progress information. Once the video is
         completed, the user is informed that the video has been created successfully.
 
@@ -356,57 +387,33 @@ class GameLogTable(QWidget):
         self.progress_bar.setVisible(True)
         self.update_progress_bar(0, "Getting Links...")
 
-        self.get_links_task = asyncio.create_task(self.data_retriever.get_download_links_async(self.game_id, event_ids, self.update_progress_bar))
-        try:
-            self.cancel_button.setEnabled(True)
-            event_ids = await self.get_links_task
-        except asyncio.CancelledError:
-            print("Getting links was cancelled by user.")
-            self.cleanup()
-            return
-        except Exception as e:
-            print(f"An error occurred while getting links: {e}")
-            print("Returning...")
-            self.cleanup()
-            QMessageBox.critical(self, "An error occurred while getting links:", f"{e}\nPlease try creating the video again.")
-            return
-        
-        self.update_progress_bar(0, "Downloading clips...")
-        self.download_task = asyncio.create_task(self.downloader.download_files(event_ids, self.update_progress_bar))
-        try:
-            self.cancel_button.setEnabled(True)
-            event_ids = await self.download_task
-        except asyncio.CancelledError:
-            print("Downloading was cancelled by user")
-            # might have downloaded some files, delete data folder
-            self.clean_data_dir()
-            self.cleanup()
-            return
-        except Exception as e:
-            print(f"An error occurred while downloading: {e}")
-            self.cleanup()
-            QMessageBox.critical(self, "An error occurred while downloading:", f"{e}\nPlease try creating the video again.")
+        # read once, so changing the options while the video is made doesn't change it
+        settings = JobSettings(proxy = self.preview_quality_box.isChecked(), fades = self.fades_box.isChecked(),
+                               render_mode = self.render_mode_box.currentData(),
+                               encoder_profile = self.encoder_profile_box.currentData(), audio = self.audio_box.isChecked())
 
-        self.update_progress_bar(0, "Editing video...")
-
-        self.edit_task = asyncio.create_task(self.video_maker.make_final_vid(event_ids['FILE_PATH'].tolist()))
+        # each clip is downloaded as soon as its link is found, and prepared as soon as it is downloaded
+        self.pipeline_task = asyncio.create_task(self.pipeline.run(self.game_id, event_ids, self.update_progress_bar,
+                                                                  settings = settings))
         try:
             self.cancel_button.setEnabled(True)
-            await self.edit_task
+            await self.pipeline_task
         except IOError as e:
             print(f"IOError caught in game_log_table: {e}")
             self.clean_data_dir()
             self.cleanup()
             return
         except asyncio.CancelledError:
-            print("AsyncIO CancelledError by editing task.")
+            print("Creating video was cancelled by user.")
             await asyncio.sleep(0.1)
+            # might have downloaded some files, delete data folder
             self.clean_data_dir()
             self.cleanup()
             return
         except Exception as e:
-            print(f"An error occurred while editing: {e}")
+            print(f"An error occurred while creating the video: {e}")
             self.cleanup()
+            QMessageBox.critical(self, "An error occurred while creating the video:", f"{e}\nPlease try creating the video again.")
             return
         # if no exceptions raised
         else:
@@ -5,9 +5,55 @@ through the UI and emits the player ID, season, and season type
 to update the GameLogTable widget with the corresponding game log.
 """
 from PySide6.QtWidgets import QComboBox, QCompleter, QLabel, QWidget, QVBoxLayout, QPushButton
-from PySide6.QtCore import QStringListModel, Qt, Signal
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, Signal
 import datetime
 
+class PlayerCompleterModel(QAbstractListModel):
+    """List model holding the top matches of a PlayerIndex for the text typed so far.
+
+    Instead of holding every player name and letting the completer filter them on every keystroke,
+    the model is refilled with only the best matches from the index each time the text changes.
+
+    Args:
+        player_index (PlayerIndex): Index used to search players by name.
+        limit (int, optional): Maximum number of matches shown. Defaults to 10.
+
+    Attributes:
+        player_index (PlayerIndex): Index used to search players by name.
+        limit (int): Maximum number of matches shown.
+        hits (list): List of (id, full_name) tuples currently in the model.
+    """
+    def __init__(self, player_index, limit = 10):
+        super().__init__()
+        self.player_index = player_index
+        self.limit = limit
+        self.hits = []
+
+    def rowCount(self, parent = QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.hits)
+
+    def data(self, index, role = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.hits):
+            return None
+        player_id, full_name = self.hits[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return full_name
+        if role == Qt.UserRole:
+            return player_id
+        return None
+
+    def update_hits(self, text):
+        """Refills the model with the best matches for the text.
+
+        Args:
+            text (str): Text typed by the user.
+        """
+        self.beginResetModel()
+        self.hits = self.player_index.search(text, self.limit)
+        self.endResetModel()
+
 class PlayerSearchBox(QWidget):
     """Widget for selecting a player, year, and season type to find the games the user wants.
 
@@ -24,13 +70,16 @@ class PlayerSearchBox(QWidget):
         search_box_label (QLabel): Label for the player search combo box.
         search_box (QComboBox): Combo box for desired player with autocomplete.
         completer (QCompleter): Completer to autocomplete player names.
+        completer_model (PlayerCompleterModel): Model holding the best matches for the text typed so far,
+            the only list of player names the widget keeps.
         season_box_label (QLabel): Label for the year dropdown box.
         season_box (QComboBox): Dropdown box for selecting the year.
         season_type_label (QLabel): Label for the season type dropdown box.
         season_type_box (QComboBox): Dropdown box for selecting the season type.
         load_game_log_button (QPushButton): Button to emit selected information and load the game log.
         layout (QVBoxLayout): Main layout for the widget.
-        players (pd.DataFrame): DataFrame containing all player information.
+        player_index (PlayerIndex): Index used to search players by name.
+        selected_player (tuple): (id, full_name) of the last player picked from the completer, None if none was.
         data_retriever (DataRetriever): DataRetriever object used to get player data.
     """
     # make signal to emit info when load button clicked
@@ -41,19 +90,23 @@ class PlayerSearchBox(QWidget):
         self.search_box_label = QLabel("Type/Select Player Name:")
         self.search_box = QComboBox(self)
         self.search_box.setEditable(True)
+        # the typed text is looked up in the index, it isn't added to the box
+        self.search_box.setInsertPolicy(QComboBox.NoInsert)
         self.data_retriever = data_retriever
 
-        # get players and fill box with them
-        self.players = self.data_retriever.get_all_players()
+        # the names are only kept by the index, which the completer searches as the user types
+        self.player_index = self.data_retriever.get_player_index()
+        self.selected_player = None
 
-        # add completer for autocomplete
+        # add completer for autocomplete, the model already holds only the matches
+        # so the completer shows them as is instead of filtering them again
         self.completer = QCompleter()
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
-        # match anywhere in string
-        self.completer.setFilterMode(Qt.MatchContains)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer_model = PlayerCompleterModel(self.player_index)
         self.search_box.setCompleter(self.completer)
         
-        # fill completer and search box with player names
+        # fill completer with the best ranked players
         self.update_search_box_and_completer()
 
         # box to select season
@@ -89,18 +142,59 @@ class PlayerSearchBox(QWidget):
         self.layout.addWidget(self.load_game_log_button)
 
     def update_search_box_and_completer(self) -> None:
-        """Fills the search box with player names and initializes the completer.
+        """Initializes the completer with the best ranked players, instead of filling the search box with every player.
+        """
+        self.completer_model.update_hits('')
+        self.completer.setModel(self.completer_model)
+        # look up the matches in the index as the user types
+        self.search_box.lineEdit().textEdited.connect(self.handle_text_edited)
+        self.completer.activated[QModelIndex].connect(self.handle_completion_activated)
+
+    def handle_text_edited(self, text) -> None:
+        """Refills the completer with the best matches for the typed text and shows them.
+
+        Args:
+            text (str): Text typed by the user.
         """
-        player_names = self.players["full_name"].to_numpy()
-        self.search_box.addItems(player_names)
+        self.completer_model.update_hits(text)
+        if text:
+            self.completer.setCompletionPrefix(text)
+            self.completer.complete()
+
+    def handle_completion_activated(self, index) -> None:
+        """Remembers the player picked from the completer.
 
-        model = QStringListModel(player_names)
-        self.completer.setModel(model)
+        Args:
+            index (QModelIndex): Index of the picked match in the completion model.
+        """
+        self.selected_player = (index.data(Qt.UserRole), index.data(Qt.DisplayRole))
+
+    def get_selected_player_id(self):
+        """Gets the ID of the player whose name is in the search box.
+
+        If the text is the player last picked from the completer, that player is used, so players
+        with the same name can still be told apart. Otherwise the text is looked up in the index.
+
+        Returns:
+            int: The player ID, or None if no player matches the text.
+        """
+        text = self.search_box.currentText()
+        if self.selected_player is not None and self.selected_player[1] == text:
+            return int(self.selected_player[0])
+        player_id = self.player_index.find_id(text)
+        if player_id is None:
+            hits = self.player_index.search(text, 1)
+            if hits:
+                player_id = hits[0][0]
+        return player_id
     
     def handle_load_button_clicked(self) -> None:
         """Gets the player ID number, season, and season type chosen by user and emits a signal with this information.
         """
-        player_id = self.players.iloc[self.search_box.currentIndex()]['id']
+        player_id = self.get_selected_player_id()
+        if player_id is None:
+            print(f"No player found for {self.search_box.currentText()}.")
+            return
         season = self.season_box.currentText()
         season_type = self.season_type_box.currentText()
         self.player_info_given.emit(player_id, season, season_type)